@@ -26,21 +26,28 @@ source test/common.sh  # die
 # ~/git/oilshell/benchmarks-data and also in the /release/ hierarchy?
 readonly BASE_DIR=_tmp/osh-parser
 readonly SORTED=$BASE_DIR/tmp/sorted.txt
+readonly SORTED_YSH=$BASE_DIR/tmp/sorted-ysh.txt
+
+# YSH files are only parsed by OSH, with -o ysh:all
+readonly YSH_FILES=benchmarks/osh-parser-ysh-files.txt
 
 write-sorted-manifest() {
   local files=${1:-benchmarks/osh-parser-files.txt}
   local counts=$BASE_DIR/tmp/line-counts.txt
+  local ysh_counts=$BASE_DIR/tmp/line-counts-ysh.txt
   local csv_out=$2
   local sep=${3:-','}  # CSV or TSV
 
   # Remove comments and sort by line count
   grep -v '^#' $files | xargs wc -l | sort -n > $counts
+  grep -v '^#' $YSH_FILES | xargs wc -l | sort -n > $ysh_counts
     
   # Raw list of paths
   cat $counts | awk '$2 != "total" { print $2 }' > $SORTED
+  cat $ysh_counts | awk '$2 != "total" { print $2 }' > $SORTED_YSH
 
   # Make a CSV file from wc output
-  cat $counts | awk -v sep="$sep" '
+  cat $counts $ysh_counts | awk -v sep="$sep" '
       BEGIN { print "num_lines" sep "path" }
       $2 != "total" { print $1 sep $2 }' \
       > $csv_out
@@ -68,6 +75,11 @@ parser-task() {
   case "$shell_name" in
     osh|oils-for-unix.*)
       extra_args='--ast-format none'
+      case "$script_path" in
+        *.ysh)
+          extra_args="$extra_args -o ysh:all"
+          ;;
+      esac
       ;;
   esac
 
@@ -120,6 +132,11 @@ cachegrind-task() {
   case "$shell_name" in
     osh|oils-for-unix.*)
       extra_args="--ast-format none"
+      case "$script_path" in
+        *.ysh)
+          extra_args="$extra_args -o ysh:all"
+          ;;
+      esac
       ;;
   esac
 
@@ -145,12 +162,24 @@ print-tasks() {
   # Add 1 field for each of 5 fields.
   cat $provenance | filter-provenance "$@" |
   while read fields; do
-    if test -n "${QUICKLY:-}"; then
-      # Quick test
-      head -n 2 $SORTED | xargs -n 1 -- echo "$fields"
-    else
-      cat $SORTED | xargs -n 1 -- echo "$fields"
-    fi
+    local files=$SORTED
+
+    local sh_path
+    sh_path=$(echo "$fields" | cut -d ' ' -f 4)
+    case "$(basename $sh_path)" in
+      osh|oils-for-unix.*)
+        files="$files $SORTED_YSH"
+        ;;
+    esac
+
+    for f in $files; do
+      if test -n "${QUICKLY:-}"; then
+        # Quick test
+        head -n 2 $f | xargs -n 1 -- echo "$fields"
+      else
+        cat $f | xargs -n 1 -- echo "$fields"
+      fi
+    done
   done
 }
 
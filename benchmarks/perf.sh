@@ -344,6 +344,7 @@ build-stress-test() {
     -O2 -g \
     -o _tmp/gc_stress_test \
     mycpp/gc_stress_test.cc \
+    mycpp/alloc_profile.cc \
     mycpp/mark_sweep_heap.cc \
     mycpp/gc_builtins.cc \
     mycpp/gc_mylib.cc \
@@ -134,7 +134,8 @@ def _PrintVariables(mem, cmd_val, attrs, print_flags, builtin=_OTHER):
         if flag_x == '+' and cell.exported:
             continue
 
-        if flag_a and val.tag() != value_e.BashArray:
+        if flag_a and val.tag() not in (value_e.BashArray,
+                                        value_e.SparseArray):
             continue
         if flag_A and val.tag() != value_e.BashAssoc:
             continue
@@ -148,7 +149,7 @@ def _PrintVariables(mem, cmd_val, attrs, print_flags, builtin=_OTHER):
                 flags.append('r')
             if cell.exported:
                 flags.append('x')
-            if val.tag() == value_e.BashArray:
+            if val.tag() in (value_e.BashArray, value_e.SparseArray):
                 flags.append('a')
             elif val.tag() == value_e.BashAssoc:
                 flags.append('A')
@@ -159,6 +160,12 @@ def _PrintVariables(mem, cmd_val, attrs, print_flags, builtin=_OTHER):
         else:
             decl.append(name)
 
+        if val.tag() == value_e.SparseArray:
+            sparse_val = cast(value.SparseArray, val)
+            n = len(sparse_val.indices)
+            if n == 0 or sparse_val.indices[n - 1] == n - 1:
+                val = state.SparseToDense(sparse_val)  # it has no holes
+
         if val.tag() == value_e.Str:
             str_val = cast(value.Str, val)
             decl.extend(["=", qsn.maybe_shell_encode(str_val.s)])
@@ -196,6 +203,17 @@ def _PrintVariables(mem, cmd_val, attrs, print_flags, builtin=_OTHER):
                     body.append(qsn.maybe_shell_encode(element))
                 decl.extend(["=(", ''.join(body), ")"])
 
+        elif val.tag() == value_e.SparseArray:
+            sparse_val = cast(value.SparseArray, val)
+            # Printed like an array with holes
+            decl.append("=();")
+            for i, index in enumerate(sparse_val.indices):
+                decl.extend([
+                    " ", name, "[",
+                    str(index), "]=",
+                    qsn.maybe_shell_encode(sparse_val.strs[i])
+                ])
+
         elif val.tag() == value_e.BashAssoc:
             assoc_val = cast(value.BashAssoc, val)
             body = []
@@ -448,7 +466,8 @@ class NewVar(vm._AssignBuiltin):
             if rval is None and (arg.a or arg.A):
                 old_val = self.mem.GetValue(pair.var_name)
                 if arg.a:
-                    if old_val.tag() != value_e.BashArray:
+                    if old_val.tag() not in (value_e.BashArray,
+                                             value_e.SparseArray):
                         rval = value.BashArray([])
                 elif arg.A:
                     if old_val.tag() != value_e.BashAssoc:
@@ -5,8 +5,11 @@ builtin/io_ysh.py - YSH builtins that perform I/O
 from __future__ import print_function
 
 from _devbuild.gen import arg_types
-from _devbuild.gen.runtime_asdl import value, cmd_value
+from _devbuild.gen.hnode_asdl import hnode, hnode_t, color_e, Field
+from _devbuild.gen.runtime_asdl import value, value_e, cmd_value
 from _devbuild.gen.syntax_asdl import command_e, BraceGroup, loc
+from asdl import format as fmt
+from asdl.runtime import NewRecord, NewLeaf
 from core import error
 from core.error import e_usage
 from core import state
@@ -19,15 +22,38 @@ from mycpp.mylib import log, Stdout
 from data_lang import qsn
 from data_lang import j8
 
-from typing import TYPE_CHECKING, cast, Dict
+from typing import TYPE_CHECKING, cast, Dict, List
 if TYPE_CHECKING:
     from core.alloc import Arena
     from core.ui import ErrorFormatter
+    from core.util import LruIndex
     from osh import cmd_eval
 
 _ = log
 
 
+def _SparseArrayTree(val):
+    # type: (value.SparseArray) -> hnode_t
+    """Show a SparseArray like a BashArray with holes, without allocating
+    every hole.  A run of more than 3 holes is shown as _xN."""
+    strs = hnode.Array([])
+    last = -1
+    for i, index in enumerate(val.indices):
+        num_holes = index - last - 1
+        if num_holes > 3:
+            strs.children.append(
+                hnode.Leaf('_x%d' % num_holes, color_e.OtherConst))
+        else:
+            for j in xrange(num_holes):
+                strs.children.append(NewLeaf(None, color_e.OtherConst))
+        strs.children.append(NewLeaf(val.strs[i], color_e.StringConst))
+        last = index
+
+    out_node = NewRecord('value.BashArray')
+    out_node.fields.append(Field('strs', strs))
+    return out_node
+
+
 class _Builtin(vm._Builtin):
 
     def __init__(self, mem, errfmt):
@@ -42,11 +68,12 @@ class Pp(_Builtin):
     'pp cell a' is a lot easier to type than 'argv.py "${a[@]}"'.
     """
 
-    def __init__(self, mem, errfmt, procs, arena):
-        # type: (state.Mem, ErrorFormatter, Dict[str, value.Proc], Arena) -> None
+    def __init__(self, mem, errfmt, procs, arena, caches):
+        # type: (state.Mem, ErrorFormatter, Dict[str, value.Proc], Arena, List[LruIndex]) -> None
         _Builtin.__init__(self, mem, errfmt)
         self.procs = procs
         self.arena = arena
+        self.caches = caches
         self.stdout_ = Stdout()
 
     def Run(self, cmd_val):
@@ -78,7 +105,16 @@ class Pp(_Builtin):
                 else:
                     self.stdout_.write('%s = ' % name)
                     if mylib.PYTHON:
-                        cell.PrettyPrint()  # may be color
+                        tree = cell.AbbreviatedTree()
+                        if cell.val.tag() == value_e.SparseArray:
+                            # Users see the same thing as for BashArray
+                            sparse_val = cast(value.SparseArray, cell.val)
+                            rec = cast(hnode.Record, tree)
+                            for field in rec.fields:
+                                if field.name == 'val':
+                                    field.val = _SparseArrayTree(sparse_val)
+                        ast_f = fmt.DetectConsoleOutput(self.stdout_)
+                        fmt.PrintTree(tree, ast_f)  # may be color
 
                     self.stdout_.write('\n')
 
@@ -117,6 +153,15 @@ class Pp(_Builtin):
 
             status = 0
 
+        elif action == '.cache':
+            # QTSV header
+            print('name\tsize\tmax_size\thits\tmisses\tevictions')
+            for lru in self.caches:
+                print('%s\t%d\t%d\t%d\t%d\t%d' %
+                      (qsn.maybe_encode(lru.name), lru.Size(), lru.max_size,
+                       lru.num_hits, lru.num_misses, lru.num_evictions))
+            status = 0
+
         else:
             e_usage('got invalid action %r' % action, action_loc)
 
@@ -28,8 +28,9 @@ _ = log
 
 from typing import Dict, List, Tuple, Optional, TYPE_CHECKING
 if TYPE_CHECKING:
+    from _devbuild.gen.syntax_asdl import command_t
     from frontend import args
-    from frontend.parse_lib import ParseContext
+    from frontend.parse_lib import ParseContext, ParseCache
     from core import optview
     from core import ui
     from osh.cmd_eval import CommandEvaluator
@@ -45,6 +46,7 @@ class Eval(vm._Builtin):
             cmd_ev,  # type: CommandEvaluator
             tracer,  # type: dev.Tracer
             errfmt,  # type: ui.ErrorFormatter
+            parse_cache,  # type: ParseCache
     ):
         # type: (...) -> None
         self.parse_ctx = parse_ctx
@@ -53,6 +55,7 @@ class Eval(vm._Builtin):
         self.cmd_ev = cmd_ev
         self.tracer = tracer
         self.errfmt = errfmt
+        self.parse_cache = parse_cache
 
     def Run(self, cmd_val):
         # type: (cmd_value.Argv) -> int
@@ -75,16 +78,32 @@ class Eval(vm._Builtin):
             # code_str could be EMPTY, so just use the first one
             eval_loc = cmd_val.arg_locs[0]
 
+        src = source.ArgvWord('eval', eval_loc)
+
+        # eval "$name=\$value" in a loop only parses once
+        cached = self.parse_cache.Get(code_str, src)
+        if cached is not None:
+            with dev.ctx_Tracer(self.tracer, 'eval', None):
+                return main_loop.RunParsed(self.cmd_ev,
+                                           cached,
+                                           cmd_flags=cmd_eval.RaiseControlFlow)
+
         line_reader = reader.StringLineReader(code_str, self.arena)
         c_parser = self.parse_ctx.MakeOshParser(line_reader)
 
-        src = source.ArgvWord('eval', eval_loc)
+        stamp = self.parse_cache.Stamp()
+        nodes = []  # type: List[command_t]
         with dev.ctx_Tracer(self.tracer, 'eval', None):
             with alloc.ctx_SourceCode(self.arena, src):
-                return main_loop.Batch(self.cmd_ev,
-                                       c_parser,
-                                       self.errfmt,
-                                       cmd_flags=cmd_eval.RaiseControlFlow)
+                status, done = main_loop.BatchAndSave(
+                    self.cmd_ev,
+                    c_parser,
+                    self.errfmt,
+                    nodes,
+                    cmd_flags=cmd_eval.RaiseControlFlow)
+        if done:
+            self.parse_cache.Put(code_str, src, nodes, stamp)
+        return status
 
 
 class Source(vm._Builtin):
@@ -24,6 +24,7 @@ from core import alloc
 from core import error
 from core.error import e_die, p_die
 from core import state
+from core import util
 from core import vm
 from frontend import flag_spec
 from frontend import consts
@@ -170,6 +171,7 @@ class Printf(vm._Builtin):
         self.unsafe_arith = unsafe_arith
         self.errfmt = errfmt
         self.parse_cache = {}  # type: Dict[str, List[printf_part_t]]
+        self.parse_lru = util.LruIndex('printf', 64)
 
         self.shell_start_time = time_.time(
         )  # this object initialized in main()
@@ -469,7 +471,9 @@ class Printf(vm._Builtin):
         arena = self.parse_ctx.arena
         if fmt in self.parse_cache:
             parts = self.parse_cache[fmt]
+            self.parse_lru.Hit(fmt)
         else:
+            self.parse_lru.Miss()
             line_reader = reader.StringLineReader(fmt, arena)
             # TODO: Make public
             lexer = self.parse_ctx.MakeLexer(line_reader)
@@ -483,6 +487,9 @@ class Printf(vm._Builtin):
                     self.errfmt.PrettyPrintError(e)
                     return 2  # parse error
 
+            evicted = self.parse_lru.Add(fmt)
+            if evicted is not None:
+                mylib.dict_erase(self.parse_cache, evicted)
             self.parse_cache[fmt] = parts
 
         if 0:
@@ -6,16 +6,23 @@ This is sort of the opposite of builtin_pure.py.
 """
 from __future__ import print_function
 
-from signal import SIGCONT
+from errno import EINTR
+from signal import SIGCONT, SIGTERM
 
 from _devbuild.gen import arg_types
 from _devbuild.gen.syntax_asdl import loc
-from _devbuild.gen.runtime_asdl import cmd_value, job_state_e, wait_status, wait_status_e
+from _devbuild.gen.runtime_asdl import (cmd_value, job_state_e, wait_status,
+                                        wait_status_e, trace, CommandStatus)
 from core import dev
 from core import error
 from core.error import e_usage, e_die_status
 from core import process  # W1_OK, W1_ECHILD
+from core import pyos
+from core import pyutil
+from core import util
 from core import vm
+from data_lang import qsn
+from mycpp import mylib
 from mycpp.mylib import log, tagswitch, print_stderr
 from frontend import flag_spec
 from frontend import typed_args
@@ -24,6 +31,7 @@ import posix_ as posix
 
 from typing import TYPE_CHECKING, List, Optional, cast
 if TYPE_CHECKING:
+    from builtin.trap_osh import TrapState
     from core.process import Waiter, ExternalProgram, FdState
     from core.state import Mem, SearchPath
     from core.ui import ErrorFormatter
@@ -49,6 +57,10 @@ class Jobs(vm._Builtin):
         else:
             style = process.STYLE_DEFAULT
 
+        if arg.rusage:
+            self.job_list.DisplayUsage()
+            return 0
+
         self.job_list.DisplayJobs(style)
 
         if arg.debug:
@@ -174,6 +186,224 @@ class ForkWait(vm._Builtin):
         return self.shell_ex.RunSubshell(cmd)
 
 
+class _ParThunk(process.Thunk):
+    """Runs the command for one item of 'par', in a child process."""
+
+    def __init__(self, shell_ex, cmd_val, trap_state, errfmt):
+        # type: (vm._Executor, cmd_value.Argv, TrapState, ErrorFormatter) -> None
+        process.Thunk.__init__(self)
+        self.shell_ex = shell_ex
+        self.cmd_val = cmd_val
+        self.trap_state = trap_state
+        self.errfmt = errfmt
+
+    def UserString(self):
+        # type: () -> str
+        tmp = [qsn.maybe_shell_encode(a) for a in self.cmd_val.argv]
+        return '[par] %s' % ' '.join(tmp)
+
+    def Run(self):
+        # type: () -> None
+
+        # signal handlers aren't inherited
+        self.trap_state.ClearForSubProgram()
+
+        # Like SubProgramThunk, but for an argv rather than a command node.
+        # External commands replace this process with exec().
+        cmd_st = CommandStatus.CreateNull(alloc_lists=True)
+        try:
+            status = self.shell_ex.RunSimpleCommand(self.cmd_val, cmd_st,
+                                                    False)
+        except util.UserExit as e:
+            status = e.status
+        except error.FatalRuntime as e:
+            self.errfmt.PrettyPrintError(e)
+            status = e.ExitStatus()
+        except KeyboardInterrupt:
+            print('')
+            status = 130  # 128 + 2
+        except (IOError, OSError) as e:
+            print_stderr('osh I/O error (par): %s' % pyutil.strerror(e))
+            status = 2
+
+        pyos.FlushStdout()
+        posix._exit(status)
+
+
+def _ReadAll(fd):
+    # type: (int) -> str
+    chunks = []  # type: List[str]
+    while True:
+        n, err_num = pyos.Read(fd, 4096, chunks)
+        if n < 0:
+            if err_num == EINTR:
+                continue
+            e_die_status(2, 'osh I/O error (read): %s' % posix.strerror(err_num))
+        elif n == 0:  # EOF
+            break
+    return ''.join(chunks)
+
+
+# Used when -j isn't passed
+_DEFAULT_MAX_JOBS = 4
+
+
+class Par(vm._Builtin):
+    """Run a command once for each item, with at most N at a time.
+
+    par -j 8 build-one a b c    # build-one a; build-one b; ...
+
+    This is the "keep N children running" loop that scripts write by hand
+    with & and 'wait -n'.  The first failure cancels the remaining items,
+    unless --keep-going is passed.
+    """
+
+    def __init__(self, shell_ex, waiter, job_control, job_list, trap_state,
+                 tracer, errfmt):
+        # type: (vm._Executor, Waiter, process.JobControl, process.JobList, TrapState, dev.Tracer, ErrorFormatter) -> None
+        self.shell_ex = shell_ex
+        self.waiter = waiter
+        self.job_control = job_control
+        self.job_list = job_list
+        self.trap_state = trap_state
+        self.tracer = tracer
+        self.errfmt = errfmt
+
+    def Run(self, cmd_val):
+        # type: (cmd_value.Argv) -> int
+        attrs, arg_r = flag_spec.ParseCmdVal('par', cmd_val)
+        arg = arg_types.par(attrs.attrs)
+
+        max_jobs = _DEFAULT_MAX_JOBS if arg.j == -1 else arg.j
+        if max_jobs < 1:
+            e_usage('expected -j to be at least 1', loc.Missing)
+
+        cmd, cmd_loc = arg_r.ReadRequired2('expected a command')
+        items, item_locs = arg_r.Rest2()
+
+        procs = []  # type: List[process.Process]
+        for i, item in enumerate(items):
+            argv = [cmd, item]
+            locs = [cmd_loc, item_locs[i]]
+            c = cmd_value.Argv(argv, locs, None, None, None)
+            thunk = _ParThunk(self.shell_ex, c, self.trap_state, self.errfmt)
+            p = process.Process(thunk, self.job_control, self.job_list,
+                                self.tracer)
+            procs.append(p)
+
+        with dev.ctx_Tracer(self.tracer, 'par', cmd_val.argv):
+            if arg.k:
+                return self._RunInOrder(procs, items, max_jobs,
+                                        arg.keep_going)
+            else:
+                return self._RunAsCompleted(procs, items, max_jobs,
+                                            arg.keep_going)
+
+    def _Start(self, p, r=-1, w=-1):
+        # type: (process.Process, int, int) -> None
+        if r != -1:
+            p.AddStateChange(process.StdoutToPipe(r, w))
+        # Like command subs, the children stay in the shell's process group, so
+        # Ctrl-C reaches them.
+        p.StartProcess(trace.Fork)
+        if w != -1:
+            posix.close(w)  # so we get EOF when the child exits
+
+    def _Failed(self, item, status):
+        # type: (str, int) -> None
+        self.errfmt.PrintMessage('par: item %s failed with status %d' %
+                                 (qsn.maybe_shell_encode(item), status))
+
+    def _Cancel(self, procs):
+        # type: (List[process.Process]) -> None
+        """Stop the processes that are still running, and reap them."""
+        for p in procs:
+            if p.pid != -1 and p.state == job_state_e.Running:
+                posix.kill(p.pid, SIGTERM)
+        for p in procs:
+            if p.pid != -1:
+                p.Wait(self.waiter)
+
+    def _RunAsCompleted(self, procs, items, max_jobs, keep_going):
+        # type: (List[process.Process], List[str], int, bool) -> int
+        """Children write to our stdout directly, so output is interleaved."""
+        status = 0
+        next_i = 0
+        running = []  # type: List[int]  # indices into procs
+
+        while next_i < len(procs) or len(running):
+            while len(running) < max_jobs and next_i < len(procs):
+                self._Start(procs[next_i])
+                running.append(next_i)
+                next_i += 1
+
+            result = self.waiter.WaitForOne()
+            if result == process.W1_ECHILD:
+                break  # shouldn't happen
+            if result >= 0:  # signal
+                self._Cancel(procs[:next_i])
+                return 128 + result
+
+            still_running = []  # type: List[int]
+            for i in running:
+                p = procs[i]
+                if p.state == job_state_e.Running:
+                    still_running.append(i)
+                elif p.status != 0:
+                    self._Failed(items[i], p.status)
+                    if status == 0:
+                        status = p.status
+            running = still_running
+
+            if status != 0 and not keep_going:
+                self._Cancel(procs[:next_i])
+                break
+
+        return status
+
+    def _RunInOrder(self, procs, items, max_jobs, keep_going):
+        # type: (List[process.Process], List[str], int, bool) -> int
+        """Each child writes to a pipe, and we copy its output to stdout in
+        the order of the items.
+
+        At most max_jobs items are started ahead of the one we're copying.
+        Items after it may block on a full pipe until we get to them.
+        """
+        status = 0
+        next_i = 0
+        pipes = []  # type: List[int]  # read end for each started item
+        stdout = mylib.Stdout()
+
+        for out_i, p in enumerate(procs):
+            while next_i < len(procs) and next_i - out_i < max_jobs:
+                r, w = posix.pipe()
+                self._Start(procs[next_i], r, w)
+                pipes.append(r)
+                next_i += 1
+
+            r = pipes[out_i]
+            s = _ReadAll(r)
+            posix.close(r)
+
+            stdout.write(s)
+            # Flush before the next fork(), or the children would inherit our
+            # buffer
+            stdout.flush()
+
+            st = p.Wait(self.waiter)
+            if st != 0:
+                self._Failed(items[out_i], st)
+                if status == 0:
+                    status = st
+                if not keep_going:
+                    for r in pipes[out_i + 1:]:
+                        posix.close(r)
+                    self._Cancel(procs[out_i + 1:next_i])
+                    break
+
+        return status
+
+
 class Exec(vm._Builtin):
 
     def __init__(self, mem, ext_prog, fd_state, search_path, errfmt):
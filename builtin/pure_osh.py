@@ -31,6 +31,7 @@ from typing import List, Dict, Tuple, Optional, TYPE_CHECKING
 if TYPE_CHECKING:
     from _devbuild.gen.runtime_asdl import cmd_value
     from core.state import MutableOpts, Mem, SearchPath
+    from frontend.parse_lib import ParseCache
     from osh.cmd_eval import CommandEvaluator
 
 _ = log
@@ -53,9 +54,10 @@ class Boolean(vm._Builtin):
 
 class Alias(vm._Builtin):
 
-    def __init__(self, aliases, errfmt):
-        # type: (Dict[str, str], ui.ErrorFormatter) -> None
+    def __init__(self, aliases, parse_cache, errfmt):
+        # type: (Dict[str, str], ParseCache, ui.ErrorFormatter) -> None
         self.aliases = aliases
+        self.parse_cache = parse_cache  # cleared when aliases change
         self.errfmt = errfmt
 
     def Run(self, cmd_val):
@@ -83,6 +85,7 @@ class Alias(vm._Builtin):
                     print('alias %s=%r' % (name, alias_exp))
             else:
                 self.aliases[name] = alias_exp
+                self.parse_cache.Clear()
 
         #print(argv)
         #log('AFTER ALIAS %s', aliases)
@@ -91,9 +94,10 @@ class Alias(vm._Builtin):
 
 class UnAlias(vm._Builtin):
 
-    def __init__(self, aliases, errfmt):
-        # type: (Dict[str, str], ui.ErrorFormatter) -> None
+    def __init__(self, aliases, parse_cache, errfmt):
+        # type: (Dict[str, str], ParseCache, ui.ErrorFormatter) -> None
         self.aliases = aliases
+        self.parse_cache = parse_cache  # cleared when aliases change
         self.errfmt = errfmt
 
     def Run(self, cmd_val):
@@ -108,6 +112,7 @@ class UnAlias(vm._Builtin):
         for i, name in enumerate(argv):
             if name in self.aliases:
                 mylib.dict_erase(self.aliases, name)
+                self.parse_cache.Clear()
             else:
                 self.errfmt.Print_('No alias named %r' % name,
                                    blame_loc=cmd_val.arg_locs[i])
@@ -159,6 +159,13 @@ class Append(vm._Builtin):
             if case(value_e.BashArray):
                 val = cast(value.BashArray, UP_val)
                 val.strs.extend(arg_r.Rest())
+            elif case(value_e.SparseArray):
+                val = cast(value.SparseArray, UP_val)
+                index = val.indices[-1] + 1 if len(val.indices) else 0
+                for s in arg_r.Rest():
+                    val.indices.append(index)
+                    val.strs.append(s)
+                    index += 1
             elif case(value_e.List):
                 val = cast(value.List, UP_val)
                 typed = [value.Str(s)
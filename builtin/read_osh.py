@@ -1,13 +1,14 @@
 from __future__ import print_function
 
 from errno import EINTR
+import time as time_
 
 from _devbuild.gen import arg_types
 from _devbuild.gen.runtime_asdl import (span_e, cmd_value, value, scope_e)
 from _devbuild.gen.syntax_asdl import source, loc
 from core import alloc
 from core import error
-from core.error import e_usage, e_die
+from core.error import e_usage
 from core import pyos
 from core import pyutil
 from core import state
@@ -385,10 +386,10 @@ class Read(vm._Builtin):
             e_usage('--qsn not implemented yet', loc.Missing)
 
         if arg.t >= 0.0:
-            if arg.t != 0.0:
-                e_die("read -t isn't implemented (except t=0)")
-            else:
+            if arg.t == 0.0:
                 return 0 if pyos.InputAvailable(STDIN_FILENO) else 1
+            if not self._WaitForInput(arg.t):
+                return 142  # like bash, 128 + SIGALRM
 
         bits = 0
         if self.stdin_.isatty():
@@ -408,6 +409,28 @@ class Read(vm._Builtin):
                 status = self._Read(arg, names)
         return status
 
+    def _WaitForInput(self, timeout):
+        # type: (float) -> bool
+        """Wait up to 'timeout' seconds for stdin to be readable.
+
+        Like a blocking read(), run traps when a signal arrives, then keep
+        waiting.
+        """
+        pyos.InitWakeupPipe()
+
+        deadline = time_.time() + timeout
+        while True:
+            timeout_ms = int((deadline - time_.time()) * 1000)
+            if timeout_ms < 0:
+                timeout_ms = 0
+
+            event = pyos.WaitForWakeup(STDIN_FILENO, timeout_ms)
+            if event == pyos.WAKE_READABLE:
+                return True
+            if event == pyos.WAKE_TIMEOUT:
+                return False
+            self.cmd_ev.RunPendingTraps()
+
     def _Read(self, arg, names):
         # type: (arg_types.read, List[str]) -> int
 
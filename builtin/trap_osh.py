@@ -2,7 +2,7 @@
 """Builtin_trap.py."""
 from __future__ import print_function
 
-from signal import SIG_DFL, SIGINT, SIGKILL, SIGSTOP, SIGWINCH
+from signal import SIG_DFL, SIGCHLD, SIGINT, SIGKILL, SIGSTOP, SIGWINCH
 
 from _devbuild.gen import arg_types
 from _devbuild.gen.runtime_asdl import cmd_value
@@ -24,7 +24,7 @@ from typing import Dict, List, Optional, TYPE_CHECKING
 if TYPE_CHECKING:
     from _devbuild.gen.syntax_asdl import command_t
     from core.ui import ErrorFormatter
-    from frontend.parse_lib import ParseContext
+    from frontend.parse_lib import ParseContext, ParseCache
 
 _ = log
 
@@ -95,6 +95,9 @@ class TrapState(object):
             pass
         elif sig_num == SIGWINCH:
             self.signal_safe.SetSigWinchCode(pyos.UNTRAPPED_SIGWINCH)
+        elif sig_num == SIGCHLD:
+            # shopt -s event_wait may still need to be woken up
+            pyos.ResetSigChld()
         else:
             pyos.Sigaction(sig_num, SIG_DFL)
 
@@ -157,11 +160,19 @@ _HOOK_NAMES = ['EXIT', 'ERR', 'RETURN', 'DEBUG']
 
 class Trap(vm._Builtin):
 
-    def __init__(self, trap_state, parse_ctx, tracer, errfmt):
-        # type: (TrapState, ParseContext, dev.Tracer, ErrorFormatter) -> None
+    def __init__(
+            self,
+            trap_state,  # type: TrapState
+            parse_ctx,  # type: ParseContext
+            parse_cache,  # type: ParseCache
+            tracer,  # type: dev.Tracer
+            errfmt,  # type: ErrorFormatter
+    ):
+        # type: (...) -> None
         self.trap_state = trap_state
         self.parse_ctx = parse_ctx
         self.arena = parse_ctx.arena
+        self.parse_cache = parse_cache
         self.tracer = tracer
         self.errfmt = errfmt
 
@@ -171,11 +182,18 @@ class Trap(vm._Builtin):
     Returns:
       A node, or None if the code is invalid.
     """
+        # TODO: the SPID should be passed through argv.
+        src = source.ArgvWord('trap', loc.Missing)
+
+        # Scripts that set the same trap in a loop only parse it once
+        cached = self.parse_cache.Get(code_str, src)
+        if cached is not None:
+            return cached[0]
+
         line_reader = reader.StringLineReader(code_str, self.arena)
         c_parser = self.parse_ctx.MakeOshParser(line_reader)
 
-        # TODO: the SPID should be passed through argv.
-        src = source.ArgvWord('trap', loc.Missing)
+        stamp = self.parse_cache.Stamp()
         with alloc.ctx_SourceCode(self.arena, src):
             try:
                 node = main_loop.ParseWholeFile(c_parser)
@@ -183,6 +201,7 @@ class Trap(vm._Builtin):
                 self.errfmt.PrettyPrintError(e)
                 return None
 
+        self.parse_cache.Put(code_str, src, [node], stamp)
         return node
 
     def Run(self, cmd_val):
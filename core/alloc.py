@@ -105,6 +105,10 @@ class Arena(object):
 
         self.save_tokens = save_tokens
 
+        # The lexer leaves tok.tval unset, and lexer.TokenVal() computes it on
+        # demand.  osh -n prints tval, so it's computed up front there.
+        self.eager_tval = False
+
         # indexed by span_id
         self.tokens = []  # type: List[Token]
         self.num_tokens = 0
@@ -119,6 +123,10 @@ class Arena(object):
         # type: () -> None
         self.save_tokens = True
 
+    def EagerTokenValues(self):
+        # type: () -> None
+        self.eager_tval = True
+
     def PushSource(self, src):
         # type: (source_t) -> None
         self.source_instances.append(src)
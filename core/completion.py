@@ -47,6 +47,7 @@ from core import state
 from core import ui
 from core import util
 from frontend import consts
+from frontend import lexer
 from frontend import location
 from frontend import reader
 from mycpp import mylib
@@ -627,7 +628,11 @@ class ShellFuncAction(CompletionAction):
                          self.func.name)
             return
 
-        if val.tag() != value_e.BashArray:
+        if val.tag() == value_e.BashArray:
+            strs = cast(value.BashArray, val).strs
+        elif val.tag() == value_e.SparseArray:
+            strs = cast(value.SparseArray, val).strs
+        else:
             print_stderr('osh error: COMPREPLY should be an array, got %s' %
                          ui.ValType(val))
             return
@@ -635,8 +640,7 @@ class ShellFuncAction(CompletionAction):
         if 0:
             self.debug('> %r' % val)  # CRASHES in C++
 
-        array_val = cast(value.BashArray, val)
-        for s in array_val.strs:
+        for s in strs:
             #self.debug('> %r' % s)
             yield s
 
@@ -1051,7 +1055,7 @@ class RootCompleter(object):
                 # readline splits at ':' so we have to prepend '-$' to every completed
                 # variable name.
                 self.comp_ui_state.display_pos = t2.col + 1  # 1 for $
-                to_complete = t2.tval[1:]
+                to_complete = lexer.TokenSliceLeft(t2, 1)
                 n = len(to_complete)
                 for name in self.mem.VarNames():
                     if name.startswith(to_complete):
@@ -1062,7 +1066,7 @@ class RootCompleter(object):
             # echo ${P
             if t2.id == Id.VSub_Name and IsDummy(t1):
                 self.comp_ui_state.display_pos = t2.col  # no offset
-                to_complete = t2.tval
+                to_complete = lexer.TokenVal(t2)
                 n = len(to_complete)
                 for name in self.mem.VarNames():
                     if name.startswith(to_complete):
@@ -1073,7 +1077,7 @@ class RootCompleter(object):
             # echo $(( VAR
             if t2.id == Id.Lit_ArithVarLike and IsDummy(t1):
                 self.comp_ui_state.display_pos = t2.col  # no offset
-                to_complete = t2.tval
+                to_complete = lexer.TokenVal(t2)
                 n = len(to_complete)
                 for name in self.mem.VarNames():
                     if name.startswith(to_complete):
@@ -1098,7 +1102,7 @@ class RootCompleter(object):
                 # +1 for ~
                 self.comp_ui_state.display_pos = t2.col + 1
 
-                to_complete = t2.tval[1:]
+                to_complete = lexer.TokenSliceLeft(t2, 1)
                 n = len(to_complete)
                 for u in pyos.GetAllUsers():  # catch errors?
                     name = u.pw_name
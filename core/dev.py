@@ -11,24 +11,32 @@ from _devbuild.gen.syntax_asdl import assign_op_e, Token
 
 from core import error
 from core import optview
+from core import pyos
+from core import pyutil
 from core import state
 from core import ui
+from core import util
 from mycpp.mylib import log
 from frontend import location
 from osh import word_
 from data_lang import qsn
 from pylib import os_path
 from mycpp import mylib
-from mycpp.mylib import tagswitch, iteritems
+from mycpp.mylib import print_stderr, tagswitch, iteritems
 
 import yajl
 
+import fcntl as fcntl_
+from fcntl import F_DUPFD, F_SETFD, FD_CLOEXEC
 import posix_ as posix
+from posix_ import O_CREAT, O_TRUNC, O_WRONLY
 
 from typing import List, Dict, Optional, Any, cast, TYPE_CHECKING
 if TYPE_CHECKING:
-    from _devbuild.gen.syntax_asdl import assign_op_t, CompoundWord
-    from _devbuild.gen.runtime_asdl import sh_lvalue_t, value_t, scope_t
+    from _devbuild.gen.syntax_asdl import (assign_op_t, CompoundWord,
+                                           SourceLine)
+    from _devbuild.gen.runtime_asdl import (sh_lvalue_t, value_t, scope_t,
+                                            ResourceUsage)
     from core import alloc
     from core.error import _ErrorWithLocation
     from core.util import _DebugFile
@@ -154,6 +162,457 @@ class CrashDumper(object):
             log('[%d] Wrote crash dump to %s', my_pid, path)
 
 
+class StartupTrace(object):
+    """Shows how long each phase of shell startup took.
+
+    OILS_STARTUP_TRACE=1 osh -c true prints a line to stderr at the end of
+    each phase, so regressions in startup time are easy to spot.
+    """
+
+    def __init__(self, enabled):
+        # type: (bool) -> None
+        self.enabled = enabled
+        now = 0.0
+        if enabled:
+            now, _, _ = pyos.Time()
+        self.start = now
+        self.last = now
+
+    def Phase(self, name):
+        # type: (str) -> None
+        if not self.enabled:
+            return
+
+        now, _, _ = pyos.Time()
+        # Note: mycpp doesn't support %.3f, so show microseconds
+        print_stderr('[startup] %6d us  total %7d us  %s' %
+                     (int((now - self.last) * 1000000.0),
+                      int((now - self.start) * 1000000.0), name))
+        self.last = now
+
+
+class _ProfileEntry(object):
+    """Totals for one shell stack + source line."""
+
+    def __init__(self):
+        # type: () -> None
+        self.wall = 0.0
+        self.cpu = 0.0  # user + sys time of the shell itself
+        self.count = 0  # commands run
+        self.forks = 0
+        self.execs = 0
+        self.cmd_sub_bytes = 0
+
+
+class Profiler(object):
+    """Attributes time, forks, and command sub output to shell call stacks.
+
+    OILS_PROFILE=out.txt osh foo.sh writes a summary of the top lines and
+    frames to out.txt, and collapsed stacks for flamegraph.pl to
+    out.txt.folded.
+
+    The time between two commands is charged to the first one, so waiting for
+    an external process is charged to the line that started it.  Only the main
+    shell process is profiled, not subshells.
+    """
+
+    def __init__(self, path, top_n):
+        # type: (str, int) -> None
+        self.path = path
+        self.top_n = top_n
+
+        self.frames = ['main']
+        self.stack_key = 'main'
+        self.saved_lines = []  # type: List[str]
+
+        self.last_line = None  # type: SourceLine
+        self.line_key = '?'
+        self.key = 'main;?'  # stack_key;line_key
+        self.entries = {}  # type: Dict[str, _ProfileEntry]
+
+        now, utime, stime = pyos.Time()
+        self.last_wall = now
+        self.last_cpu = utime + stime
+
+    def _Entry(self):
+        # type: () -> _ProfileEntry
+        e = self.entries.get(self.key)
+        if e is None:
+            e = _ProfileEntry()
+            self.entries[self.key] = e
+        return e
+
+    def _Charge(self):
+        # type: () -> None
+        """Charge the time since the last call to the current key."""
+        now, utime, stime = pyos.Time()
+        cpu = utime + stime
+
+        e = self._Entry()
+        e.wall += now - self.last_wall
+        e.cpu += cpu - self.last_cpu
+
+        self.last_wall = now
+        self.last_cpu = cpu
+
+    def OnCommand(self, tok):
+        # type: (Token) -> None
+        self._Charge()
+
+        if tok.line is not self.last_line:
+            self.last_line = tok.line
+            # Flame graph frames can't contain ;
+            src = ui.GetLineSourceString(tok.line).replace(';', ',')
+            self.line_key = '%s:%d' % (src, tok.line.line_num)
+            self.key = '%s;%s' % (self.stack_key, self.line_key)
+
+        self._Entry().count += 1
+
+    def PushFrame(self, name):
+        # type: (str) -> None
+        self._Charge()
+
+        self.frames.append(name.replace(';', ','))
+        self.stack_key = ';'.join(self.frames)
+        self.saved_lines.append(self.line_key)
+        self.key = '%s;%s' % (self.stack_key, self.line_key)
+
+    def PopFrame(self):
+        # type: () -> None
+        self._Charge()
+
+        if len(self.saved_lines) == 0:
+            return  # shopt -s profile was run inside this frame
+
+        self.frames.pop()
+        self.stack_key = ';'.join(self.frames)
+        self.line_key = self.saved_lines.pop()
+        self.last_line = None
+        self.key = '%s;%s' % (self.stack_key, self.line_key)
+
+    def OnFork(self, is_exec):
+        # type: (bool) -> None
+        e = self._Entry()
+        e.forks += 1
+        if is_exec:
+            e.execs += 1
+
+    def OnExec(self):
+        # type: () -> None
+        self._Entry().execs += 1
+
+    def OnCommandSubRead(self, num_bytes):
+        # type: (int) -> None
+        self._Entry().cmd_sub_bytes += num_bytes
+
+    def _TopN(self, totals):
+        # type: (Dict[str, _ProfileEntry]) -> List[str]
+        """Return the keys with the most wall time, in descending order."""
+        chosen = {}  # type: Dict[str, bool]
+        result = []  # type: List[str]
+        for _ in xrange(self.top_n):
+            best = None  # type: Optional[str]
+            best_wall = -1.0
+            for key, e in iteritems(totals):
+                if key not in chosen and e.wall > best_wall:
+                    best = key
+                    best_wall = e.wall
+            if best is None:
+                break
+            chosen[best] = True
+            result.append(best)
+        return result
+
+    def _WriteTable(self, buf, title, totals):
+        # type: (mylib.BufWriter, str, Dict[str, _ProfileEntry]) -> None
+        buf.write('%s\n\n' % title)
+        buf.write(
+            '   wall_us     cpu_us    count  forks  execs  cmd_sub_bytes  where\n'
+        )
+        for key in self._TopN(totals):
+            e = totals[key]
+            buf.write('%10d %10d %8d %6d %6d %14d  %s\n' %
+                      (int(e.wall * 1000000.0), int(e.cpu * 1000000.0),
+                       e.count, e.forks, e.execs, e.cmd_sub_bytes, key))
+        buf.write('\n')
+
+    def _WriteFile(self, path, contents):
+        # type: (str, str) -> None
+        try:
+            fd = posix.open(path, O_CREAT | O_WRONLY | O_TRUNC, 0o666)
+            posix.write(fd, contents)
+            posix.close(fd)
+        except (IOError, OSError) as e:
+            print_stderr("osh: Couldn't write profile %r: %s" %
+                         (path, pyutil.strerror(e)))
+
+    def Dump(self):
+        # type: () -> None
+        """Write the summary and the collapsed stacks."""
+        self._Charge()
+
+        by_line = {}  # type: Dict[str, _ProfileEntry]
+        by_frame = {}  # type: Dict[str, _ProfileEntry]
+
+        folded = mylib.BufWriter()
+        for key, e in iteritems(self.entries):
+            us = int(e.wall * 1000000.0)
+            if us > 0:
+                folded.write('%s %d\n' % (key, us))
+
+            parts = key.split(';')
+            n = len(parts)
+
+            # Self time for each line
+            line_total = by_line.get(parts[n - 1])
+            if line_total is None:
+                line_total = _ProfileEntry()
+                by_line[parts[n - 1]] = line_total
+            _AddEntry(line_total, e)
+
+            # Inclusive time for each frame, counting recursive calls once
+            seen = {}  # type: Dict[str, bool]
+            for i in xrange(n - 1):
+                name = parts[i]
+                if name in seen:
+                    continue
+                seen[name] = True
+                frame_total = by_frame.get(name)
+                if frame_total is None:
+                    frame_total = _ProfileEntry()
+                    by_frame[name] = frame_total
+                _AddEntry(frame_total, e)
+
+        buf = mylib.BufWriter()
+        self._WriteTable(buf, 'Top lines by wall time (self)', by_line)
+        self._WriteTable(buf, 'Top procs and files by wall time (inclusive)',
+                         by_frame)
+
+        self._WriteFile(self.path, buf.getvalue())
+        self._WriteFile(self.path + '.folded', folded.getvalue())
+
+
+def _AddEntry(total, e):
+    # type: (_ProfileEntry, _ProfileEntry) -> None
+    total.wall += e.wall
+    total.cpu += e.cpu
+    total.count += e.count
+    total.forks += e.forks
+    total.execs += e.execs
+    total.cmd_sub_bytes += e.cmd_sub_bytes
+
+
+# Like process._SHELL_MIN_FD
+_TRACE_MIN_FD = 100
+
+_HEX_DIGITS = '0123456789abcdef'
+
+
+def _WriteJsonStr(s, buf):
+    # type: (str, mylib.BufWriter) -> None
+    """Write a JSON string.  Bytes >= 0x80 are written as is."""
+    buf.write('"')
+    for c in s:
+        if c == '"':
+            buf.write('\\"')
+        elif c == '\\':
+            buf.write('\\\\')
+        elif c == '\n':
+            buf.write('\\n')
+        elif ord(c) < 0x20:
+            b = ord(c)
+            # mycpp doesn't support %x
+            buf.write('\\u00%d%s' % (b >> 4, _HEX_DIGITS[b & 0xf]))
+        else:
+            buf.write(c)
+    buf.write('"')
+
+
+def _WriteJsonArgv(argv, buf):
+    # type: (List[str], mylib.BufWriter) -> None
+    buf.write('[')
+    for i, arg in enumerate(argv):
+        if i != 0:
+            buf.write(', ')
+        _WriteJsonStr(arg, buf)
+    buf.write(']')
+
+
+def _FormatSecs(secs):
+    # type: (float) -> str
+    """With microseconds.  Note: mycpp doesn't support %.6f."""
+    whole = int(secs)
+    return '%d.%06d' % (whole, int((secs - whole) * 1000000.0))
+
+
+class TraceStream(object):
+    """Writes timestamped events for each shell process as JSON lines.
+
+    OILS_TRACE_DIR=/tmp/t osh foo.sh makes each shell process write
+    /tmp/t/$PID.jsonl, including forked children.  Unlike xtrace_rich, events
+    don't evaluate PS4, so it's cheap enough for builds that start thousands
+    of processes.
+
+    devtools/trace_tree.py merges the files into a process tree.
+
+    Events have "t", "pid", and "ev" fields:
+
+      start      ppid            process started
+      cmd        argv, line      simple command started
+      cmd_end    status
+      push, pop  label, arg      proc, source, eval, trap, ...
+      fork       child, why      and argv if why is "command"
+      exec       argv            this process is replaced
+      wait       child, status
+      exit       status          main shell exits
+    """
+
+    def __init__(self, trace_dir):
+        # type: (str) -> None
+        self.trace_dir = trace_dir
+        self.fd = -1
+        self.pid = -1
+
+    def Open(self, pid, ppid):
+        # type: (int, int) -> None
+        """Open the file for the current process, closing the parent's."""
+        if self.fd != -1:
+            posix.close(self.fd)
+            self.fd = -1
+
+        path = '%s/%d.jsonl' % (self.trace_dir, pid)
+        try:
+            fd = posix.open(path, O_CREAT | O_WRONLY | O_TRUNC, 0o666)
+        except (IOError, OSError) as e:
+            print_stderr("osh: Couldn't open trace file %r: %s" %
+                         (path, pyutil.strerror(e)))
+            return
+
+        # Keep it out of the way of user fds 0-9, and of child processes
+        self.fd = fcntl_.fcntl(fd, F_DUPFD, _TRACE_MIN_FD)  # type: int
+        posix.close(fd)
+        fcntl_.fcntl(self.fd, F_SETFD, FD_CLOEXEC)
+
+        self.pid = pid
+        buf = self._Begin('start')
+        buf.write(', "ppid": %d' % ppid)
+        self._End(buf)
+
+    def _Begin(self, ev):
+        # type: (str) -> Optional[mylib.BufWriter]
+        if self.fd == -1:
+            return None
+
+        now, _, _ = pyos.Time()
+        buf = mylib.BufWriter()
+        buf.write('{"t": %s, "pid": %d, "ev": "%s"' %
+                  (_FormatSecs(now), self.pid, ev))
+        return buf
+
+    def _End(self, buf):
+        # type: (Optional[mylib.BufWriter]) -> None
+        if buf is None:
+            return
+        buf.write('}\n')
+        try:
+            # One write() per event, so a killed process leaves whole lines
+            posix.write(self.fd, buf.getvalue())
+        except (IOError, OSError) as e:
+            # Report the first failure, e.g. a full disk, and stop tracing
+            # this process
+            print_stderr("osh: Couldn't write trace file for PID %d: %s" %
+                         (self.pid, pyutil.strerror(e)))
+            posix.close(self.fd)
+            self.fd = -1
+
+    def OnCommand(self, argv, tok):
+        # type: (List[str], Optional[Token]) -> None
+        buf = self._Begin('cmd')
+        if buf is None:
+            return
+        buf.write(', "argv": ')
+        _WriteJsonArgv(argv, buf)
+        if tok is not None and tok.line is not None:
+            buf.write(', "line": ')
+            src = ui.GetLineSourceString(tok.line)
+            _WriteJsonStr('%s:%d' % (src, tok.line.line_num), buf)
+        self._End(buf)
+
+    def OnStatus(self, ev, status):
+        # type: (str, int) -> None
+        """For cmd_end and exit."""
+        buf = self._Begin(ev)
+        if buf is None:
+            return
+        buf.write(', "status": %d' % status)
+        self._End(buf)
+
+    def OnFrame(self, ev, label, arg):
+        # type: (str, str, Optional[str]) -> None
+        """For push and pop."""
+        buf = self._Begin(ev)
+        if buf is None:
+            return
+        buf.write(', "label": ')
+        _WriteJsonStr(label, buf)
+        if arg is not None:
+            buf.write(', "arg": ')
+            _WriteJsonStr(arg, buf)
+        self._End(buf)
+
+    def OnFork(self, pid, why):
+        # type: (int, trace_t) -> None
+        buf = self._Begin('fork')
+        if buf is None:
+            return
+        buf.write(', "child": %d, "why": ' % pid)
+
+        UP_why = why
+        with tagswitch(why) as case:
+            if case(trace_e.External):
+                why = cast(trace.External, UP_why)
+                buf.write('"command", "argv": ')
+                _WriteJsonArgv(why.argv, buf)
+            elif case(trace_e.ForkWait):
+                buf.write('"forkwait"')
+            elif case(trace_e.CommandSub):
+                buf.write('"command sub"')
+            elif case(trace_e.ProcessSub):
+                buf.write('"proc sub"')
+            elif case(trace_e.HereDoc):
+                buf.write('"here doc"')
+            elif case(trace_e.Fork):
+                buf.write('"fork"')
+            elif case(trace_e.PipelinePart):
+                buf.write('"part"')
+            else:
+                raise AssertionError()
+
+        self._End(buf)
+
+    def OnExec(self, argv):
+        # type: (List[str]) -> None
+        buf = self._Begin('exec')
+        if buf is None:
+            return
+        buf.write(', "argv": ')
+        _WriteJsonArgv(argv, buf)
+        self._End(buf)
+
+    def OnWait(self, pid, status, ru):
+        # type: (int, int, ResourceUsage) -> None
+        buf = self._Begin('wait')
+        if buf is None:
+            return
+        buf.write(', "child": %d, "status": %d' % (pid, status))
+        # From wait4()
+        buf.write(', "user": %s, "sys": %s' %
+                  (_FormatSecs(ru.user), _FormatSecs(ru.sys)))
+        buf.write(', "max_rss": %d, "vcsw": %d, "ivcsw": %d' %
+                  (ru.max_rss, ru.vol_switches, ru.invol_switches))
+        self._End(buf)
+
+
 class ctx_Tracer(object):
     """A stack for tracing synchronous constructs."""
 
@@ -198,6 +657,15 @@ def _PrintShValue(val, buf):
             parts.append(')')
             result = ' '.join(parts)
 
+        elif case(value_e.SparseArray):
+            val = cast(value.SparseArray, UP_val)
+            parts = ['(']
+            for i, index in enumerate(val.indices):
+                parts.append('[%d]=%s' %
+                             (index, qsn.maybe_shell_encode(val.strs[i])))
+            parts.append(')')
+            result = ' '.join(parts)
+
         elif case(value_e.BashAssoc):
             val = cast(value.BashAssoc, UP_val)
             parts = ['(']
@@ -225,9 +693,8 @@ class Tracer(object):
 
     See doc/xtrace.md for details.
 
-    - TODO: Connect it somehow to tracers for other processes.  So you can make
-      an HTML report offline.
-      - Could inherit SHX_*
+    - OILS_TRACE_DIR connects the tracers for each process, with TraceStream.
+      TODO: an HTML report.
 
     https://www.gnu.org/software/bash/manual/html_node/Bash-Variables.html#Bash-Variables
 
@@ -266,6 +733,7 @@ class Tracer(object):
 
         # PS4 value -> CompoundWord.  PS4 is scoped.
         self.parse_cache = {}  # type: Dict[str, CompoundWord]
+        self.parse_lru = util.LruIndex('ps4', 16)
 
         # Mutate objects to save allocations
         self.val_indent = value.Str('')
@@ -277,6 +745,15 @@ class Tracer(object):
         self.lval_punct = location.LName('SHX_punct')
         self.lval_pid_str = location.LName('SHX_pid_str')
 
+        # Created by the first command after shopt -s profile.  OILS_PROFILE
+        # sets the path.  Child processes clear the path, so they never profile.
+        self.profile_path = 'osh-profile.txt'
+        self.profiler = None  # type: Optional[Profiler]
+
+        # Set when OILS_TRACE_DIR is set
+        self.stream = None  # type: Optional[TraceStream]
+        self.cur_tok = None  # type: Optional[Token]  # for the stream
+
     def CheckCircularDeps(self):
         # type: () -> None
         assert self.word_ev is not None
@@ -294,6 +771,7 @@ class Tracer(object):
         # that is more or less harmless though.
         ps4_word = self.parse_cache.get(ps4)
         if ps4_word is None:
+            self.parse_lru.Miss()
             # We have to parse this at runtime.  PS4 should usually remain constant.
             w_parser = self.parse_ctx.MakeWordParserForPlugin(ps4)
 
@@ -303,7 +781,12 @@ class Tracer(object):
             except error.Parse as e:
                 ps4_word = word_.ErrorWord("<ERROR: Can't parse PS4: %s>" %
                                            e.UserErrorString())
+            evicted = self.parse_lru.Add(ps4)
+            if evicted is not None:
+                mylib.dict_erase(self.parse_cache, evicted)
             self.parse_cache[ps4] = ps4_word
+        else:
+            self.parse_lru.Hit(ps4)
 
         # Mutate objects to save allocations
         if self.exec_opts.xtrace_rich():
@@ -362,6 +845,11 @@ class Tracer(object):
 
     def OnProcessStart(self, pid, why):
         # type: (int, trace_t) -> None
+        if self.profiler:
+            self.profiler.OnFork(why.tag() == trace_e.External)
+        if self.stream:
+            self.stream.OnFork(pid, why)
+
         buf = self._RichTraceBegin('|')
         if not buf:
             return
@@ -398,8 +886,11 @@ class Tracer(object):
 
         self.f.write(buf.getvalue())
 
-    def OnProcessEnd(self, pid, status):
-        # type: (int, int) -> None
+    def OnProcessEnd(self, pid, status, ru):
+        # type: (int, int, ResourceUsage) -> None
+        if self.stream:
+            self.stream.OnWait(pid, status, ru)
+
         buf = self._RichTraceBegin(';')
         if not buf:
             return
@@ -414,9 +905,27 @@ class Tracer(object):
         self.val_pid_str.s = ' %d' % pid
         self._Inc()
 
+        self.profile_path = ''
+        self.profiler = None
+
+        if self.stream:
+            self.stream.Open(pid, posix.getppid())
+
     def PushMessage(self, label, argv):
         # type: (str, Optional[List[str]]) -> None
         """For synchronous constructs that aren't processes."""
+        if self.profiler or self.stream:
+            arg = None  # type: Optional[str]
+            if label == 'proc':
+                arg = argv[0]
+            elif label == 'source':
+                arg = argv[1]
+
+            if self.profiler:
+                self.profiler.PushFrame(arg if arg is not None else label)
+            if self.stream:
+                self.stream.OnFrame('push', label, arg)
+
         buf = self._RichTraceBegin('>')
         if buf:
             buf.write(label)
@@ -435,6 +944,11 @@ class Tracer(object):
     def PopMessage(self, label, arg):
         # type: (str, Optional[str]) -> None
         """For synchronous constructs that aren't processes."""
+        if self.profiler:
+            self.profiler.PopFrame()
+        if self.stream:
+            self.stream.OnFrame('pop', label, arg)
+
         self._Dec()
 
         buf = self._RichTraceBegin('<')
@@ -457,8 +971,17 @@ class Tracer(object):
         buf.write('\n')
         self.f.write(buf.getvalue())
 
-    def OnExec(self, argv):
-        # type: (List[str]) -> None
+    def OnExec(self, argv, forked=False):
+        # type: (List[str], bool) -> None
+        if self.profiler:  # this process is about to be replaced
+            self.profiler.OnExec()
+            self.profiler.Dump()
+        if self.stream:
+            self.stream.OnExec(argv)
+
+        if forked:  # the parent already traced '| command'
+            return
+
         buf = self._RichTraceBegin('.')
         if not buf:
             return
@@ -478,6 +1001,35 @@ class Tracer(object):
         _PrintArgv(argv, buf)
         self.f.write(buf.getvalue())
 
+    def OnCommand(self, tok):
+        # type: (Token) -> None
+        """Called before each command, for shopt -s profile."""
+        self.cur_tok = tok
+
+        if self.profiler is None:
+            if not self.exec_opts.profile() or len(self.profile_path) == 0:
+                return
+            self.profiler = Profiler(self.profile_path, 20)
+        self.profiler.OnCommand(tok)
+
+    def OnCommandSubRead(self, num_bytes):
+        # type: (int) -> None
+        if self.profiler:
+            self.profiler.OnCommandSubRead(num_bytes)
+
+    def OnSimpleCommandEnd(self, status):
+        # type: (int) -> None
+        if self.stream:
+            self.stream.OnStatus('cmd_end', status)
+
+    def OnShellExit(self, status):
+        # type: (int) -> None
+        """Called when the main shell exits."""
+        if self.profiler:
+            self.profiler.Dump()
+        if self.stream:
+            self.stream.OnStatus('exit', status)
+
     #
     # Shell Tracing That Begins with _ShTraceBegin
     #
@@ -488,6 +1040,9 @@ class Tracer(object):
 
         Called before we know if it's a builtin, external, or proc.
         """
+        if self.stream:
+            self.stream.OnCommand(argv, self.cur_tok)
+
         buf = self._ShTraceBegin()
         if not buf:
             return
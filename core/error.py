@@ -2,7 +2,7 @@
 from __future__ import print_function
 
 from _devbuild.gen.syntax_asdl import loc_e, loc_t, loc
-from _devbuild.gen.runtime_asdl import value_t, value_str
+from _devbuild.gen.runtime_asdl import value_e, value_t, value_str
 
 from typing import NoReturn
 
@@ -10,6 +10,8 @@ from typing import NoReturn
 def _ValType(val):
     # type: (value_t) -> str
     """Duplicate ui.ValType for now"""
+    if val.tag() == value_e.SparseArray:
+        return 'BashArray'
     return value_str(val.tag(), dot=False)
 
 
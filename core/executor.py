@@ -5,14 +5,24 @@ from errno import EINTR
 
 from _devbuild.gen.id_kind_asdl import Id
 from _devbuild.gen.option_asdl import builtin_i
-from _devbuild.gen.runtime_asdl import RedirValue, trace, value
+from _devbuild.gen.runtime_asdl import (RedirValue, redirect_arg, trace,
+                                        value, cmd_value, cmd_value_t)
 from _devbuild.gen.syntax_asdl import (
     command,
     command_e,
     CommandSub,
     CompoundWord,
+    DoubleQuoted,
+    BracedVarSub,
+    SimpleVarSub,
+    bracket_op_e,
+    suffix_op_e,
     loc,
     loc_t,
+    redir_loc,
+    word_e,
+    word_part_e,
+    word_part_t,
 )
 from builtin import hay_ysh
 from core import dev
@@ -20,22 +30,23 @@ from core import error
 from core import process
 from core.error import e_die, e_die_status
 from core import pyos
+from core import state
 from core import ui
 from core import vm
 from frontend import consts
 from frontend import lexer
-from mycpp.mylib import log
+from mycpp.mylib import log, tagswitch
+from osh import braces
+from osh import word_
 
 import posix_ as posix
 
-from typing import cast, Dict, List, Optional, TYPE_CHECKING
+from typing import cast, Dict, List, Optional, Tuple, TYPE_CHECKING
 if TYPE_CHECKING:
-    from _devbuild.gen.runtime_asdl import (cmd_value, CommandStatus,
-                                            StatusArray)
+    from _devbuild.gen.runtime_asdl import CommandStatus, StatusArray
     from _devbuild.gen.syntax_asdl import command_t
     from builtin import trap_osh
     from core import optview
-    from core import state
     from core.vm import _Builtin
 
 _ = log
@@ -50,9 +61,11 @@ class _ProcessSubFrame(object):
         # These objects appear unconditionally in the main loop, and aren't
         # commonly used, so we manually optimize [] into None.
 
-        self._to_wait = []  # type: List[process.Process]
+        self._to_wait = []  # type: List[Optional[process.Process]]
         self._to_close = []  # type: List[int]  # file descriptors
         self._locs = []  # type: List[loc_t]
+        # Status of process subs that ran in the shell, or -1
+        self._statuses = []  # type: List[int]
         self._modified = False
 
     def WasModified(self):
@@ -66,6 +79,17 @@ class _ProcessSubFrame(object):
         self._to_wait.append(p)
         self._to_close.append(fd)
         self._locs.append(status_loc)
+        self._statuses.append(-1)
+
+    def AppendDone(self, status, fd, status_loc):
+        # type: (int, int, loc_t) -> None
+        """For a process sub that already ran in the shell."""
+        self._modified = True
+
+        self._to_wait.append(None)
+        self._to_close.append(fd)
+        self._locs.append(status_loc)
+        self._statuses.append(status)
 
     def MaybeWaitOnProcessSubs(self, waiter, status_array):
         # type: (process.Waiter, StatusArray) -> None
@@ -78,7 +102,10 @@ class _ProcessSubFrame(object):
         locs = []  # type: List[loc_t]
         for i, p in enumerate(self._to_wait):
             #log('waiting for %s', p)
-            st = p.Wait(waiter)
+            if p is None:
+                st = self._statuses[i]
+            else:
+                st = p.Wait(waiter)
             codes.append(st)
             locs.append(self._locs[i])
 
@@ -86,6 +113,113 @@ class _ProcessSubFrame(object):
         status_array.locs = locs
 
 
+# Their values differ in a child process, or each time they're evaluated
+_DYNAMIC_VARS = {
+    'BASHPID': True,
+    'RANDOM': True,
+    'SRANDOM': True,
+    'SECONDS': True,
+    'EPOCHSECONDS': True,
+    'EPOCHREALTIME': True,
+    '!': True,
+}  # type: Dict[str, bool]
+
+# A pipe holds at least one page, even when Linux shrinks its buffer.  So
+# writing this much to a new pipe never blocks.
+_MAX_IN_SHELL_OUTPUT = 4096
+
+
+def _IsPureWordPart(UP_part):
+    # type: (word_part_t) -> bool
+    """Can this word part be evaluated without side effects?
+
+    Arithmetic, assignments like ${x=default}, and command subs are excluded,
+    as are vars like $BASHPID that would have a different value in a child.
+    """
+    with tagswitch(UP_part) as case:
+        if case(word_part_e.Literal, word_part_e.EscapedLiteral,
+                word_part_e.SingleQuoted):
+            return True
+
+        elif case(word_part_e.SimpleVarSub):
+            part0 = cast(SimpleVarSub, UP_part)
+            return part0.var_name not in _DYNAMIC_VARS
+
+        elif case(word_part_e.DoubleQuoted):
+            part = cast(DoubleQuoted, UP_part)
+            for p in part.parts:
+                if not _IsPureWordPart(p):
+                    return False
+            return True
+
+        elif case(word_part_e.BracedVarSub):
+            part2 = cast(BracedVarSub, UP_part)
+            if part2.var_name in _DYNAMIC_VARS:
+                return False
+            # ${!ref} and ${a[i]} may evaluate arithmetic
+            if part2.prefix_op and part2.prefix_op.id == Id.VSub_Bang:
+                return False
+            if (part2.bracket_op and
+                    part2.bracket_op.tag() != bracket_op_e.WholeArray):
+                return False
+            # ${x@Q} is OK, but not ${x=default}, ${x?error}, ${x:i:n}, etc.
+            if (part2.suffix_op and
+                    part2.suffix_op.tag() != suffix_op_e.Nullary):
+                return False
+            return True
+
+        else:
+            return False
+
+
+def _MaxOutputSize(builtin_id, argv):
+    # type: (int, List[str]) -> int
+    """Return an upper bound on the output of echo or printf, or -1.
+
+    Escapes like \\n and \\x41 only shrink the output.  For printf, we only
+    bound formats with %s %b %c %d %i %u %x %X %o and %%, so widths like %9s
+    and %q are unknown.
+    """
+    args = argv[1:]
+    if builtin_id == builtin_i.echo:
+        n = 1  # newline
+        for a in args:
+            n += len(a) + 1  # separator
+        return n
+
+    if len(args) == 0 or args[0].startswith('-'):
+        return -1  # printf -v or --
+    fmt = args[0]
+
+    num_specs = 0
+    i = 0
+    n = len(fmt)
+    while i < n:
+        if fmt[i] == '%':
+            if i + 1 == n:
+                return -1
+            c = fmt[i + 1]
+            if c in 'sbcdiuxXo':
+                num_specs += 1
+            elif c != '%':
+                return -1
+            i += 2
+        else:
+            i += 1
+
+    # The format is repeated until the args are used up
+    num_args = len(args) - 1
+    reps = 1
+    if num_specs != 0 and num_args > num_specs:
+        reps = (num_args + num_specs - 1) // num_specs
+
+    # An integer in octal has at most 22 digits, plus a sign
+    size = reps * len(fmt)
+    for a in args[1:]:
+        size += len(a) + 23
+    return size
+
+
 class ShellExecutor(vm._Executor):
     """An executor combined with the OSH language evaluators in osh/ to create
     a shell interpreter."""
@@ -177,6 +311,95 @@ class ShellExecutor(vm._Executor):
                             self.tracer)
         return p
 
+    def _InShellBuiltin(self, node):
+        # type: (command_t) -> int
+        """Can this pipeline stage or process sub run in the shell process?
+
+        Returns the builtin ID for 'echo' and 'printf' with words that have
+        no side effects, like printf '%s\\n' "${a[@]}".  Otherwise NO_INDEX.
+        """
+        if node.tag() != command_e.Simple:
+            return consts.NO_INDEX
+        simple = cast(command.Simple, node)
+
+        if (len(simple.more_env) or len(simple.redirects) or
+                len(simple.words) == 0):
+            return consts.NO_INDEX
+        if simple.typed_args is not None or simple.block is not None:
+            return consts.NO_INDEX
+
+        for w in simple.words:
+            if w.tag() != word_e.Compound:
+                return consts.NO_INDEX
+            for part in cast(CompoundWord, w).parts:
+                if not _IsPureWordPart(part):
+                    return consts.NO_INDEX
+
+        ok, arg0, _ = word_.StaticEval(simple.words[0])
+        if not ok or arg0 in self.procs:  # functions shadow builtins
+            return consts.NO_INDEX
+
+        builtin_id = consts.LookupNormalBuiltin(arg0)
+        if builtin_id not in (builtin_i.echo, builtin_i.printf):
+            return consts.NO_INDEX
+
+        # A child process would run the DEBUG trap first, and xtrace shows
+        # the process
+        if (self.exec_opts._running_hay() or self.exec_opts.xtrace() or
+                self.trap_state.GetHook('DEBUG') is not None):
+            return consts.NO_INDEX
+
+        return builtin_id
+
+    def _RunInShell(self, node, builtin_id):
+        # type: (command_t, int) -> Tuple[int, int, int]
+        """Run 'echo' or 'printf' in the shell, writing to a new pipe.
+
+        This saves a fork().  We only do it when the output fits in the pipe
+        buffer, so writing can't block.  Nothing can get SIGPIPE either, since
+        the shell holds the read end.
+
+        Returns:
+          (read fd, write fd, status).  If the read fd is -1, the caller
+          should fork a process instead, e.g. because a word failed to
+          evaluate, or the output may be large.  The child will report the
+          error, or write the output.
+        """
+        simple = cast(command.Simple, node)
+        val = None  # type: cmd_value_t
+        try:
+            words = braces.BraceExpandWords(simple.words)
+            val = self.cmd_ev.word_ev.EvalWordSequence2(words)
+        except error.FatalRuntime:
+            return -1, -1, 0
+        cmd_val = cast(cmd_value.Argv, val)
+
+        argv = cmd_val.argv
+        size = _MaxOutputSize(builtin_id, argv)
+        if size < 0 or size > _MAX_IN_SHELL_OUTPUT:
+            return -1, -1, 0
+
+        r, w = posix.pipe()
+
+        self.tracer.OnSimpleCommand(argv)
+        redir = RedirValue(Id.Redir_GreatAnd, loc.Missing, redir_loc.Fd(1),
+                           redirect_arg.CopyFd(w))
+        if not self.PushRedirects([redir]):
+            posix.close(r)
+            posix.close(w)
+            return -1, -1, 0
+        status = 0
+        with vm.ctx_Redirect(self, 1):
+            try:
+                status = self.RunBuiltin(builtin_id, cmd_val)
+            except error.FatalRuntime as e:
+                # Like ExecuteAndCatch() in a child process
+                self.errfmt.PrettyPrintError(e)
+                status = e.ExitStatus()
+        self.tracer.OnSimpleCommandEnd(status)
+
+        return r, w, status
+
     def RunBuiltin(self, builtin_id, cmd_val):
         # type: (int, cmd_value.Argv) -> int
         """Run a builtin.
@@ -307,8 +530,8 @@ class ShellExecutor(vm._Executor):
 
         # Normal case: ls /
         if do_fork:
-            thunk = process.ExternalThunk(self.ext_prog, argv0_path, cmd_val,
-                                          environ)
+            thunk = process.ExternalThunk(self.ext_prog, self.tracer,
+                                          argv0_path, cmd_val, environ)
             p = process.Process(thunk, self.job_control, self.job_list,
                                 self.tracer)
             if self.job_control.Enabled():
@@ -385,16 +608,43 @@ class ShellExecutor(vm._Executor):
     def RunPipeline(self, node, status_out):
         # type: (command.Pipeline, CommandStatus) -> None
 
+        # initialized with CommandStatus.CreateNull()
+        pipe_locs = []  # type: List[loc_t]
+        n = len(node.children)
+
+        # printf '%s\n' "${a[@]}" | sort may run printf in THIS PROCESS
+        first = 0
+        first_r = -1
+        first_w = -1
+        first_status = 0
+        builtin_id = self._InShellBuiltin(node.children[0])
+        if builtin_id != consts.NO_INDEX:
+            first_r, first_w, first_status = self._RunInShell(
+                node.children[0], builtin_id)
+            if first_r != -1:
+                pipe_locs.append(loc.Command(node.children[0]))
+                first = 1
+
+        last_child = node.children[n - 1]
+
+        if first == n - 1:  # echo foo | wc -l needs no Pipeline
+            posix.close(first_w)
+            with dev.ctx_Tracer(self.tracer, 'pipeline', None):
+                with process.ctx_Pipe(self.fd_state, first_r):
+                    self.cmd_ev.ExecuteAndCatch(last_child)
+            posix.close(first_r)
+
+            pipe_locs.append(loc.Command(last_child))
+            status_out.pipe_status = [first_status, self.cmd_ev.LastStatus()]
+            status_out.pipe_locs = pipe_locs
+            return
+
         pi = process.Pipeline(self.exec_opts.sigpipe_status_ok(),
                               self.job_control, self.job_list)
         #self.job_list.AddPipeline(pi)
 
-        # initialized with CommandStatus.CreateNull()
-        pipe_locs = []  # type: List[loc_t]
-
-        # First n-1 processes (which is empty when n == 1)
-        n = len(node.children)
-        for i in xrange(n - 1):
+        # Remaining n-1 processes (which is empty when n == 1)
+        for i in xrange(first, n - 1):
             child = node.children[i]
 
             # TODO: determine these locations at parse time?
@@ -402,9 +652,13 @@ class ShellExecutor(vm._Executor):
 
             p = self._MakeProcess(child)
             p.Init_ParentPipeline(pi)
+            if i == 1 and first == 1:
+                # Read what the first stage wrote to the pipe.  The shell
+                # closes it after forking.
+                p.AddStateChange(process.StdinFromPipe(first_r, first_w))
+                p.AddPipeToClose(first_r, first_w)
             pi.Add(p)
 
-        last_child = node.children[n - 1]
         # Last piece of code is in THIS PROCESS.  'echo foo | read line; echo $line'
         pi.AddLast((self.cmd_ev, last_child))
         pipe_locs.append(loc.Command(last_child))
@@ -412,9 +666,14 @@ class ShellExecutor(vm._Executor):
         with dev.ctx_Tracer(self.tracer, 'pipeline', None):
             pi.StartPipeline(self.waiter)
             self.fg_pipeline = pi
-            status_out.pipe_status = pi.RunLastPart(self.waiter, self.fd_state)
+            pipe_status = pi.RunLastPart(self.waiter, self.fd_state)
             self.fg_pipeline = None  # clear in case we didn't end up forking
 
+        if first == 1:
+            status_out.pipe_status = [first_status]
+            status_out.pipe_status.extend(pipe_status)
+        else:
+            status_out.pipe_status = pipe_status
         status_out.pipe_locs = pipe_locs
 
     def RunSubshell(self, node):
@@ -466,6 +725,7 @@ class ShellExecutor(vm._Executor):
         #log('Command sub started %d', pid)
 
         chunks = []  # type: List[str]
+        num_bytes = 0
         posix.close(w)  # not going to write
         while True:
             n, err_num = pyos.Read(r, 4096, chunks)
@@ -481,7 +741,11 @@ class ShellExecutor(vm._Executor):
 
             elif n == 0:  # EOF
                 break
+
+            else:
+                num_bytes += n
         posix.close(r)
+        self.tracer.OnCommandSubRead(num_bytes)
 
         status = p.Wait(self.waiter)
 
@@ -560,12 +824,23 @@ class ShellExecutor(vm._Executor):
                 "Process subs not allowed here because status wouldn't be checked (strict_errexit)",
                 cs_loc)
 
+        op_id = cs_part.left_token.id
+
+        # diff <(echo "$a") <(echo "$b") may run echo in THIS PROCESS
+        if op_id == Id.Left_ProcSubIn:
+            builtin_id = self._InShellBuiltin(cs_part.child)
+            if builtin_id != consts.NO_INDEX:
+                r, w, status = self._RunInShell(cs_part.child, builtin_id)
+                if r != -1:
+                    posix.close(w)
+                    self.process_sub_stack[-1].AppendDone(status, r, cs_loc)
+                    return '/dev/fd/%d' % r
+
         p = self._MakeProcess(cs_part.child)
 
         r, w = posix.pipe()
         #log('pipe = %d, %d', r, w)
 
-        op_id = cs_part.left_token.id
         if op_id == Id.Left_ProcSubIn:
             # Example: cat < <(head foo.txt)
             #
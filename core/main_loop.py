@@ -6,27 +6,39 @@ Variants:
   main_loop.Headless()       calls Batch() like eval and source.
                                    We want 'echo 1\necho 2\n' to work, so we
                                    don't bother with "the PS2 problem".
+                             RUN forks a child that calls Batch() on a script,
+                             and WAIT reports when one finishes.
   main_loop.ParseWholeFile() calls ParseLogicalLine().  Used by osh -n.
+  main_loop.RunParsed()      calls ExecuteAndCatch() on commands that eval
+                             already parsed, from the ParseCache.
 """
 from __future__ import print_function
 
 from _devbuild.gen import arg_types
-from _devbuild.gen.syntax_asdl import (command, command_t, parse_result,
-                                       parse_result_e)
+from _devbuild.gen.runtime_asdl import job_state_e, trace
+from _devbuild.gen.syntax_asdl import (command, command_t, IntParamBox,
+                                       parse_result, parse_result_e, source)
 from core import error
 from core import process
+from core import pyos
+from core import state
 from core import ui
 from core import util
+from frontend import match
 from frontend import reader
 from osh import cmd_eval
 from mycpp import mylib
 from mycpp.mylib import log, print_stderr, tagswitch
 
 import fanos
+import fcntl as fcntl_
+from fcntl import F_SETFD, FD_CLOEXEC
 import posix_ as posix
 
-from typing import cast, Any, List, TYPE_CHECKING
+from typing import cast, Any, Dict, List, Optional, Tuple, TYPE_CHECKING
 if TYPE_CHECKING:
+    from builtin.trap_osh import TrapState
+    from core import dev
     from core.comp_ui import _IDisplay
     from core.ui import ErrorFormatter
     from frontend import parse_lib
@@ -47,6 +59,12 @@ class ctx_Descriptors(object):
         self.saved1 = process.SaveFd(1)
         self.saved2 = process.SaveFd(2)
 
+        # The saved descriptors are the FANOS socket, which processes started
+        # by EVAL must not inherit
+        fcntl_.fcntl(self.saved0, F_SETFD, FD_CLOEXEC)
+        fcntl_.fcntl(self.saved1, F_SETFD, FD_CLOEXEC)
+        fcntl_.fcntl(self.saved2, F_SETFD, FD_CLOEXEC)
+
         #ShowDescriptorState('BEFORE')
         posix.dup2(fds[0], 0)
         posix.dup2(fds[1], 1)
@@ -97,14 +115,118 @@ def ShowDescriptorState(label):
         time.sleep(0.01)  # prevent interleaving
 
 
+class _ScriptThunk(process.Thunk):
+    """Run a script in a child of the headless shell, for the RUN command.
+
+    The child starts from the state of the server, e.g. with functions
+    defined by rc files and EVAL, and a warm PATH cache.
+    """
+
+    def __init__(
+            self,
+            cmd_ev,  # type: CommandEvaluator
+            parse_ctx,  # type: parse_lib.ParseContext
+            errfmt,  # type: ErrorFormatter
+            fd_state,  # type: process.FdState
+            trap_state,  # type: TrapState
+            argv,  # type: List[str]
+            env_pairs,  # type: List[str]
+            fds,  # type: List[int]
+    ):
+        # type: (...) -> None
+        process.Thunk.__init__(self)
+        self.cmd_ev = cmd_ev
+        self.parse_ctx = parse_ctx
+        self.errfmt = errfmt
+        self.fd_state = fd_state
+        self.trap_state = trap_state
+        self.argv = argv
+        self.env_pairs = env_pairs
+        self.fds = fds
+
+    def UserString(self):
+        # type: () -> str
+        return '[headless RUN] %s' % self.argv[0]
+
+    def Run(self):
+        # type: () -> None
+
+        # Like ctx_Descriptors, but there's nothing to restore.  This replaces
+        # the FANOS socket on descriptors 0 and 1.
+        for i, fd in enumerate(self.fds):
+            if fd != i:
+                posix.dup2(fd, i)
+                posix.close(fd)
+
+        # A script run by the server is like a new shell, so it doesn't
+        # inherit the server's traps
+        self.trap_state.ClearForSubProgram()
+
+        mem = self.cmd_ev.mem
+        for pair in self.env_pairs:
+            name, val = mylib.split_once(pair, '=')
+            state.ExportGlobalString(mem, name, val)
+
+        script_name = self.argv[0]
+        mem.dollar0 = script_name
+        mem.SetArgv(self.argv[1:])
+
+        try:
+            f = self.fd_state.Open(script_name)
+        except (IOError, OSError) as e:
+            print_stderr("osh: Couldn't open %r: %s" %
+                         (script_name, posix.strerror(e.errno)))
+            posix._exit(1)
+
+        arena = self.parse_ctx.arena
+        arena.PushSource(source.MainFile(script_name))
+        line_reader = reader.FileLineReader(f, arena)
+        c_parser = self.parse_ctx.MakeOshParser(line_reader)
+
+        # Same as running a script in shell.Main()
+        with state.ctx_ThisDir(mem, script_name):
+            try:
+                status = Batch(self.cmd_ev,
+                               c_parser,
+                               self.errfmt,
+                               cmd_flags=cmd_eval.IsMainProgram)
+            except util.UserExit as e:
+                status = e.status
+        mut_status = IntParamBox(status)
+        self.cmd_ev.MaybeRunExitTrap(mut_status)
+
+        pyos.FlushStdout()
+        posix._exit(mut_status.i)
+
+
 class Headless(object):
     """Main loop for headless mode."""
 
-    def __init__(self, cmd_ev, parse_ctx, errfmt):
-        # type: (CommandEvaluator, parse_lib.ParseContext, ErrorFormatter) -> None
+    def __init__(
+            self,
+            cmd_ev,  # type: CommandEvaluator
+            parse_ctx,  # type: parse_lib.ParseContext
+            errfmt,  # type: ErrorFormatter
+            fd_state,  # type: process.FdState
+            trap_state,  # type: TrapState
+            job_control,  # type: process.JobControl
+            job_list,  # type: process.JobList
+            waiter,  # type: process.Waiter
+            tracer,  # type: dev.Tracer
+    ):
+        # type: (...) -> None
         self.cmd_ev = cmd_ev
         self.parse_ctx = parse_ctx
         self.errfmt = errfmt
+        self.fd_state = fd_state
+        self.trap_state = trap_state
+        self.job_control = job_control
+        self.job_list = job_list
+        self.waiter = waiter
+        self.tracer = tracer
+
+        # Scripts started by RUN that WAIT hasn't reported yet
+        self.running = {}  # type: Dict[int, process.Process]
 
     def Loop(self):
         # type: () -> int
@@ -130,6 +252,66 @@ class Headless(object):
 
         return ''  # result is always 'OK ' since there was no protocol error
 
+    def RUN(self, arg, fds):
+        # type: (str, List[int]) -> str
+        """Fork a child that runs a script, and return its PID.
+
+        The arg is a list of NUL-separated words, like env(1):
+
+            NAME=value ... script.sh arg ...
+
+        The server doesn't wait for the child, so it can start more scripts,
+        or EVAL, while this one runs.
+        """
+        words = arg.split('\0')
+        i = 0
+        n = len(words)
+        while i < n:
+            name, val = mylib.split_once(words[i], '=')
+            if val is None or not match.IsValidVarName(name):
+                break
+            i += 1
+
+        if i == n:
+            raise ValueError('RUN expected a script')
+
+        thunk = _ScriptThunk(self.cmd_ev, self.parse_ctx, self.errfmt,
+                             self.fd_state, self.trap_state, words[i:],
+                             words[:i], fds)
+        p = process.Process(thunk, self.job_control, self.job_list,
+                            self.tracer)
+        pid = p.StartProcess(trace.ForkWait)
+
+        # The child has its own copies of the descriptors
+        for fd in fds:
+            posix.close(fd)
+
+        self.running[pid] = p
+        return str(pid)
+
+    def WAIT(self):
+        # type: () -> str
+        """Wait for a script started by RUN, and return its PID and status.
+
+        Returns '' if no scripts are running.
+        """
+        while len(self.running):
+            done_pid = -1
+            for pid, p in mylib.iteritems(self.running):
+                if p.state != job_state_e.Running:
+                    done_pid = pid
+                    break
+
+            if done_pid != -1:
+                p = self.running[done_pid]
+                mylib.dict_erase(self.running, done_pid)
+                return '%d %d' % (done_pid, p.status)
+
+            if self.waiter.WaitForOne() == process.W1_ECHILD:
+                break
+
+        return ''
+
     def _Loop(self):
         # type: () -> int
         fanos_log(
@@ -174,6 +356,15 @@ class Headless(object):
 
                 #ShowDescriptorState('RESTORED')
 
+            elif command == 'RUN':
+                if len(fd_out) != 3:
+                    raise ValueError('Expected 3 file descriptors')
+
+                reply = self.RUN(arg, fd_out)
+
+            elif command == 'WAIT':
+                reply = self.WAIT()
+
             # Note: lang == 'osh' or lang == 'ysh' puts this in different modes.
             # Do we also need 'complete --osh' and 'complete --ysh' ?
             elif command == 'PARSE':
@@ -334,18 +525,41 @@ def Batch(cmd_ev, c_parser, errfmt, cmd_flags=0):
     - In contrast, 'trap' should parse up front?
     - What about $() ?
     """
+    status, _ = BatchAndSave(cmd_ev, c_parser, errfmt, None, cmd_flags)
+    return status
+
+
+def BatchAndSave(
+        cmd_ev,  # type: CommandEvaluator
+        c_parser,  # type: CommandParser
+        errfmt,  # type: ui.ErrorFormatter
+        nodes,  # type: Optional[List[command_t]]
+        cmd_flags=0,  # type: int
+):
+    # type: (...) -> Tuple[int, bool]
+    """Like Batch(), but append each command to 'nodes' if it's not None.
+
+    Returns:
+      (status, done) where done is true if the whole program was parsed and
+      run.  Then 'nodes' can be run again with RunParsed().
+    """
     status = 0
+    done = False
     while True:
         try:
             node = c_parser.ParseLogicalLine()  # can raise ParseError
             if node is None:  # EOF
                 c_parser.CheckForPendingHereDocs()  # can raise ParseError
+                done = True
                 break
         except error.Parse as e:
             errfmt.PrettyPrintError(e)
             status = 2
             break
 
+        if nodes is not None:
+            nodes.append(node)
+
         # After every "logical line", no lines will be referenced by the Arena.
         # Tokens in the LST still point to many lines, but lines with only comment
         # or whitespace won't be reachable, so the GC will free them.
@@ -365,6 +579,21 @@ def Batch(cmd_ev, c_parser, errfmt, cmd_flags=0):
 
         mylib.MaybeCollect()  # manual GC point
 
+    return status, done
+
+
+def RunParsed(cmd_ev, nodes, cmd_flags=0):
+    # type: (CommandEvaluator, List[command_t], int) -> int
+    """Run commands saved by BatchAndSave(), like Batch() would."""
+    status = 0
+    for node in nodes:
+        is_return, is_fatal = cmd_ev.ExecuteAndCatch(node, cmd_flags=cmd_flags)
+        status = cmd_ev.LastStatus()
+        if is_return or is_fatal:
+            break
+
+        mylib.MaybeCollect()  # manual GC point
+
     return status
 
 
@@ -12,15 +12,16 @@ from __future__ import print_function
 from errno import EACCES, EBADF, ECHILD, EINTR, ENOENT, ENOEXEC
 import fcntl as fcntl_
 from fcntl import F_DUPFD, F_GETFD, F_SETFD, FD_CLOEXEC
-from signal import (SIG_DFL, SIG_IGN, SIGINT, SIGPIPE, SIGQUIT, SIGTSTP,
-                    SIGTTOU, SIGTTIN, SIGWINCH)
+from signal import (SIG_DFL, SIG_IGN, SIGCHLD, SIGINT, SIGPIPE, SIGQUIT,
+                    SIGTSTP, SIGTTOU, SIGTTIN, SIGWINCH)
 
 from _devbuild.gen.id_kind_asdl import Id
 from _devbuild.gen.runtime_asdl import (job_state_e, job_state_t,
                                         job_state_str, wait_status,
                                         wait_status_t, RedirValue,
                                         redirect_arg, redirect_arg_e, value,
-                                        value_e, trace, trace_t)
+                                        value_e, trace, trace_t,
+                                        ResourceUsage)
 from _devbuild.gen.syntax_asdl import (
     loc_t,
     redir_loc,
@@ -89,6 +90,9 @@ STYLE_DEFAULT = 0
 STYLE_LONG = 1
 STYLE_PID_ONLY = 2
 
+# How many finished processes 'jobs --rusage' shows
+_NUM_FINISHED = 16
+
 # To save on allocations in JobList::GetJobWithSpec()
 CURRENT_JOB_SPECS = ['', '%', '%%', '%+']
 
@@ -764,9 +768,10 @@ class Thunk(object):
 class ExternalThunk(Thunk):
     """An external executable."""
 
-    def __init__(self, ext_prog, argv0_path, cmd_val, environ):
-        # type: (ExternalProgram, str, cmd_value.Argv, Dict[str, str]) -> None
+    def __init__(self, ext_prog, tracer, argv0_path, cmd_val, environ):
+        # type: (ExternalProgram, dev.Tracer, str, cmd_value.Argv, Dict[str, str]) -> None
         self.ext_prog = ext_prog
+        self.tracer = tracer
         self.argv0_path = argv0_path
         self.cmd_val = cmd_val
         self.environ = environ
@@ -784,6 +789,7 @@ class ExternalThunk(Thunk):
     def Run(self):
         # type: () -> None
         """An ExternalThunk is run in parent for the exec builtin."""
+        self.tracer.OnExec(self.cmd_val.argv, True)
         self.ext_prog.Exec(self.argv0_path, self.cmd_val, self.environ)
 
 
@@ -960,6 +966,7 @@ class Process(Job):
 
         self.pid = -1
         self.status = -1
+        self.rusage = None  # type: Optional[ResourceUsage]  # when Done
 
     def Init_ParentPipeline(self, pi):
         # type: (Pipeline) -> None
@@ -1053,6 +1060,9 @@ class Process(Job):
             pyos.Sigaction(SIGTTOU, SIG_DFL)
             pyos.Sigaction(SIGTTIN, SIG_DFL)
 
+            # Don't read wakeups meant for the parent
+            pyos.CloseWakeupPipe()
+
             self.tracer.SetProcess(pid)
             # clear foreground pipeline for subshells
             self.thunk.Run()
@@ -1134,7 +1144,11 @@ class Process(Job):
                     print_stderr('[%d] Done PID %d' % (self.job_id, self.pid))
 
                 self.job_list.RemoveJob(self.job_id)
-                self.job_list.RemoveChildProcess(self.pid)
+
+            # Foreground processes are removed too.  Otherwise a script that
+            # runs many external commands holds on to every Process, and the
+            # argv, tokens, and source lines it references.
+            self.job_list.RemoveChildProcess(self.pid)
 
             if not self.in_background:
                 self.job_control.MaybeTakeTerminal()
@@ -1545,6 +1559,9 @@ class JobList(object):
         self.child_procs = {}  # type: Dict[int, Process]
         self.debug_pipelines = []  # type: List[Pipeline]
 
+        # The last few processes to finish, for 'jobs --rusage'
+        self.finished = []  # type: List[Process]
+
         # Counter used to assign IDs to jobs. It is incremented every time a job
         # is created. Once all active jobs are done it is reset to 1. I'm not
         # sure if this reset behavior is mandated by POSIX, but other shells do
@@ -1727,6 +1744,31 @@ class JobList(object):
             # Use the %1 syntax
             job.DisplayJob(job_id, f, style)
 
+    def AddFinished(self, proc):
+        # type: (Process) -> None
+        if len(self.finished) == _NUM_FINISHED:
+            self.finished.pop(0)
+        self.finished.append(proc)
+
+    def DisplayUsage(self):
+        # type: () -> None
+        """For 'jobs --rusage'.
+
+        Shows the resources each recently finished process used, so you can
+        find the command in a long script that's using CPU or memory.
+        """
+        f = mylib.Stdout()
+        f.write('    PID STATUS  USER_MS   SYS_MS  MAX_RSS_KB   VCSW  IVCSW'
+                '  COMMAND\n')
+        for proc in self.finished:
+            ru = proc.rusage
+            f.write('%7d %6d %8d %8d %11d %6d %6d  ' %
+                    (proc.pid, proc.status, int(ru.user * 1000),
+                     int(ru.sys * 1000), ru.max_rss, ru.vol_switches,
+                     ru.invol_switches))
+            f.write(proc.thunk.UserString())
+            f.write('\n')
+
     def DebugPrint(self):
         # type: () -> None
 
@@ -1800,6 +1842,11 @@ class Waiter(object):
         self.tracer = tracer
         self.last_status = 127  # wait -n error code
 
+        # Filled in by wait4(), then given to the Process that finished
+        self.ru = ResourceUsage.CreateNull()
+        # Total over all children, like getrusage(RUSAGE_CHILDREN)
+        self.child_usage = ResourceUsage(0.0, 0.0, 0, 0, 0)
+
     def WaitForOne(self, waitpid_options=0):
         # type: (int) -> int
         """Wait until the next process returns (or maybe Ctrl-C).
@@ -1836,7 +1883,42 @@ class Waiter(object):
         | Done(int pid, int status)  -- process done
         | EINTR(bool sigint)         -- may or may not retry
         """
-        pid, status = pyos.WaitPid(waitpid_options)
+        if waitpid_options == 0 and self.exec_opts.event_wait():
+            return self._WaitForEvent()
+        return self._Reap(waitpid_options)
+
+    def _WaitForEvent(self):
+        # type: () -> int
+        """WaitForOne() for shopt -s event_wait.
+
+        Rather than blocking in waitpid(), reap with WNOHANG, then sleep in
+        poll() on a self-pipe that SIGCHLD and trapped signals write to.
+        """
+        pyos.InitWakeupPipe()
+
+        # Like waitpid(), ignore signals that arrived before we started waiting
+        self.signal_safe.PollSignal()
+
+        while True:
+            result = self._Reap(WNOHANG)
+            if result != W1_AGAIN:
+                return result
+
+            pyos.WaitForWakeup(-1, -1)
+
+            # Like waitpid() returning EINTR.  A trapped SIGCHLD also sets the
+            # flag, but it doesn't interrupt 'wait', so try to reap again.
+            # Look at every pending signal, since SIGCHLD may have come last.
+            if self.signal_safe.PollSignal():
+                sig_num = self.signal_safe.LastSignalExcept(SIGCHLD)
+                if sig_num != 0:
+                    return sig_num  # e.g. 1 for SIGHUP
+
+    def _Reap(self, waitpid_options):
+        # type: (int) -> int
+        """Call waitpid() once, and update the state of the process."""
+        ru = self.ru
+        pid, status = pyos.WaitPid(waitpid_options, ru)
         if pid == 0:  # WNOHANG passed, and no state changes
             return W1_AGAIN
         elif pid < 0:  # error case
@@ -1872,11 +1954,13 @@ class Waiter(object):
             if term_sig == SIGINT:
                 print('')
 
+            self._WhenReaped(proc, ru)
             proc.WhenDone(pid, status)
 
         elif WIFEXITED(status):
             status = WEXITSTATUS(status)
             #log('exit status: %s', status)
+            self._WhenReaped(proc, ru)
             proc.WhenDone(pid, status)
 
         elif WIFSTOPPED(status):
@@ -1891,9 +1975,24 @@ class Waiter(object):
             raise AssertionError(status)
 
         self.last_status = status  # for wait -n
-        self.tracer.OnProcessEnd(pid, status)
+        self.tracer.OnProcessEnd(pid, status, ru)
         return W1_OK
 
+    def _WhenReaped(self, proc, ru):
+        # type: (Process, ResourceUsage) -> None
+        """Record what a finished process used."""
+        self.ru = ResourceUsage.CreateNull()  # proc owns ru now
+        proc.rusage = ru
+
+        total = self.child_usage
+        total.user += ru.user
+        total.sys += ru.sys
+        total.max_rss = max(total.max_rss, ru.max_rss)
+        total.vol_switches += ru.vol_switches
+        total.invol_switches += ru.invol_switches
+
+        self.job_list.AddFinished(proc)
+
     def PollNotifications(self):
         # type: () -> None
         """
@@ -43,6 +43,8 @@ class ProcessTest(unittest.TestCase):
         mem = state.Mem('', [], self.arena, [])
         parse_opts, exec_opts, mutable_opts = state.MakeOpts(mem, None)
         mem.exec_opts = exec_opts
+        self.exec_opts = exec_opts
+        self.mutable_opts = mutable_opts
 
         state.InitMem(mem, {}, '0.1')
 
@@ -73,7 +75,8 @@ class ProcessTest(unittest.TestCase):
                 break
         if not argv0_path:
             argv0_path = argv[0]  # fallback that tests failure case
-        thunk = ExternalThunk(self.ext_prog, argv0_path, arg_vec, {})
+        thunk = ExternalThunk(self.ext_prog, self.tracer, argv0_path, arg_vec,
+                              {})
         return Process(thunk, self.job_control, self.job_list, self.tracer)
 
     def testStdinRedirect(self):
@@ -119,6 +122,15 @@ class ProcessTest(unittest.TestCase):
         log('date returned %d', status)
         self.assertEqual(0, status)
 
+        # Finished foreground processes aren't retained
+        self.assertEqual({}, self.job_list.child_procs)
+
+        # But the last few are kept for 'jobs --rusage'
+        self.assertEqual([p], self.job_list.finished)
+        self.assertTrue(p.rusage.max_rss > 0)
+        self.assertEqual(p.rusage.user, self.waiter.child_usage.user)
+        self.job_list.DisplayUsage()
+
         Banner('does-not-exist')
         p = self._ExtProc(['does-not-exist'])
         print(p.RunProcess(self.waiter, why))
@@ -126,6 +138,24 @@ class ProcessTest(unittest.TestCase):
         # 12 file descriptors open!
         print('FDS AFTER', os.listdir('/dev/fd'))
 
+    def testEventWait(self):
+        signal_safe = pyos.InitSignalSafe()
+        waiter = process.Waiter(self.job_list, self.exec_opts, signal_safe,
+                                self.tracer)
+        self.mutable_opts.SetAnyOption('event_wait', True)
+
+        why = trace.External(['sleep'])
+        p1 = self._ExtProc(['sleep', '0.1'])
+        p1.StartProcess(why)
+        p2 = self._ExtProc(['false'])
+        p2.StartProcess(why)
+
+        self.assertEqual(1, p2.Wait(waiter))
+        self.assertEqual(0, p1.Wait(waiter))
+        self.assertEqual(process.W1_ECHILD, waiter.WaitForOne())
+
+        self.mutable_opts.SetAnyOption('event_wait', False)
+
     def testPipeline(self):
         node = _CommandNode('uniq -c', self.arena)
         cmd_ev = test_lib.InitCommandEvaluator(arena=self.arena,
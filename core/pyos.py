@@ -5,7 +5,8 @@ Like py{error,util}.py, it won't be translated to C++.
 """
 from __future__ import print_function
 
-from errno import EINTR
+from errno import EINTR, EAGAIN
+import fcntl
 import pwd
 import resource
 import signal
@@ -20,7 +21,9 @@ from mycpp.mylib import log
 import posix_ as posix
 from posix_ import WUNTRACED
 
-from typing import Optional, Tuple, List, Dict, cast, Any
+from typing import Optional, Tuple, List, Dict, cast, Any, TYPE_CHECKING
+if TYPE_CHECKING:
+    from _devbuild.gen.runtime_asdl import ResourceUsage
 
 _ = log
 
@@ -34,12 +37,14 @@ def FlushStdout():
     sys.stdout.flush()
 
 
-def WaitPid(waitpid_options):
-    # type: (int) -> Tuple[int, int]
+def WaitPid(waitpid_options, ru):
+    # type: (int, ResourceUsage) -> Tuple[int, int]
     """
     Return value:
       pid is 0 if WNOHANG passed, and nothing has changed state
       status: value that can be parsed with WIFEXITED() etc.
+
+    When a process is reported, ru is filled in with what it used.
     """
     try:
         # Notes:
@@ -48,10 +53,17 @@ def WaitPid(waitpid_options):
         # - We don't retry on EINTR, because the 'wait' builtin should be
         #   interruptible.
         # - waitpid_options can be WNOHANG
-        pid, status = posix.waitpid(-1, WUNTRACED | waitpid_options)
+        # - wait4() is waitpid() that also returns the child's rusage.
+        pid, status, r = posix.wait4(-1, WUNTRACED | waitpid_options)
     except OSError as e:
         return -1, e.errno
 
+    if pid != 0:
+        ru.user = r.ru_utime
+        ru.sys = r.ru_stime
+        ru.max_rss = r.ru_maxrss
+        ru.vol_switches = r.ru_nvcsw
+        ru.invol_switches = r.ru_nivcsw
     return pid, status
 
 
@@ -301,6 +313,7 @@ class SignalSafe(object):
         # type: () -> None
         self.pending_signals = []  # type: List[int]
         self.last_sig_num = 0  # type: int
+        self.received_signal = False
         self.received_sigint = False
         self.received_sigwinch = False
         self.sigwinch_code = UNTRAPPED_SIGWINCH
@@ -312,6 +325,7 @@ class SignalSafe(object):
         This method is registered as a Python signal handler.
         """
         self.pending_signals.append(sig_num)
+        self.received_signal = True
 
         if sig_num == signal.SIGINT:
             self.received_sigint = True
@@ -327,6 +341,29 @@ class SignalSafe(object):
         """Return the number of the last signal that fired."""
         return self.last_sig_num
 
+    def LastSignalExcept(self, sig_num):
+        # type: (int) -> int
+        """Return the last pending signal other than sig_num, or 0.
+
+        Pending signals haven't had their traps run yet.  The 'wait' builtin
+        uses this so that a trapped SIGCHLD doesn't hide another signal.
+        """
+        for i in xrange(len(self.pending_signals) - 1, -1, -1):
+            s = self.pending_signals[i]
+            if s != sig_num:
+                if s == signal.SIGWINCH:
+                    return self.sigwinch_code
+                return s
+        return 0
+
+    def PollSignal(self):
+        # type: () -> bool
+        """Has any signal been received since the last time PollSignal() was
+        called?"""
+        result = self.received_signal
+        self.received_signal = False
+        return result
+
     def PollSigInt(self):
         # type: () -> bool
         """Has SIGINT received since the last time PollSigInt() was called?"""
@@ -404,6 +441,130 @@ def RegisterSignalInterest(sig_num):
     signal.signal(sig_num, gSignalSafe.UpdateFromSignalHandler)
 
 
+# WaitForWakeup() return values
+WAKE_TIMEOUT = 0
+WAKE_SIGNAL = 1  # a signal arrived, e.g. SIGCHLD
+WAKE_READABLE = 2  # the fd that was passed can be read without blocking
+
+# The self-pipe that signal handlers write to.  [read end, write end]
+_wakeup_fds = [-1, -1]
+
+
+def _OnSigChld(sig_num, unused_frame):
+    # type: (int, Any) -> None
+    """SIGCHLD handler.
+
+    The C handler that CPython installs writes to the wakeup fd, so there's
+    nothing to do here.
+    """
+    pass
+
+
+def _WakeOnSigChld():
+    # type: () -> None
+    signal.signal(signal.SIGCHLD, _OnSigChld)
+    # SA_RESTART, so blocking calls like waitpid() aren't interrupted
+    signal.siginterrupt(signal.SIGCHLD, False)
+
+
+def InitWakeupPipe():
+    # type: () -> None
+    """Create the self-pipe that WaitForWakeup() sleeps on, if necessary.
+
+    Every signal we handle, and SIGCHLD, writes a byte to it.  So a child that
+    exits after we checked for it, but before we call poll(), still wakes us
+    up.
+    """
+    if _wakeup_fds[0] != -1:
+        return
+
+    r, w = posix.pipe()
+    for fd in [r, w]:
+        flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+        fcntl.fcntl(fd, fcntl.F_SETFL, flags | posix.O_NONBLOCK)
+        fcntl.fcntl(fd, fcntl.F_SETFD, fcntl.FD_CLOEXEC)
+    _wakeup_fds[0] = r
+    _wakeup_fds[1] = w
+
+    signal.set_wakeup_fd(w)
+
+    # Leave a 'trap CHLD' handler alone.  It also writes to the pipe.
+    if signal.getsignal(signal.SIGCHLD) == signal.SIG_DFL:
+        _WakeOnSigChld()
+
+
+def CloseWakeupPipe():
+    # type: () -> None
+    """Called in a forked child, which must not read its parent's wakeups."""
+    if _wakeup_fds[0] == -1:
+        return
+
+    signal.set_wakeup_fd(-1)
+    posix.close(_wakeup_fds[0])
+    posix.close(_wakeup_fds[1])
+    _wakeup_fds[0] = -1
+    _wakeup_fds[1] = -1
+
+
+def ResetSigChld():
+    # type: () -> None
+    """Called when 'trap - CHLD' removes the user's handler."""
+    if _wakeup_fds[0] == -1:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    else:
+        _WakeOnSigChld()
+
+
+def _DrainWakeupPipe():
+    # type: () -> None
+    while True:
+        try:
+            b = posix.read(_wakeup_fds[0], 512)
+        except OSError as e:
+            if e.errno in (EAGAIN, EINTR):
+                return
+            raise
+        if len(b) < 512:
+            return
+
+
+def WaitForWakeup(fd, timeout_ms):
+    # type: (int, int) -> int
+    """Sleep until fd is readable, a signal arrives, or timeout_ms passes.
+
+    Pass fd -1 to only wait for signals, and timeout_ms -1 to wait forever.
+    Call InitWakeupPipe() first.
+
+    Returns one of the WAKE_* constants.  WAKE_SIGNAL wins over WAKE_READABLE,
+    so the caller can run traps first.
+    """
+    wakeup_fd = _wakeup_fds[0]
+    assert wakeup_fd != -1
+
+    p = select.poll()
+    p.register(wakeup_fd, select.POLLIN)
+    if fd != -1:
+        p.register(fd, select.POLLIN)
+
+    # Ctrl-C raises KeyboardInterrupt from poll(), through the interpreter's
+    # SIGINT handler.  The C++ version checks PollSigInt() to do the same.
+    try:
+        events = p.poll(timeout_ms)
+    except select.error as e:
+        if e.args[0] == EINTR:
+            return WAKE_SIGNAL
+        raise
+
+    result = WAKE_TIMEOUT
+    for ready_fd, _ in events:
+        if ready_fd == wakeup_fd:
+            _DrainWakeupPipe()
+            result = WAKE_SIGNAL
+        elif result == WAKE_TIMEOUT:
+            result = WAKE_READABLE  # including POLLHUP, so read() sees EOF
+    return result
+
+
 def MakeDirCacheKey(path):
     # type: (str) -> Tuple[str, int]
     """Returns a pair (path with last modified time) that can be used to cache
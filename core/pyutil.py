@@ -4,6 +4,7 @@ C++ will use other mechanisms.
 """
 from __future__ import print_function
 
+import cStringIO
 import sys
 import zipimport  # NOT the zipfile module.
 
@@ -13,7 +14,9 @@ from pylib import os_path
 
 import posix_ as posix
 
-from typing import List, Union
+from typing import Any, List, Optional, Union, TYPE_CHECKING
+if TYPE_CHECKING:
+    from _devbuild.gen.runtime_asdl import HeapImage
 
 # Copied from 'string' module
 _PUNCT = """!"#$%&'()*+,-./:;<=>?@[\]^_`{|}~"""
@@ -75,6 +78,83 @@ def LoadYshGrammar(loader):
     return g
 
 
+_IMAGE_MAGIC = 'OILSIMG-py\n'
+
+
+def _QualifiedName(cls):
+    # type: (Any) -> Optional[str]
+    """ASDL variants like value.Str are nested classes, which pickle can't find
+    by name."""
+    mod = sys.modules[cls.__module__]
+    if getattr(mod, cls.__name__, None) is cls:
+        return None  # not nested
+    for name in dir(mod):
+        if getattr(getattr(mod, name), cls.__name__, None) is cls:
+            return '%s.%s' % (name, cls.__name__)
+    return None
+
+
+def SaveHeapImage(path, image):
+    # type: (str, HeapImage) -> bool
+    """Write everything reachable from image to path.
+
+    Returns False if it contains objects that can't be saved.  In C++, this
+    copies the objects, and LoadHeapImage() maps them back in.
+    """
+    import pickle
+
+    class _Pickler(pickle.Pickler):
+
+        def save_global(self, obj, name=None, pack=None):
+            # type: (Any, Optional[str], Any) -> None
+            qname = None  # type: Optional[str]
+            if name is None and getattr(obj, '__module__',
+                                        '').startswith('_devbuild.gen.'):
+                qname = _QualifiedName(obj)
+            if qname is None:
+                pickle.Pickler.save_global(self, obj, name=name)
+                return
+            self.write('%s%s\n%s\n' % (pickle.GLOBAL, obj.__module__, qname))
+            self.memoize(obj)
+
+        # save() looks up methods in this table, not on self
+        dispatch = dict(pickle.Pickler.dispatch)
+        dispatch[type] = save_global
+
+    f = cStringIO.StringIO()
+    try:
+        _Pickler(f, 2).dump(image)
+    except (pickle.PicklingError, TypeError):
+        return False
+    with open(path, 'wb') as out:
+        out.write(_IMAGE_MAGIC + f.getvalue())
+    return True
+
+
+def LoadHeapImage(path):
+    # type: (str) -> Optional[HeapImage]
+    """Returns None if path isn't an image saved by this build."""
+    import pickle
+
+    class _Unpickler(pickle.Unpickler):
+
+        def find_class(self, module, name):
+            # type: (str, str) -> Any
+            obj = sys.modules.get(module) or __import__(module, fromlist=['x'])
+            for part in name.split('.'):
+                obj = getattr(obj, part)
+            return obj
+
+    with open(path, 'rb') as f:
+        s = f.read()
+    if not s.startswith(_IMAGE_MAGIC):
+        return None
+    try:
+        return _Unpickler(cStringIO.StringIO(s[len(_IMAGE_MAGIC):])).load()
+    except Exception:
+        return None
+
+
 class _ResourceLoader(object):
 
     def Get(self, rel_path):
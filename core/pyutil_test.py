@@ -12,6 +12,24 @@ class PyUtilTest(unittest.TestCase):
     def testBackslashEscape(self):
         print(pyutil.BackslashEscape('foo', 'o'))
 
+    def testHeapImage(self):
+        from _devbuild.gen.runtime_asdl import Cell, HeapImage, value
+
+        cell = Cell(False, False, False, value.Str('x'))
+        image = HeapImage({'a': cell, 'b': cell}, {}, {'ll': 'ls -l'})
+        path = '_tmp/pyutil_test.img'
+        self.assertEqual(True, pyutil.SaveHeapImage(path, image))
+
+        image2 = pyutil.LoadHeapImage(path)
+        self.assertEqual('x', image2.vars['a'].val.s)
+        self.assertIs(image2.vars['a'], image2.vars['b'])  # shared
+        self.assertEqual({'ll': 'ls -l'}, image2.aliases)
+
+        # Not an image
+        with open(path, 'w') as f:
+            f.write('echo hi\n')
+        self.assertEqual(None, pyutil.LoadHeapImage(path))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -274,6 +274,12 @@ class ShellFiles(object):
             #raise error.Strict("$HISTFILE should only ever be a string", loc.Missing)
 
 
+def _WriteCacheStats(caches, debug_f):
+    # type: (List[util.LruIndex], util._DebugFile) -> None
+    for lru in caches:
+        debug_f.writeln(lru.Stats())
+
+
 def Main(
         lang,  # type: str
         arg_r,  # type: args.Reader
@@ -308,6 +314,10 @@ def Main(
     # - Default prompt
     # - --help
 
+    # OILS_STARTUP_TRACE=1 shows where startup time goes
+    startup_trace = dev.StartupTrace(
+        len(environ.get('OILS_STARTUP_TRACE', '')) != 0)
+
     argv0 = arg_r.Peek()
     assert argv0 is not None
     arg_r.Next()
@@ -320,6 +330,7 @@ def Main(
         print_stderr('%s usage error: %s' % (lang, e.msg))
         return 2
     flag = arg_types.main(attrs.attrs)
+    startup_trace.Phase('flags')
 
     arena = alloc.Arena()
     errfmt = ui.ErrorFormatter()
@@ -378,12 +389,11 @@ def Main(
 
     pure_osh.SetOptionsFromFlags(mutable_opts, attrs.opt_changes,
                                  attrs.shopt_changes)
+    startup_trace.Phase('mem')
 
     # feedback between runtime and parser
     aliases = {}  # type: Dict[str, str]
 
-    ysh_grammar = pyutil.LoadYshGrammar(loader)
-
     if flag.one_pass_parse and not exec_opts.noexec():
         raise error.Usage('--one-pass-parse requires noexec (-n)', loc.Missing)
 
@@ -391,11 +401,16 @@ def Main(
     # Note: osh --tool syntax-tree is like osh -n --one-pass-parse
     one_pass_parse = True if len(flag.tool) else flag.one_pass_parse
 
+    # The YSH grammar is loaded on first use, which speeds up startup
     parse_ctx = parse_lib.ParseContext(arena,
                                        parse_opts,
                                        aliases,
-                                       ysh_grammar,
+                                       None,
                                        one_pass_parse=one_pass_parse)
+    parse_ctx.Init_GrammarLoader(loader)
+
+    # For eval and trap strings.  Its hit rate goes to the debug file.
+    parse_cache = parse_lib.ParseCache(mutable_opts, 100)
 
     # Three ParseContext instances SHARE aliases.
     comp_arena = alloc.Arena()
@@ -407,16 +422,18 @@ def Main(
     comp_ctx = parse_lib.ParseContext(comp_arena,
                                       parse_opts,
                                       aliases,
-                                      ysh_grammar,
+                                      None,
                                       one_pass_parse=True)
+    comp_ctx.Init_GrammarLoader(loader)
     comp_ctx.Init_Trail(trail1)
 
     hist_arena = alloc.Arena()
     hist_arena.PushSource(source.Unused('history'))
     trail2 = parse_lib.Trail()
-    hist_ctx = parse_lib.ParseContext(hist_arena, parse_opts, aliases,
-                                      ysh_grammar)
+    hist_ctx = parse_lib.ParseContext(hist_arena, parse_opts, aliases, None)
+    hist_ctx.Init_GrammarLoader(loader)
     hist_ctx.Init_Trail(trail2)
+    startup_trace.Phase('parse_ctx')
 
     # Deps helps manages dependencies.  These dependencies are circular:
     # - cmd_ev and word_ev, arith_ev -- for command sub, arith sub
@@ -460,11 +477,24 @@ def Main(
     tracer = dev.Tracer(parse_ctx, exec_opts, mutable_opts, mem, trace_f)
     fd_state.tracer = tracer  # circular dep
 
+    # OILS_PROFILE=out.txt is like shopt -s profile, and names the output
+    profile_path = environ.get('OILS_PROFILE', '')
+    if len(profile_path):
+        tracer.profile_path = profile_path
+        mutable_opts.set_profile()
+
+    # OILS_TRACE_DIR=/tmp/t writes an event stream for each process
+    trace_dir = environ.get('OILS_TRACE_DIR', '')
+    if len(trace_dir):
+        tracer.stream = dev.TraceStream(trace_dir)
+        tracer.stream.Open(my_pid, posix.getppid())
+
     signal_safe = pyos.InitSignalSafe()
     trap_state = trap_osh.TrapState(signal_safe)
 
     waiter = process.Waiter(job_list, exec_opts, signal_safe, tracer)
     fd_state.waiter = waiter
+    cmd_deps.child_usage = waiter.child_usage
 
     cmd_deps.debug_f = debug_f
 
@@ -558,10 +588,15 @@ def Main(
     unsafe_arith = sh_expr_eval.UnsafeArith(mem, exec_opts, mutable_opts,
                                             parse_ctx, arith_ev, errfmt)
     vm.InitUnsafeArith(mem, word_ev, unsafe_arith)
+    startup_trace.Phase('evaluators')
 
     #
     # Initialize Built-in Procs
     #
+    # These are constructed eagerly, unlike the YSH grammar.  Each phase below
+    # costs 10-30 us in OILS_STARTUP_TRACE, and most constructors only store
+    # references.  Building them on first use would mean a registry that holds
+    # every dependency, which isn't worth it.
 
     b = builtins  # short alias for initialization
 
@@ -579,7 +614,8 @@ def Main(
     b[builtin_i.shopt] = pure_osh.Shopt(mutable_opts, cmd_ev)
 
     b[builtin_i.hash] = pure_osh.Hash(search_path)  # not really pure
-    b[builtin_i.trap] = trap_osh.Trap(trap_state, parse_ctx, tracer, errfmt)
+    b[builtin_i.trap] = trap_osh.Trap(trap_state, parse_ctx, parse_cache,
+                                      tracer, errfmt)
 
     b[builtin_i.shvar] = pure_ysh.Shvar(mem, search_path, cmd_ev)
     b[builtin_i.push_registers] = pure_ysh.PushRegisters(mem, cmd_ev)
@@ -603,7 +639,7 @@ def Main(
     b[builtin_i.dot] = source_builtin
 
     b[builtin_i.eval] = meta_osh.Eval(parse_ctx, exec_opts, cmd_ev, tracer,
-                                      errfmt)
+                                      errfmt, parse_cache)
 
     # Module builtins
     modules = {}  # type: Dict[str, bool]
@@ -623,8 +659,8 @@ def Main(
     b[builtin_i.true_] = true_
     b[builtin_i.false_] = pure_osh.Boolean(1)
 
-    b[builtin_i.alias] = pure_osh.Alias(aliases, errfmt)
-    b[builtin_i.unalias] = pure_osh.UnAlias(aliases, errfmt)
+    b[builtin_i.alias] = pure_osh.Alias(aliases, parse_cache, errfmt)
+    b[builtin_i.unalias] = pure_osh.UnAlias(aliases, parse_cache, errfmt)
 
     b[builtin_i.getopts] = pure_osh.GetOpts(mem, errfmt)
 
@@ -639,13 +675,19 @@ def Main(
 
     # Output
     b[builtin_i.echo] = io_osh.Echo(exec_opts)
-    b[builtin_i.printf] = printf_osh.Printf(mem, parse_ctx, unsafe_arith,
-                                            errfmt)
+    printf = printf_osh.Printf(mem, parse_ctx, unsafe_arith, errfmt)
+    b[builtin_i.printf] = printf
     b[builtin_i.write] = io_ysh.Write(mem, errfmt)
     b[builtin_i.fopen] = io_ysh.Fopen(mem, cmd_ev)
 
     # (pp output format isn't stable)
-    b[builtin_i.pp] = io_ysh.Pp(mem, errfmt, procs, arena)
+    # Bounded caches of parse results, shown by 'pp .cache'
+    caches = [
+        parse_cache.lru, prompt_ev.tokens_lru, prompt_ev.parse_lru,
+        tracer.parse_lru, printf.parse_lru, splitter.splitters_lru,
+        expr_ev.method_lru
+    ]  # type: List[util.LruIndex]
+    b[builtin_i.pp] = io_ysh.Pp(mem, errfmt, procs, arena, caches)
 
     # Input
     b[builtin_i.cat] = io_osh.Cat()  # for $(<file)
@@ -673,6 +715,8 @@ def Main(
                                           errfmt)
     b[builtin_i.umask] = process_osh.Umask()
     b[builtin_i.wait] = process_osh.Wait(waiter, job_list, mem, tracer, errfmt)
+    b[builtin_i.par] = process_osh.Par(shell_ex, waiter, job_control, job_list,
+                                       trap_state, tracer, errfmt)
 
     b[builtin_i.jobs] = process_osh.Jobs(job_list)
     b[builtin_i.fg] = process_osh.Fg(job_control, job_list, waiter)
@@ -709,6 +753,7 @@ def Main(
                                          compopt_state, comp_ui_state,
                                          comp_ctx, debug_f)
     b[builtin_i.compexport] = completion_ysh.CompExport(root_comp)
+    startup_trace.Phase('builtins')
 
     #
     # Initialize Builtin-in Methods
@@ -763,6 +808,7 @@ def Main(
     _SetGlobalFunc(mem, 'glob', func_misc.Glob(globber))
     _SetGlobalFunc(mem, 'shvar_get', func_misc.Shvar_get(mem))
     _SetGlobalFunc(mem, 'assert_', func_misc.Assert())
+    startup_trace.Phase('funcs')
 
     #
     # Is the shell interactive?
@@ -853,6 +899,23 @@ def Main(
 
     # Initialize even in non-interactive shell, for 'compexport'
     _InitDefaultCompletions(cmd_ev, complete_builtin, comp_lookup)
+    startup_trace.Phase('completion')
+
+    # An image saved after sourcing the rc files replaces them
+    if flag.load_image is not None:
+        try:
+            image = pyutil.LoadHeapImage(flag.load_image)
+        except (IOError, OSError) as e:
+            print_stderr("%s: Couldn't open %r: %s" %
+                         (lang, flag.load_image, pyutil.strerror(e)))
+            return 1
+        if image is None:
+            print_stderr('%s warning: %r is not an image saved by this binary' %
+                         (lang, flag.load_image))
+        else:
+            state.RestoreHeapImage(mem, procs, aliases, image)
+            del rc_paths[:]
+        startup_trace.Phase('load-image')
 
     if flag.headless:
         state.InitInteractive(mem)
@@ -868,7 +931,9 @@ def Main(
                 except util.UserExit as e:
                     return e.status
 
-        loop = main_loop.Headless(cmd_ev, parse_ctx, errfmt)
+        loop = main_loop.Headless(cmd_ev, parse_ctx, errfmt, fd_state,
+                                  trap_state, job_control, job_list, waiter,
+                                  tracer)
         try:
             # TODO: What other exceptions happen here?
             status = loop.Loop()
@@ -879,6 +944,8 @@ def Main(
         mut_status = IntParamBox(status)
         cmd_ev.MaybeRunExitTrap(mut_status)
         status = mut_status.i
+        tracer.OnShellExit(status)
+        _WriteCacheStats(caches, debug_f)
 
         return status
 
@@ -912,7 +979,6 @@ def Main(
             comp_ui.InitReadline(readline, sh_files.HistoryFile(), root_comp,
                                  display, debug_f)
 
-            _InitDefaultCompletions(cmd_ev, complete_builtin, comp_lookup)
             if flag.completion_demo:
                 _CompletionDemo(comp_lookup)
 
@@ -940,6 +1006,7 @@ def Main(
             line_reader.Reset()  # After sourcing startup file, render $PS1
 
             prompt_plugin = prompt.UserPlugin(mem, parse_ctx, cmd_ev, errfmt)
+            caches.append(prompt_plugin.parse_lru)
             try:
                 status = main_loop.Interactive(flag, cmd_ev, c_parser, display,
                                                prompt_plugin, waiter, errfmt)
@@ -949,6 +1016,8 @@ def Main(
             mut_status = IntParamBox(status)
             cmd_ev.MaybeRunExitTrap(mut_status)
             status = mut_status.i
+            tracer.OnShellExit(status)
+            _WriteCacheStats(caches, debug_f)
 
         if readline:
             hist_file = sh_files.HistoryFile()
@@ -976,7 +1045,12 @@ def Main(
     tool_name = 'syntax-tree' if exec_opts.noexec() else flag.tool
 
     if len(tool_name):
-        arena.SaveTokens()
+        # Only these tools walk over every token.  Otherwise whitespace and
+        # comment tokens are garbage, and the AST holds the rest.
+        if tool_name in ('tokens', 'arena', 'ysh-ify'):
+            arena.SaveTokens()
+        if tool_name == 'syntax-tree':
+            arena.EagerTokenValues()
 
         try:
             node = main_loop.ParseWholeFile(c_parser)
@@ -1009,6 +1083,7 @@ def Main(
     # Run a shell script
     #
 
+    startup_trace.Phase('ready')
     with state.ctx_ThisDir(mem, script_name):
         try:
             status = main_loop.Batch(cmd_ev,
@@ -1019,6 +1094,22 @@ def Main(
             status = e.status
     mut_status = IntParamBox(status)
     cmd_ev.MaybeRunExitTrap(mut_status)
+    tracer.OnShellExit(mut_status.i)
+    _WriteCacheStats(caches, debug_f)
+
+    # Don't save the state of a program that failed, e.g. with a parse error
+    if flag.save_image is not None and mut_status.i == 0:
+        image = state.MakeHeapImage(mem, procs, aliases)
+        try:
+            ok = pyutil.SaveHeapImage(flag.save_image, image)
+        except (IOError, OSError) as e:
+            print_stderr("%s: Couldn't write %r: %s" %
+                         (lang, flag.save_image, pyutil.strerror(e)))
+            return 1
+        if not ok:
+            print_stderr("%s: Couldn't save image %r" %
+                         (lang, flag.save_image))
+            return 1
 
     # NOTE: We haven't closed the file opened with fd_state.Open
     return mut_status.i
@@ -13,7 +13,7 @@ from _devbuild.gen.id_kind_asdl import Id
 from _devbuild.gen.option_asdl import option_i
 from _devbuild.gen.runtime_asdl import (value, value_e, value_t, sh_lvalue,
                                         sh_lvalue_e, sh_lvalue_t, scope_e,
-                                        scope_t, Cell, LeftName)
+                                        scope_t, Cell, LeftName, HeapImage)
 from _devbuild.gen.syntax_asdl import (loc, loc_t, Token, debug_frame,
                                        debug_frame_e, debug_frame_t)
 from _devbuild.gen.types_asdl import opt_group_i
@@ -472,6 +472,10 @@ class MutableOpts(object):
         # type: () -> None
         self._Set(option_i.emacs, True)
 
+    def set_profile(self):
+        # type: () -> None
+        self._Set(option_i.profile, True)
+
     def set_xtrace(self, b):
         # type: (bool) -> None
         self._Set(option_i.xtrace, b)
@@ -723,16 +727,181 @@ if mylib.PYTHON:
                     cell_json['type'] = 'BashArray'
                     cell_json['value'] = val.strs
 
+                elif case(value_e.SparseArray):
+                    val = cast(value.SparseArray, cell.val)
+                    # Users see the same type as for BashArray.  The value is
+                    # index/value pairs, so a[1000000]=x doesn't make a huge
+                    # list.
+                    cell_json['type'] = 'BashArray'
+                    pairs = {}  # type: Dict[str, str]
+                    for i, index in enumerate(val.indices):
+                        pairs[str(index)] = val.strs[i]
+                    cell_json['value'] = pairs
+
                 elif case(value_e.BashAssoc):
                     val = cast(value.BashAssoc, cell.val)
                     cell_json['type'] = 'BashAssoc'
                     cell_json['value'] = val.d
 
+                elif case(value_e.ShInt):
+                    val = cast(value.ShInt, cell.val)
+                    cell_json['type'] = 'Str'
+                    cell_json['value'] = str(val.i)
+
             vars_json[name] = cell_json
 
         return vars_json
 
 
+# GetValue() computes these, so (( LINENO = 5 )) can't make an integer cell
+# that $(( LINENO )) would read
+_COMPUTED_VARS = {
+    'ARGV': True,
+    '_status': True,
+    '_this_dir': True,
+    'PIPESTATUS': True,
+    '_pipeline_status': True,
+    '_process_sub_status': True,
+    'BASH_REMATCH': True,
+    'FUNCNAME': True,
+    'BASH_SOURCE': True,
+    'BASH_LINENO': True,
+    'LINENO': True,
+    'BASHPID': True,
+    '_': True,
+}  # type: Dict[str, bool]
+
+
+def _IntCellToStr(cell):
+    # type: (Cell) -> None
+    """Turn an integer cell from (( i++ )) into a string cell.
+
+    Called when a value or cell leaves Mem, so the rest of the shell only sees
+    value.Str.  The string is computed once per assignment, not once per read.
+    """
+    if cell.val.tag() == value_e.ShInt:
+        val = cast(value.ShInt, cell.val)
+        cell.val = value.Str(str(val.i))
+
+
+# a[i]=x past the end of a BashArray pads it with None.  When the padding
+# would be longer than both this and the array itself, switch to SparseArray.
+_SPARSE_MIN_GAP = 16
+
+
+def _SparseArrayPos(indices, index):
+    # type: (List[int], int) -> int
+    """Binary search for the position of 'index', or where it would go."""
+    n = len(indices)
+    if n == 0 or index > indices[n - 1]:  # fast path for appending
+        return n
+
+    lo = 0
+    hi = n
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if indices[mid] < index:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def SparseArrayGet(val, index):
+    # type: (value.SparseArray, int) -> Optional[str]
+    """Like word_eval.GetArrayItem() for the sparse representation.
+
+    Negative indices count back from the last index, as in bash.
+    """
+    indices = val.indices
+    n = len(indices)
+    if n == 0:
+        return None
+    if index < 0:
+        index += indices[n - 1] + 1
+
+    pos = _SparseArrayPos(indices, index)
+    if pos < n and indices[pos] == index:
+        return val.strs[pos]
+    return None
+
+
+def _SparseArraySet(val, index, s):
+    # type: (value.SparseArray, int, str) -> None
+    indices = val.indices
+    strs = val.strs
+
+    pos = _SparseArrayPos(indices, index)
+    n = len(indices)
+    if pos == n:
+        indices.append(index)
+        strs.append(s)
+        return
+
+    if indices[pos] == index:
+        strs[pos] = s
+        return
+
+    # Shift the tail to make room
+    indices.append(indices[n - 1])
+    strs.append(strs[n - 1])
+    i = n - 1
+    while i > pos:
+        indices[i] = indices[i - 1]
+        strs[i] = strs[i - 1]
+        i -= 1
+    indices[pos] = index
+    strs[pos] = s
+
+
+def _SparseArrayUnset(val, index):
+    # type: (value.SparseArray, int) -> None
+    indices = val.indices
+    n = len(indices)
+    if n == 0:
+        return
+    if index < 0:
+        index += indices[n - 1] + 1
+
+    pos = _SparseArrayPos(indices, index)
+    if pos < n and indices[pos] == index:
+        indices.pop(pos)
+        val.strs.pop(pos)
+
+
+def _DenseToSparse(strs):
+    # type: (List[str]) -> value.SparseArray
+    indices = []  # type: List[int]
+    items = []  # type: List[str]
+    for i, s in enumerate(strs):
+        if s is not None:
+            indices.append(i)
+            items.append(s)
+    return value.SparseArray(indices, items)
+
+
+def SparseToDense(val):
+    # type: (value.SparseArray) -> value.BashArray
+    if len(val.indices) == 0:
+        return value.BashArray([])
+
+    no_str = None  # type: Optional[str]
+    strs = [no_str] * (val.indices[-1] + 1)
+    for i, index in enumerate(val.indices):
+        strs[index] = val.strs[i]
+    return value.BashArray(strs)
+
+
+def MaybeDenseArray(val):
+    # type: (value.SparseArray) -> value_t
+    """Go back to the dense representation once it's at least half full."""
+    indices = val.indices
+    n = len(indices)
+    if n == 0 or 2 * n > indices[n - 1] + 1:
+        return SparseToDense(val)
+    return val
+
+
 def _GetWorkingDir():
     # type: () -> str
     """Fallback for pwd and $PWD when there's no 'cd' and no inherited $PWD."""
@@ -873,6 +1042,103 @@ def InitInteractive(mem):
         SetGlobalString(mem, 'PS1', r'\s-\v\$ ')
 
 
+# These describe the process, not the program, so they're not saved by
+# --save-image.  Exported variables aren't saved either; they come from the
+# environment.
+_PROCESS_VARS = [
+    'UID', 'EUID', 'PPID', 'HOSTNAME', 'OSTYPE', 'PWD', 'OLDPWD', 'SHELLOPTS',
+    'OIL_VERSION', 'OILS_VERSION', '_'
+]
+
+
+def _ImageSafe(val):
+    # type: (value_t) -> bool
+    """Whether a value is plain data, which can be saved in a heap image.
+
+    Code values like value.Func may refer to the interpreter.
+    """
+    UP_val = val
+    with tagswitch(val) as case:
+        if case(value_e.Undef, value_e.Str, value_e.BashArray,
+                value_e.SparseArray, value_e.BashAssoc, value_e.Null,
+                value_e.Bool, value_e.Int, value_e.Float):
+            return True
+
+        elif case(value_e.List):
+            val = cast(value.List, UP_val)
+            for item in val.items:
+                if not _ImageSafe(item):
+                    return False
+            return True
+
+        elif case(value_e.Dict):
+            val = cast(value.Dict, UP_val)
+            for item in val.d.values():
+                if not _ImageSafe(item):
+                    return False
+            return True
+
+        else:
+            return False
+
+
+def _ImageSafeList(vals):
+    # type: (Optional[List[value_t]]) -> bool
+    if vals is not None:
+        for val in vals:
+            if val is None:  # a param with no default value
+                continue
+            if not _ImageSafe(val):
+                return False
+    return True
+
+
+def MakeHeapImage(mem, procs, aliases):
+    # type: (Mem, Dict[str, value.Proc], Dict[str, str]) -> HeapImage
+    """Collect the state that sourcing an rc or library file leaves behind.
+
+    That's global variables, shell functions and procs, and aliases.
+    Options, traps, and the environment aren't saved.
+    """
+    cells = {}  # type: Dict[str, Cell]
+    for name, cell in iteritems(mem.GetAllCells(scope_e.GlobalOnly)):
+        if cell.exported or name in _PROCESS_VARS:
+            continue
+        if _ImageSafe(cell.val):
+            cells[name] = cell
+
+    proc_vals = {}  # type: Dict[str, value_t]
+    for name, proc in iteritems(procs):
+        defaults = proc.defaults
+        if defaults is not None:
+            if (not _ImageSafeList(defaults.for_word) or
+                    not _ImageSafeList(defaults.for_typed)):
+                continue
+            if (defaults.for_named is not None and
+                    not _ImageSafeList(defaults.for_named.values())):
+                continue
+        proc_vals[name] = proc
+
+    alias_copy = {}  # type: Dict[str, str]
+    for name, s in iteritems(aliases):
+        alias_copy[name] = s
+
+    return HeapImage(cells, proc_vals, alias_copy)
+
+
+def RestoreHeapImage(mem, procs, aliases, image):
+    # type: (Mem, Dict[str, value.Proc], Dict[str, str], HeapImage) -> None
+    """Install the state from MakeHeapImage(), as if the file were sourced."""
+    for name, cell in iteritems(image.vars):
+        mem.SetImageCell(name, cell)
+
+    for name, val in iteritems(image.procs):
+        procs[name] = cast(value.Proc, val)
+
+    for name, s in iteritems(image.aliases):
+        aliases[name] = s
+
+
 class ctx_FuncCall(object):
     """For func calls."""
 
@@ -1293,7 +1559,10 @@ class Mem(object):
     def TopNamespace(self):
         # type: () -> Dict[str, Cell]
         """For eval_to_dict()."""
-        return self.var_stack[-1]
+        frame = self.var_stack[-1]
+        for cell in frame.values():
+            _IntCellToStr(cell)
+        return frame
 
     #
     # Argv
@@ -1327,6 +1596,16 @@ class Mem(object):
         """For $* and $@."""
         return self.argv_stack[-1].GetArgv()
 
+    def GetArgvInPlace(self):
+        # type: () -> Tuple[List[str], int]
+        """For 'for x in "$@"', which doesn't copy argv.
+
+        Returns the list and the number of args shifted off.  'shift' and
+        'set --' don't mutate the list, so it's safe to iterate over it.
+        """
+        frame = self.argv_stack[-1]
+        return frame.argv, frame.num_shifted
+
     def SetArgv(self, argv):
         # type: (List[str]) -> None
         """For set -- 1 2 3."""
@@ -1535,6 +1814,9 @@ class Mem(object):
                 lval.name, which_scopes, is_setref)
 
         if cell:
+            if val is None:  # export i, readonly i, declare -n i
+                _IntCellToStr(cell)
+
             # Clear before checking readonly bit.
             # NOTE: Could be cell.flags &= flag_clear_mask
             if flags & ClearExport:
@@ -1649,6 +1931,7 @@ class Mem(object):
                 if cell.readonly:
                     e_die("Can't assign to readonly array", left_loc)
 
+                _IntCellToStr(cell)
                 UP_cell_val = cell.val
                 # undef[0]=y is allowed
                 with tagswitch(UP_cell_val) as case2:
@@ -1673,6 +1956,12 @@ class Mem(object):
 
                         if 0 <= index and index < n:
                             strs[index] = rval.s
+                        elif (index - n > _SPARSE_MIN_GAP and
+                              index - n > n):
+                            # a[1000000]=x shouldn't allocate a million slots
+                            sparse_val = _DenseToSparse(strs)
+                            _SparseArraySet(sparse_val, index, rval.s)
+                            cell.val = sparse_val
                         else:
                             # Fill it in with None.  It could look like this:
                             # ['1', 2, 3, None, None, '4', None]
@@ -1685,6 +1974,21 @@ class Mem(object):
                             strs[lval.index] = rval.s
                         return
 
+                    elif case2(value_e.SparseArray):
+                        sparse_val = cast(value.SparseArray, UP_cell_val)
+                        indices = sparse_val.indices
+
+                        index = lval.index
+                        if index < 0 and len(indices):
+                            index += indices[-1] + 1
+                        if index < 0:
+                            e_die("Index %d is out of bounds" % lval.index,
+                                  left_loc)
+
+                        _SparseArraySet(sparse_val, index, rval.s)
+                        cell.val = MaybeDenseArray(sparse_val)
+                        return
+
                 # This could be an object, eggex object, etc.  It won't be
                 # BashAssoc shouldn because we query IsBashAssoc before evaluating
                 # sh_lhs.  Could conslidate with s[i] case above
@@ -1723,10 +2027,14 @@ class Mem(object):
     def _BindNewArrayWithEntry(self, name_map, lval, val, flags):
         # type: (Dict[str, Cell], sh_lvalue.Indexed, value.Str, int) -> None
         """Fill 'name_map' with a new indexed array entry."""
-        no_str = None  # type: Optional[str]
-        items = [no_str] * lval.index
-        items.append(val.s)
-        new_value = value.BashArray(items)
+        if lval.index > _SPARSE_MIN_GAP:
+            new_value = value.SparseArray([lval.index],
+                                          [val.s])  # type: value_t
+        else:
+            no_str = None  # type: Optional[str]
+            items = [no_str] * lval.index
+            items.append(val.s)
+            new_value = value.BashArray(items)
 
         # arrays can't be exported; can't have BashAssoc flag
         readonly = bool(flags & SetReadOnly)
@@ -1747,6 +2055,27 @@ class Mem(object):
         cell = self.var_stack[0][name]
         cell.val = new_val
 
+    def SetImageCell(self, name, cell):
+        # type: (str, Cell) -> None
+        """Install a global from a heap image.
+
+        Like an assignment in the rc file, the value replaces what the
+        environment set, but the variable stays exported.
+        """
+        frame = self.var_stack[0]
+        existing = frame.get(name)
+        if existing is None:
+            frame[name] = cell
+            return
+
+        if existing.readonly:
+            return
+        tag = cell.val.tag()
+        if existing.exported and tag != value_e.Undef and tag != value_e.Str:
+            return  # exported variables must be strings
+        existing.val = cell.val
+        existing.readonly = cell.readonly
+
     def GetValue(self, name, which_scopes=scope_e.Shopt):
         # type: (str, scope_t) -> value_t
         """Used by the WordEvaluator, ArithEvaluator, ysh/expr_eval.py, etc.
@@ -1895,10 +2224,54 @@ class Mem(object):
         #    We still need a ref_trail to detect cycles.
         cell, _, _ = self._ResolveNameOrRef(name, which_scopes, False)
         if cell:
+            _IntCellToStr(cell)
             return cell.val
 
         return value.Undef
 
+    def GetShInt(self, name):
+        # type: (str) -> Optional[value.ShInt]
+        """Look up an integer cell for $(( i + 1 )) and (( i++ )).
+
+        Returns None if the variable doesn't hold one, e.g. a string that
+        hasn't been assigned in arithmetic.  The caller must not keep it.
+        """
+        cell, _, _ = self._ResolveNameOrRef(name, self.ScopesForReading(),
+                                            False)
+        if cell and cell.val.tag() == value_e.ShInt:
+            return cast(value.ShInt, cell.val)
+        return None
+
+    def SetShInt(self, lval, i, which_scopes):
+        # type: (LeftName, int, scope_t) -> None
+        """Assign an integer in arithmetic, like (( i++ )) or (( i = 0 )).
+
+        The integer stays unboxed until GetValue() needs a string, so a
+        counting loop doesn't convert int -> str -> int on every iteration.
+        """
+        if lval.name not in _COMPUTED_VARS:
+            cell, name_map, cell_name = self._ResolveNameOrRef(
+                lval.name, which_scopes, False)
+            if cell is None:
+                name_map[cell_name] = Cell(False, False, False,
+                                           value.ShInt(i))
+                return
+
+            # Exported cells need a string for the environment anyway
+            if not cell.readonly and not cell.exported and not cell.nameref:
+                UP_val = cell.val
+                with tagswitch(UP_val) as case:
+                    if case(value_e.ShInt):
+                        val = cast(value.ShInt, UP_val)
+                        val.i = i  # mutate; it never leaves Mem
+                        return
+                    elif case(value_e.Undef, value_e.Str):
+                        cell.val = value.ShInt(i)
+                        return
+
+        # Readonly error, arrays, YSH values, etc.
+        self.SetNamed(lval, value.Str(str(i)), which_scopes)
+
     def GetCell(self, name, which_scopes=scope_e.Shopt):
         # type: (str, scope_t) -> Cell
         """Get both the value and flags.
@@ -1913,6 +2286,8 @@ class Mem(object):
             which_scopes = self.ScopesForReading()
 
         cell, _ = self._ResolveNameOnly(name, which_scopes)
+        if cell:
+            _IntCellToStr(cell)
         return cell
 
     def Unset(self, lval, which_scopes):
@@ -1967,6 +2342,11 @@ class Mem(object):
 
                 val = cell.val
                 UP_val = val
+                if val.tag() == value_e.SparseArray:
+                    sparse_val = cast(value.SparseArray, UP_val)
+                    _SparseArrayUnset(sparse_val, lval.index)
+                    return True
+
                 if val.tag() != value_e.BashArray:
                     raise error.Runtime("%r isn't an array" % var_name)
 
@@ -2090,6 +2470,7 @@ class Mem(object):
         result = {}  # type: Dict[str, str]
         for scope in self.var_stack:
             for name, cell in iteritems(scope):
+                _IntCellToStr(cell)
                 # TODO: Show other types?
                 val = cell.val
                 if val.tag() == value_e.Str:
@@ -2117,6 +2498,7 @@ class Mem(object):
 
         for scope in scopes:
             for name, cell in iteritems(scope):
+                _IntCellToStr(cell)
                 result[name] = cell
         return result
 
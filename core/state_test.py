@@ -270,6 +270,81 @@ class MemTest(unittest.TestCase):
         val = mem.GetValue('undef', scope_e.Dynamic)
         test_lib.AssertAsdlEqual(self, value.Undef, val)
 
+    def testShInt(self):
+        mem = _InitMem()
+
+        # (( i = 41 )) then (( i++ ))
+        mem.SetShInt(location.LName('i'), 41, scope_e.Dynamic)
+        mem.SetShInt(location.LName('i'), 42, scope_e.Dynamic)
+        self.assertEqual(42, mem.GetShInt('i').i)
+
+        # echo $i turns it into a string
+        val = mem.GetValue('i')
+        test_lib.AssertAsdlEqual(self, value.Str('42'), val)
+        self.assertEqual(None, mem.GetShInt('i'))
+
+        # Exported and readonly cells stay strings
+        mem.SetValue(location.LName('x'),
+                     value.Str('1'),
+                     scope_e.Dynamic,
+                     flags=state.SetExport)
+        mem.SetShInt(location.LName('x'), 2, scope_e.Dynamic)
+        self.assertEqual(None, mem.GetShInt('x'))
+        self.assertEqual('2', mem.GetExported()['x'])
+
+        mem.SetValue(location.LName('r'),
+                     value.Str('1'),
+                     scope_e.Dynamic,
+                     flags=state.SetReadOnly)
+        self.assertRaises(error.FatalRuntime, mem.SetShInt,
+                          location.LName('r'), 2, scope_e.Dynamic)
+
+    def testSparseArray(self):
+        mem = _InitMem()
+        blame = location.LName('a').blame_loc
+
+        def SetItem(index, s):
+            mem.SetValue(sh_lvalue.Indexed('a', index, blame), value.Str(s),
+                         scope_e.Dynamic)
+
+        # a[1000000]=x doesn't allocate a million slots
+        SetItem(1000000, 'x')
+        val = mem.GetValue('a')
+        test_lib.AssertAsdlEqual(self, value.SparseArray([1000000], ['x']),
+                                 val)
+
+        # Out of order, and negative indices count from the last index
+        SetItem(5, 'five')
+        SetItem(7, 'seven')
+        SetItem(-1, 'X')
+        self.assertEqual([5, 7, 1000000], val.indices)
+        self.assertEqual(['five', 'seven', 'X'], val.strs)
+        self.assertEqual('seven', state.SparseArrayGet(val, 7))
+        self.assertEqual('X', state.SparseArrayGet(val, -1))
+        self.assertEqual(None, state.SparseArrayGet(val, 6))
+
+        mem.Unset(sh_lvalue.Indexed('a', 7, blame), scope_e.Dynamic)
+        mem.Unset(sh_lvalue.Indexed('a', 1000000, blame), scope_e.Dynamic)
+        self.assertEqual([5], val.indices)
+
+        # Once it's half full, it goes back to a BashArray
+        for i in xrange(0, 3):
+            SetItem(i, str(i))
+        val = mem.GetValue('a')
+        test_lib.AssertAsdlEqual(
+            self, value.BashArray(['0', '1', '2', None, None, 'five']), val)
+
+        # A big gap after the end switches to SparseArray
+        SetItem(100, 'y')
+        self.assertEqual(value_e.SparseArray, mem.GetValue('a').tag())
+
+        # But a small one doesn't
+        mem.SetValue(location.LName('b'), value.BashArray(['0']),
+                     scope_e.Dynamic)
+        mem.SetValue(sh_lvalue.Indexed('b', 10, blame), value.Str('x'),
+                     scope_e.Dynamic)
+        self.assertEqual(value_e.BashArray, mem.GetValue('b').tag())
+
     def testExportThenAssign(self):
         """Regression Test."""
         mem = _InitMem()
@@ -287,6 +362,40 @@ class MemTest(unittest.TestCase):
         e = mem.GetExported()
         self.assertEqual('u', e['U'])
 
+    def testHeapImage(self):
+        mem = _InitMem()
+        mem.SetValue(location.LName('x'), value.Str('1'), scope_e.GlobalOnly)
+        mem.SetValue(location.LName('E'),
+                     value.Str('2'),
+                     scope_e.GlobalOnly,
+                     flags=state.SetExport)
+        mem.SetValue(location.LName('R'),
+                     value.Str('3'),
+                     scope_e.GlobalOnly,
+                     flags=state.SetReadOnly)
+        mem.SetValue(location.LName('f'), value.Func('f', None, [], {}, None),
+                     scope_e.GlobalOnly)
+        aliases = {'ll': 'ls -l'}
+
+        image = state.MakeHeapImage(mem, {}, aliases)
+        self.assertEqual(['R', 'x'], sorted(image.vars))  # no export or Func
+        self.assertEqual({'ll': 'ls -l'}, image.aliases)
+
+        mem2 = _InitMem()
+        mem2.SetValue(location.LName('x'),
+                      value.Str('env'),
+                      scope_e.GlobalOnly,
+                      flags=state.SetExport)
+        aliases2 = {}
+        state.RestoreHeapImage(mem2, {}, aliases2, image)
+
+        # Like 'x=1' in an rc file, it's still exported
+        self.assertEqual('1', mem2.GetValue('x').s)
+        self.assertEqual('1', mem2.GetExported()['x'])
+        self.assertEqual('3', mem2.GetValue('R').s)
+        self.assertEqual(value_e.Undef, mem2.GetValue('E').tag())
+        self.assertEqual({'ll': 'ls -l'}, aliases2)
+
     def testUnset(self):
         mem = _InitMem()
         # unset a
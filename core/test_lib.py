@@ -67,7 +67,12 @@ def PrintableString(s):
 
 def TokensEqual(left, right):
     # Ignoring location in CompoundObj.__eq__ now, but we might want this later.
-    return left.id == right.id and left.tval == right.tval
+    if left.id != right.id:
+        return False
+    # Tok(Id.Op_Newline, None) only checks the Id
+    if left.tval is None:
+        return True
+    return left.tval == lexer.TokenVal(right)
     #return left == right
 
 
@@ -210,6 +215,7 @@ def InitCommandEvaluator(parse_ctx=None,
         builtin_i.export_: assign_osh.Export(mem, errfmt),
         builtin_i.readonly: assign_osh.Readonly(mem, errfmt),
     }
+    parse_cache = parse_lib.ParseCache(mutable_opts, 10)
     builtins = {  # Lookup
         builtin_i.echo: io_osh.Echo(exec_opts),
         builtin_i.shift: assign_osh.Shift(mem),
@@ -224,8 +230,8 @@ def InitCommandEvaluator(parse_ctx=None,
         builtin_i.compopt: completion_osh.CompOpt(compopt_state, errfmt),
         builtin_i.compadjust: completion_osh.CompAdjust(mem),
 
-        builtin_i.alias: pure_osh.Alias(aliases, errfmt),
-        builtin_i.unalias: pure_osh.UnAlias(aliases, errfmt),
+        builtin_i.alias: pure_osh.Alias(aliases, parse_cache, errfmt),
+        builtin_i.unalias: pure_osh.UnAlias(aliases, parse_cache, errfmt),
     }
 
     debug_f = util.DebugFile(sys.stderr)
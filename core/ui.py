@@ -21,7 +21,7 @@ from _devbuild.gen.syntax_asdl import (
     source,
     source_e,
 )
-from _devbuild.gen.runtime_asdl import value_str, value_t
+from _devbuild.gen.runtime_asdl import value_e, value_str, value_t
 from asdl import format as fmt
 from frontend import lexer
 from frontend import location
@@ -41,6 +41,9 @@ def ValType(val):
     # type: (value_t) -> str
     """For displaying type errors in the UI."""
 
+    # The sparse representation of an array isn't visible to users
+    if val.tag() == value_e.SparseArray:
+        return 'BashArray'
     return value_str(val.tag(), dot=False)
 
 
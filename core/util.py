@@ -14,6 +14,8 @@ from core import ansi
 from core import pyutil
 from mycpp import mylib
 
+from typing import Dict, Optional
+
 
 class UserExit(Exception):
     """For explicit 'exit'."""
@@ -84,6 +86,70 @@ class DebugFile(_DebugFile):
         return self.f.isatty()
 
 
+class LruIndex(object):
+    """Decides what a bounded cache keeps, and counts hits and misses.
+
+    mycpp has no generic classes, so each cache keeps its own Dict[str, T] and
+    removes the key that Add() returns.  Caches are small, so finding the
+    least recently used key is a linear scan.
+    """
+
+    def __init__(self, name, max_size):
+        # type: (str, int) -> None
+        self.name = name
+        self.max_size = max_size
+
+        self.last_used = {}  # type: Dict[str, int]
+        self.tick = 0
+
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_evictions = 0
+
+    def Hit(self, key):
+        # type: (str) -> None
+        self.num_hits += 1
+        self.tick += 1
+        self.last_used[key] = self.tick
+
+    def Miss(self):
+        # type: () -> None
+        self.num_misses += 1
+
+    def Add(self, key):
+        # type: (str) -> Optional[str]
+        """Record a new key, returning a key the cache must remove, or None."""
+        evicted = None  # type: Optional[str]
+        if key not in self.last_used and len(self.last_used) >= self.max_size:
+            lru_tick = -1
+            for k, t in mylib.iteritems(self.last_used):
+                if evicted is None or t < lru_tick:
+                    evicted = k
+                    lru_tick = t
+            if evicted is not None:
+                mylib.dict_erase(self.last_used, evicted)
+                self.num_evictions += 1
+
+        self.tick += 1
+        self.last_used[key] = self.tick
+        return evicted
+
+    def Clear(self):
+        # type: () -> None
+        """Forget all keys, e.g. when the cache is invalidated."""
+        self.last_used.clear()
+
+    def Size(self):
+        # type: () -> int
+        return len(self.last_used)
+
+    def Stats(self):
+        # type: () -> str
+        return '%s cache: %d hits, %d misses, %d evictions, %d entries' % (
+            self.name, self.num_hits, self.num_misses, self.num_evictions,
+            len(self.last_used))
+
+
 def PrintTopicHeader(topic_id, f):
     # type: (str, mylib.Writer) -> None
     if f.isatty():
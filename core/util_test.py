@@ -18,6 +18,24 @@ class UtilTest(unittest.TestCase):
         n = util.NullDebugFile()
         n.write('foo')
 
+    def testLruIndex(self):
+        lru = util.LruIndex('test', 2)
+        self.assertEqual(None, lru.Add('a'))
+        self.assertEqual(None, lru.Add('b'))
+        lru.Hit('a')
+        self.assertEqual('b', lru.Add('c'))
+        self.assertEqual('a', lru.Add('d'))
+        self.assertEqual(None, lru.Add('d'))  # already present
+
+        lru.Miss()
+        self.assertEqual(1, lru.num_hits)
+        self.assertEqual(1, lru.num_misses)
+        self.assertEqual(2, lru.num_evictions)
+        self.assertEqual(2, lru.Size())
+
+        lru.Clear()
+        self.assertEqual(0, lru.Size())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -4,7 +4,9 @@
 
 #include <ctype.h>  // ispunct()
 #include <errno.h>
+#include <fcntl.h>  // open()
 #include <math.h>  // fmod()
+#include <poll.h>  // poll()
 #include <pwd.h>   // passwd
 #include <signal.h>
 #include <sys/resource.h>  // getrusage
@@ -13,14 +15,16 @@
 #include <sys/time.h>      // gettimeofday
 #include <sys/times.h>     // tms / times()
 #include <sys/utsname.h>   // uname
-#include <sys/wait.h>      // waitpid()
+#include <sys/wait.h>      // wait4()
 #include <termios.h>       // tcgetattr(), tcsetattr()
 #include <time.h>          // time()
 #include <unistd.h>        // getuid(), environ
 
+#include "_gen/core/runtime.asdl.h"  // ResourceUsage
 #include "_gen/cpp/build_stamp.h"  // gCommitHash
 #include "_gen/frontend/consts.h"  // gVersion
 #include "cpp/embedded_file.h"
+#include "mycpp/gc_image.h"
 
 extern char** environ;
 
@@ -28,15 +32,28 @@ namespace pyos {
 
 SignalSafe* gSignalSafe = nullptr;
 
-Tuple2<int, int> WaitPid(int waitpid_options) {
+static double Seconds(struct timeval* tv) {
+  return tv->tv_sec + static_cast<double>(tv->tv_usec) / 1e6;
+}
+
+Tuple2<int, int> WaitPid(int waitpid_options,
+                         runtime_asdl::ResourceUsage* ru) {
   int status;
-  int result = ::waitpid(-1, &status, WUNTRACED | waitpid_options);
+  struct rusage r;
+  int result = ::wait4(-1, &status, WUNTRACED | waitpid_options, &r);
   if (result < 0) {
     if (errno == EINTR && gSignalSafe->PollSigInt()) {
       throw Alloc<KeyboardInterrupt>();
     }
     return Tuple2<int, int>(-1, errno);
   }
+  if (result != 0) {
+    ru->user = Seconds(&r.ru_utime);
+    ru->sys = Seconds(&r.ru_stime);
+    ru->max_rss = r.ru_maxrss;
+    ru->vol_switches = r.ru_nvcsw;
+    ru->invol_switches = r.ru_nivcsw;
+  }
   return Tuple2<int, int>(result, status);
 }
 
@@ -193,11 +210,8 @@ Tuple3<double, double, double> Time() {
   if (::getrusage(RUSAGE_SELF, &ru) == -1) {
     throw Alloc<IOError>(errno);
   }
-  struct timeval* u = &(ru.ru_utime);
-  struct timeval* s = &(ru.ru_stime);
-
-  double user = u->tv_sec + static_cast<double>(u->tv_usec) / 1e6;
-  double sys = s->tv_sec + static_cast<double>(s->tv_usec) / 1e6;
+  double user = Seconds(&ru.ru_utime);
+  double sys = Seconds(&ru.ru_stime);
 
   return Tuple3<double, double, double>(real, user, sys);
 }
@@ -250,9 +264,26 @@ void Sigaction(int sig_num, void (*handler)(int)) {
   }
 }
 
+// The self-pipe that signal handlers write to.  [read end, write end]
+static int gWakeupFds[2] = {-1, -1};
+
+// Called from signal handling context.
+static void WriteWakeupByte(int sig_num) {
+  if (gWakeupFds[1] == -1) {
+    return;
+  }
+  int saved_errno = errno;
+  unsigned char b = sig_num;
+  // If the pipe is full, there's already a wakeup pending
+  ssize_t unused = ::write(gWakeupFds[1], &b, 1);
+  (void)unused;
+  errno = saved_errno;
+}
+
 static void signal_handler(int sig_num) {
   assert(gSignalSafe != nullptr);
   gSignalSafe->UpdateFromSignalHandler(sig_num);
+  WriteWakeupByte(sig_num);
 }
 
 void RegisterSignalInterest(int sig_num) {
@@ -261,6 +292,108 @@ void RegisterSignalInterest(int sig_num) {
   assert(sigaction(sig_num, &act, nullptr) == 0);
 }
 
+static void WakeOnSigChld() {
+  struct sigaction act = {};
+  act.sa_handler = WriteWakeupByte;
+  // So blocking calls like waitpid() aren't interrupted
+  act.sa_flags = SA_RESTART;
+  if (sigaction(SIGCHLD, &act, nullptr) != 0) {
+    throw Alloc<OSError>(errno);
+  }
+}
+
+void InitWakeupPipe() {
+  if (gWakeupFds[0] != -1) {
+    return;
+  }
+
+  int fds[2];
+  if (::pipe(fds) < 0) {
+    throw Alloc<OSError>(errno);
+  }
+  for (int i = 0; i < 2; ++i) {
+    int flags = ::fcntl(fds[i], F_GETFL);
+    ::fcntl(fds[i], F_SETFL, flags | O_NONBLOCK);
+    ::fcntl(fds[i], F_SETFD, FD_CLOEXEC);
+  }
+  gWakeupFds[0] = fds[0];
+  gWakeupFds[1] = fds[1];
+
+  // Leave a 'trap CHLD' handler alone.  It also writes to the pipe.
+  struct sigaction old = {};
+  sigaction(SIGCHLD, nullptr, &old);
+  if (old.sa_handler == SIG_DFL) {
+    WakeOnSigChld();
+  }
+}
+
+void CloseWakeupPipe() {
+  if (gWakeupFds[0] == -1) {
+    return;
+  }
+  int r = gWakeupFds[0];
+  int w = gWakeupFds[1];
+  gWakeupFds[0] = -1;
+  gWakeupFds[1] = -1;  // before close(), for the signal handler
+  ::close(r);
+  ::close(w);
+}
+
+void ResetSigChld() {
+  if (gWakeupFds[0] == -1) {
+    Sigaction(SIGCHLD, SIG_DFL);
+  } else {
+    WakeOnSigChld();
+  }
+}
+
+static void DrainWakeupPipe() {
+  char buf[512];
+  while (::read(gWakeupFds[0], buf, sizeof(buf)) == sizeof(buf)) {
+    ;
+  }
+}
+
+int WaitForWakeup(int fd, int timeout_ms) {
+  assert(gWakeupFds[0] != -1);
+
+  struct pollfd fds[2];
+  int n = 1;
+  fds[0].fd = gWakeupFds[0];
+  fds[0].events = POLLIN;
+  if (fd != -1) {
+    fds[1].fd = fd;
+    fds[1].events = POLLIN;
+    n = 2;
+  }
+
+  // Like WaitPid() and Read(), consume the SIGINT flag and throw.  In Python,
+  // the interpreter's SIGINT handler raises KeyboardInterrupt from poll()
+  // instead, so pyos.WaitForWakeup() doesn't look at the flag.
+  int num_ready = ::poll(fds, n, timeout_ms);
+  if (num_ready < 0) {
+    if (errno == EINTR) {
+      if (gSignalSafe->PollSigInt()) {
+        throw Alloc<KeyboardInterrupt>();
+      }
+      return WAKE_SIGNAL;
+    }
+    throw Alloc<OSError>(errno);
+  }
+
+  if (fds[0].revents) {
+    DrainWakeupPipe();
+    if (gSignalSafe->PollSigInt()) {
+      throw Alloc<KeyboardInterrupt>();
+    }
+    return WAKE_SIGNAL;
+  }
+  if (n == 2 && fds[1].revents) {
+    return WAKE_READABLE;  // including POLLHUP, so read() sees EOF
+  }
+  return WAKE_TIMEOUT;
+}
+
 Tuple2<Str*, int>* MakeDirCacheKey(Str* path) {
   struct stat st;
   if (::stat(path->data(), &st) == -1) {
@@ -386,4 +519,35 @@ grammar::Grammar* LoadYshGrammar(_ResourceLoader*) {
   return gOilGrammar;
 }
 
+bool SaveHeapImage(Str* path, runtime_asdl::HeapImage* image) {
+  int fd = ::open(path->data_, O_CREAT | O_TRUNC | O_WRONLY, 0644);
+  if (fd < 0) {
+    throw Alloc<IOError>(errno);
+  }
+  int status = SaveImage(reinterpret_cast<RawObject*>(image), fd);
+  int err_num = errno;
+  ::close(fd);
+
+  switch (status) {
+  case ImageStatus::Ok:
+    return true;
+  case ImageStatus::WriteError:
+    throw Alloc<IOError>(err_num);
+  default:
+    ::unlink(path->data_);  // nothing was written
+    return false;
+  }
+}
+
+runtime_asdl::HeapImage* LoadHeapImage(Str* path) {
+  int fd = ::open(path->data_, O_RDONLY);
+  if (fd < 0) {
+    throw Alloc<IOError>(errno);
+  }
+  RawObject* root = LoadImage(fd);
+  ::close(fd);  // the mapping stays valid
+
+  return reinterpret_cast<runtime_asdl::HeapImage*>(root);
+}
+
 }  // namespace pyutil
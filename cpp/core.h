@@ -27,6 +27,11 @@ namespace completion {
 class RootCompleter;
 };
 
+namespace runtime_asdl {
+class HeapImage;
+class ResourceUsage;
+};
+
 namespace pyos {
 
 const int TERM_ICANON = ICANON;
@@ -35,7 +40,12 @@ const int EOF_SENTINEL = 256;
 const int NEWLINE_CH = 10;
 const int UNTRAPPED_SIGWINCH = -1;
 
-Tuple2<int, int> WaitPid(int waitpid_options);
+// WaitForWakeup() return values
+const int WAKE_TIMEOUT = 0;
+const int WAKE_SIGNAL = 1;
+const int WAKE_READABLE = 2;
+
+Tuple2<int, int> WaitPid(int waitpid_options, runtime_asdl::ResourceUsage* ru);
 Tuple2<int, int> Read(int fd, int n, List<Str*>* chunks);
 Tuple2<int, int> ReadByte(int fd);
 Str* ReadLine();
@@ -108,6 +118,7 @@ class SignalSafe {
       : pending_signals_(AllocSignalList()),
         empty_list_(AllocSignalList()),  // to avoid repeated allocation
         last_sig_num_(0),
+        received_signal_(false),
         received_sigint_(false),
         received_sigwinch_(false),
         sigwinch_code_(UNTRAPPED_SIGWINCH),
@@ -124,6 +135,7 @@ class SignalSafe {
       // we could expose somewhere in the UI.
       num_dropped_++;
     }
+    received_signal_ = true;
 
     if (sig_num == SIGINT) {
       received_sigint_ = true;
@@ -170,6 +182,26 @@ class SignalSafe {
 #endif
   }
 
+  // Main thread wants the last pending signal other than sig_num, or 0.  The
+  // 'wait' builtin uses this so a trapped SIGCHLD doesn't hide another signal.
+  int LastSignalExcept(int sig_num) {
+    for (int i = len(pending_signals_) - 1; i >= 0; --i) {
+      int s = pending_signals_->at(i);
+      if (s != sig_num) {
+        return s == SIGWINCH ? sigwinch_code_ : s;
+      }
+    }
+    return 0;
+  }
+
+  // Main thread wants to know if any signal was received since the last time
+  // PollSignal was called.
+  bool PollSignal() {
+    bool result = received_signal_;
+    received_signal_ = false;
+    return result;
+  }
+
   // Main thread wants to know if SIGINT was received since the last time
   // PollSigInt was called.
   bool PollSigInt() {
@@ -220,6 +252,7 @@ class SignalSafe {
 #endif
   // Not sufficient: volatile sig_atomic_t last_sig_num_;
 
+  int received_signal_;
   int received_sigint_;
   int received_sigwinch_;
   int sigwinch_code_;
@@ -235,6 +268,11 @@ void Sigaction(int sig_num, void (*handler)(int));
 
 void RegisterSignalInterest(int sig_num);
 
+void InitWakeupPipe();
+void CloseWakeupPipe();
+void ResetSigChld();
+int WaitForWakeup(int fd, int timeout_ms);
+
 Tuple2<Str*, int>* MakeDirCacheKey(Str* path);
 
 }  // namespace pyos
@@ -268,6 +306,9 @@ Str* BackslashEscape(Str* s, Str* meta_chars);
 
 grammar::Grammar* LoadYshGrammar(_ResourceLoader*);
 
+bool SaveHeapImage(Str* path, runtime_asdl::HeapImage* image);
+runtime_asdl::HeapImage* LoadHeapImage(Str* path);
+
 }  // namespace pyutil
 
 #endif  // LEAKY_CORE_H
@@ -5,8 +5,10 @@
 #include <signal.h>       // SIG*, kill()
 #include <sys/stat.h>     // stat
 #include <sys/utsname.h>  // uname
+#include <sys/wait.h>     // WEXITSTATUS
 #include <unistd.h>       // getpid(), getuid(), environ
 
+#include "_gen/core/runtime.asdl.h"  // ResourceUsage
 #include "cpp/embedded_file.h"
 #include "cpp/stdlib.h"         // posix::getcwd
 #include "mycpp/gc_builtins.h"  // IOError_OSError
@@ -172,9 +174,20 @@ TEST pyos_test() {
   ASSERT(t.at1() >= 0.0);
   ASSERT(t.at2() >= 0.0);
 
-  Tuple2<int, int> result = pyos::WaitPid(0);
+  auto ru = runtime_asdl::ResourceUsage::CreateNull();
+  Tuple2<int, int> result = pyos::WaitPid(0, ru);
   ASSERT_EQ(-1, result.at0());  // no children to wait on
 
+  int pid = fork();
+  if (pid == 0) {
+    _exit(3);
+  }
+  result = pyos::WaitPid(0, ru);
+  ASSERT_EQ(pid, result.at0());
+  ASSERT_EQ(3, WEXITSTATUS(result.at1()));
+  ASSERT(ru->max_rss > 0);
+  ASSERT(ru->user >= 0.0);
+
   // This test isn't hermetic but it should work in most places, including in a
   // container
 
@@ -295,6 +308,46 @@ TEST signal_test() {
   PASS();
 }
 
+TEST wakeup_test() {
+  pyos::SignalSafe* signal_safe = pyos::InitSignalSafe();
+  pyos::InitWakeupPipe();
+  pyos::InitWakeupPipe();  // idempotent
+
+  ASSERT_EQ(pyos::WAKE_TIMEOUT, pyos::WaitForWakeup(-1, 0));
+
+  // A child exiting wakes us up, but it's not a signal we're interested in
+  signal_safe->PollSignal();
+  pid_t pid = fork();
+  if (pid == 0) {
+    _exit(0);
+  }
+  ASSERT_EQ(pyos::WAKE_SIGNAL, pyos::WaitForWakeup(-1, 5000));
+  ASSERT(!signal_safe->PollSignal());
+  ASSERT_EQ(pid, waitpid(pid, nullptr, 0));
+
+  pyos::RegisterSignalInterest(SIGUSR1);
+  kill(getpid(), SIGUSR1);
+  ASSERT_EQ(pyos::WAKE_SIGNAL, pyos::WaitForWakeup(-1, 5000));
+  ASSERT(signal_safe->PollSignal());
+  pyos::Sigaction(SIGUSR1, SIG_IGN);
+
+  // The pipe was drained
+  ASSERT_EQ(pyos::WAKE_TIMEOUT, pyos::WaitForWakeup(-1, 0));
+
+  int fds[2];
+  ASSERT_EQ(0, pipe(fds));
+  ASSERT_EQ(pyos::WAKE_TIMEOUT, pyos::WaitForWakeup(fds[0], 10));
+  ASSERT_EQ(1, write(fds[1], "x", 1));
+  ASSERT_EQ(pyos::WAKE_READABLE, pyos::WaitForWakeup(fds[0], 10));
+  close(fds[0]);
+  close(fds[1]);
+
+  pyos::CloseWakeupPipe();
+  pyos::ResetSigChld();
+
+  PASS();
+}
+
 TEST signal_safe_test() {
   pyos::SignalSafe signal_safe;
 
@@ -319,6 +372,27 @@ TEST signal_safe_test() {
   PASS();
 }
 
+TEST last_signal_except_test() {
+  pyos::SignalSafe signal_safe;
+
+  ASSERT_EQ_FMT(0, signal_safe.LastSignalExcept(SIGCHLD), "%d");
+  signal_safe.UpdateFromSignalHandler(SIGCHLD);
+  ASSERT_EQ_FMT(0, signal_safe.LastSignalExcept(SIGCHLD), "%d");
+
+  // A trapped SIGCHLD that comes last doesn't hide SIGUSR1
+  signal_safe.UpdateFromSignalHandler(SIGUSR1);
+  signal_safe.UpdateFromSignalHandler(SIGCHLD);
+  ASSERT_EQ_FMT(SIGCHLD, signal_safe.LastSignal(), "%d");
+  ASSERT_EQ_FMT(SIGUSR1, signal_safe.LastSignalExcept(SIGCHLD), "%d");
+
+  // Untrapped SIGWINCH
+  signal_safe.UpdateFromSignalHandler(SIGWINCH);
+  ASSERT_EQ_FMT(pyos::UNTRAPPED_SIGWINCH,
+                signal_safe.LastSignalExcept(SIGCHLD), "%d");
+
+  PASS();
+}
+
 TEST passwd_test() {
   uid_t my_uid = getuid();
   Str* username = pyos::GetUserName(my_uid);
@@ -398,7 +472,9 @@ int main(int argc, char** argv) {
   RUN_TEST(strerror_test);
 
   RUN_TEST(signal_test);
+  RUN_TEST(wakeup_test);
   RUN_TEST(signal_safe_test);
+  RUN_TEST(last_signal_except_test);
 
   RUN_TEST(passwd_test);
   RUN_TEST(dir_cache_key_test);
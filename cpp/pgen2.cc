@@ -26,19 +26,31 @@ int PNode::NumChildren() {
   return children.size();
 }
 
-PNodeAllocator::PNodeAllocator() : arena_(new std::vector<PNode>()) {
-  arena_->reserve(512);
+PNodeAllocator::PNodeAllocator()
+    : blocks_(new std::vector<PNode*>()), num_used_(0) {
 }
 
 PNode* PNodeAllocator::NewPNode(int typ, syntax_asdl::Token* tok) {
-  CHECK(arena_->size() < arena_->capacity());
-  arena_->emplace_back(typ, tok, nullptr);
-  return arena_->data() + (arena_->size() - 1);
+  int block_index = num_used_ / kBlockSize;
+  if (block_index == static_cast<int>(blocks_->size())) {
+    blocks_->push_back(new PNode[kBlockSize]);
+  }
+  PNode* node = (*blocks_)[block_index] + (num_used_ % kBlockSize);
+  num_used_++;
+
+  node->typ = typ;
+  node->tok = tok;
+  node->children.clear();  // keeps its capacity
+  return node;
+}
+
+int PNodeAllocator::Mark() {
+  return num_used_;
 }
 
-void PNodeAllocator::Clear() {
-  delete arena_;
-  arena_ = nullptr;
+void PNodeAllocator::Reset(int mark) {
+  DCHECK(0 <= mark && mark <= num_used_);
+  num_used_ = mark;
 }
 
 }  // namespace pnode
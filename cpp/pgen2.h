@@ -53,6 +53,8 @@ namespace pnode {
 
 class PNode {
  public:
+  PNode() : typ(0), tok(nullptr), children() {
+  }
   PNode(int typ, syntax_asdl::Token* tok, List<PNode*>*);
 
   void AddChild(PNode* node);
@@ -64,20 +66,28 @@ class PNode {
   std::vector<PNode*> children;
 };
 
+// PNodes live in fixed-size blocks, so pointers to them stay valid as more
+// are allocated.  The blocks are reused by every expression the parser sees:
+// ctx_PNodeAllocator calls Reset() with the Mark() from before the expression,
+// which also keeps the capacity of each node's children vector.
 class PNodeAllocator {
  public:
   PNodeAllocator();
 
   PNode* NewPNode(int typ, syntax_asdl::Token* tok);
-  void Clear();
+  int Mark();
+  void Reset(int mark);
 
   static constexpr ObjHeader obj_header() {
     return ObjHeader::Class(HeapTag::Opaque, kZeroMask, sizeof(PNodeAllocator));
   }
 
+  static const int kBlockSize = 256;
+
  private:
-  // We put this on the heap so we can call its destructor from `Clear()`...
-  std::vector<PNode>* arena_;
+  // On the heap because this object is GC-allocated and Opaque
+  std::vector<PNode*>* blocks_;
+  int num_used_;
 };
 
 }  // namespace pnode
@@ -90,6 +90,9 @@ inline int fork() {
   if (result < 0) {
     throw Alloc<OSError>(errno);
   }
+  if (result == 0) {
+    gHeap.OnFork();  // keep pages shared with the parent
+  }
   return result;
 }
 
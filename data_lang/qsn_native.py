@@ -11,6 +11,7 @@ from _devbuild.gen.syntax_asdl import Token
 from _devbuild.gen.types_asdl import lex_mode_e
 from core.error import p_die
 from frontend import consts
+from frontend.lexer import TokenVal
 from mycpp.mylib import log
 
 _ = log
@@ -68,7 +69,7 @@ def Parse(lexer):
 
     # Doesn't work because we want to allow literal newlines / tabs
     if tok.id == Id.Char_Literals:
-        if not IsWhitespace(tok.tval):
+        if not IsWhitespace(TokenVal(tok)):
             p_die("Unexpected data after closing quote", tok)
         tok = lexer.Read(lex_mode_e.QSN)
 
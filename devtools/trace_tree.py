@@ -0,0 +1,150 @@
+#!/usr/bin/env python2
+"""
+trace_tree.py - Merge the files written by OILS_TRACE_DIR into a process tree.
+
+Usage:
+    OILS_TRACE_DIR=_tmp/trace bin/osh build.sh
+    devtools/trace_tree.py _tmp/trace
+
+Each line shows a process, why it was started, how long it ran, its exit
+status, how many simple commands it ran, and what it exec'd.  The CPU time
+(user + sys) and max RSS come from wait4() in the parent.
+"""
+from __future__ import print_function
+
+import json
+import os
+import sys
+
+
+class Proc(object):
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.ppid = -1
+        self.why = 'shell'
+        self.argv = None  # argv of the external command, or exec
+        self.start = None  # first event, or fork in the parent
+        self.end = None  # last event, or wait in the parent
+        self.status = None
+        self.cpu = None  # user + sys seconds
+        self.max_rss = None  # KiB
+        self.num_cmds = 0
+        self.children = []
+
+
+def _Get(procs, pid):
+    p = procs.get(pid)
+    if p is None:
+        p = Proc(pid)
+        procs[pid] = p
+    return p
+
+
+def Load(trace_dir):
+    procs = {}
+    for name in os.listdir(trace_dir):
+        if not name.endswith('.jsonl'):
+            continue
+        with open(os.path.join(trace_dir, name)) as f:
+            for line in f:
+                try:
+                    event = json.loads(line.decode('utf-8', 'replace'))
+                except ValueError:
+                    continue  # the process may have been killed mid-line
+                _Apply(procs, event)
+    return procs
+
+
+def _Apply(procs, event):
+    p = _Get(procs, event['pid'])
+    t = event['t']
+    ev = event['ev']
+
+    if p.start is None or t < p.start:
+        p.start = t
+    if p.end is None or t > p.end:
+        p.end = t
+
+    if ev == 'start':
+        p.ppid = event['ppid']
+    elif ev == 'cmd':
+        p.num_cmds += 1
+    elif ev == 'exec':
+        p.argv = event['argv']
+    elif ev == 'exit':
+        p.status = event['status']
+
+    elif ev == 'fork':
+        child = _Get(procs, event['child'])
+        child.ppid = p.pid
+        child.why = event['why']
+        if 'argv' in event:
+            child.argv = event['argv']
+        child.start = t
+    elif ev == 'wait':
+        child = _Get(procs, event['child'])
+        child.status = event['status']
+        child.end = t
+        if 'user' in event:
+            child.cpu = event['user'] + event['sys']
+            child.max_rss = event['max_rss']
+
+
+def Print(p, depth, f):
+    if p.start is not None and p.end is not None:
+        dur = '%10.3f ms' % ((p.end - p.start) * 1000.0)
+    else:
+        dur = '%13s' % '?'
+    status = '?' if p.status is None else str(p.status)
+    if p.cpu is not None:
+        usage = '%10.3f ms  %8d K' % (p.cpu * 1000.0, p.max_rss)
+    else:
+        usage = '%13s  %9s' % ('?', '?')
+
+    parts = ['%s%d' % ('  ' * depth, p.pid), p.why]
+    if p.num_cmds:
+        parts.append('%d cmds' % p.num_cmds)
+    if p.argv is not None:
+        parts.append(' '.join(p.argv))
+    print('%s  %3s  %s  %s' % (dur, status, usage, '  '.join(parts)),
+          file=f)
+
+    for child in sorted(p.children, key=lambda c: c.start):
+        Print(child, depth + 1, f)
+
+
+def MakeTree(procs):
+    """Link each process to its parent, and return the roots."""
+    roots = []
+    for p in procs.values():
+        parent = procs.get(p.ppid)
+        if parent is None:
+            roots.append(p)
+        else:
+            parent.children.append(p)
+    return roots
+
+
+def PrintTree(roots, f):
+    print('%13s  %3s  %13s  %9s  %s' %
+          ('duration', 'st', 'cpu', 'max rss', 'pid  why  ...'),
+          file=f)
+    for p in sorted(roots, key=lambda r: r.start):
+        Print(p, 0, f)
+
+
+def main(argv):
+    if len(argv) != 2:
+        raise RuntimeError('Usage: trace_tree.py TRACE_DIR')
+
+    procs = Load(argv[1])
+    PrintTree(MakeTree(procs), sys.stdout)
+
+
+if __name__ == '__main__':
+    try:
+        main(sys.argv)
+    except RuntimeError as e:
+        print('FATAL: %s' % e, file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python2
+"""trace_tree_test.py: Tests for trace_tree.py."""
+from __future__ import print_function
+
+import cStringIO
+import os
+import shutil
+import tempfile
+import unittest
+
+from devtools import trace_tree  # module under test
+
+# A shell that runs /bin/true and ( exit 3 ), like OILS_TRACE_DIR writes it
+_PARENT = """\
+{"t": 10.000000, "pid": 100, "ev": "start", "ppid": 1}
+{"t": 10.001000, "pid": 100, "ev": "cmd", "argv": ["/bin/true"], "line": "t.sh:1"}
+{"t": 10.002000, "pid": 100, "ev": "fork", "child": 101, "why": "command", "argv": ["/bin/true"]}
+{"t": 10.012000, "pid": 100, "ev": "wait", "child": 101, "status": 0, "user": 0.001000, "sys": 0.002000, "max_rss": 1024, "vcsw": 1, "ivcsw": 0}
+{"t": 10.013000, "pid": 100, "ev": "cmd_end", "status": 0}
+{"t": 10.014000, "pid": 100, "ev": "fork", "child": 102, "why": "forkwait"}
+{"t": 10.020000, "pid": 100, "ev": "wait", "child": 102, "status": 3, "user": 0.000000, "sys": 0.001000, "max_rss": 2048, "vcsw": 0, "ivcsw": 0}
+{"t": 10.030000, "pid": 100, "ev": "exit", "status": 3}
+"""
+
+_EXTERNAL = """\
+{"t": 10.003000, "pid": 101, "ev": "start", "ppid": 100}
+{"t": 10.004000, "pid": 101, "ev": "exec", "argv": ["/bin/true"]}
+"""
+
+# The subshell was killed while writing its last line
+_SUBSHELL = """\
+{"t": 10.015000, "pid": 102, "ev": "start", "ppid": 100}
+{"t": 10.016000, "pid": 102, "ev": "cmd", "argv": ["exit", "3"], "line": "t.sh:2"}
+{"t": 10.017000, "pid": 102, "ev": "cmd_e"""
+
+_EXPECTED = """\
+     duration   st            cpu    max rss  pid  why  ...
+    30.000 ms    3              ?          ?  100  shell  1 cmds
+    10.000 ms    0       3.000 ms      1024 K    101  command  /bin/true
+     6.000 ms    3       1.000 ms      2048 K    102  forkwait  1 cmds
+"""
+
+
+class TraceTreeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.trace_dir = tempfile.mkdtemp()
+        for name, contents in [('100.jsonl', _PARENT),
+                               ('101.jsonl', _EXTERNAL),
+                               ('102.jsonl', _SUBSHELL),
+                               ('README', 'not a trace')]:
+            with open(os.path.join(self.trace_dir, name), 'w') as f:
+                f.write(contents)
+
+    def tearDown(self):
+        shutil.rmtree(self.trace_dir)
+
+    def testLoad(self):
+        procs = trace_tree.Load(self.trace_dir)
+        self.assertEqual([100, 101, 102], sorted(procs))
+
+        p = procs[101]
+        self.assertEqual(100, p.ppid)
+        self.assertEqual('command', p.why)
+        self.assertEqual(['/bin/true'], p.argv)
+        self.assertEqual(0, p.status)
+
+        # The parent's fork and wait events bound the child's lifetime
+        p = procs[102]
+        self.assertEqual(10.014, p.start)
+        self.assertEqual(10.020, p.end)
+        self.assertEqual(3, p.status)
+        self.assertEqual(1, p.num_cmds)
+
+    def testPrintTree(self):
+        procs = trace_tree.Load(self.trace_dir)
+        roots = trace_tree.MakeTree(procs)
+        self.assertEqual([100], [p.pid for p in roots])
+
+        f = cStringIO.StringIO()
+        trace_tree.PrintTree(roots, f)
+        self.assertEqual(_EXPECTED, f.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
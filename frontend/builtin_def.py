@@ -63,6 +63,8 @@ _NORMAL_BUILTINS = [
 
     'runproc',
     'boolstatus',
+
+    'par',
 ]
 # yapf: enable
 
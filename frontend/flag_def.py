@@ -159,6 +159,12 @@ EXEC_SPEC = FlagSpec('exec')
 WAIT_SPEC = FlagSpec('wait')
 WAIT_SPEC.ShortFlag('-n')
 
+PAR_SPEC = FlagSpec('par')
+PAR_SPEC.ShortFlag('-j', args.Int, help='run at most this many at once')
+PAR_SPEC.ShortFlag('-k', help='write the output of each item in order')
+PAR_SPEC.LongFlag('--keep-going',
+                  help="don't cancel the remaining items after a failure")
+
 TRAP_SPEC = FlagSpec('trap')
 TRAP_SPEC.ShortFlag('-p')
 TRAP_SPEC.ShortFlag('-l')
@@ -167,6 +173,8 @@ JOB_SPEC = FlagSpec('jobs')
 JOB_SPEC.ShortFlag('-l', help='long format')
 JOB_SPEC.ShortFlag('-p', help='prints PID only')
 JOB_SPEC.LongFlag('--debug', help='display debug info')
+JOB_SPEC.LongFlag('--rusage',
+                  help='show CPU time and memory of finished processes')
 
 #
 # FlagSpecAndMore
@@ -243,6 +251,11 @@ MAIN_SPEC.LongFlag('--rcfile', args.String)
 MAIN_SPEC.LongFlag('--rcdir', args.String)
 MAIN_SPEC.LongFlag('--norc')
 
+# Save globals, functions, and aliases when the shell exits, and restore them
+# instead of running rc files.  See state.MakeHeapImage().
+MAIN_SPEC.LongFlag('--save-image', args.String)
+MAIN_SPEC.LongFlag('--load-image', args.String)
+
 # e.g. to pass data on stdin but pretend that it came from a .hay file
 MAIN_SPEC.LongFlag('--location-str', args.String)
 MAIN_SPEC.LongFlag('--location-start-line', args.Int)
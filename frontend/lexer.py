@@ -33,8 +33,10 @@ def IsPlusEquals(tok):
 
 def TokenVal(tok):
     # type: (Token) -> str
-    """Compute string value on demand."""
-    return tok.line.content[tok.col:tok.col + tok.length]
+    """Compute string value on demand, and cache it on the token."""
+    if tok.tval is None:
+        tok.tval = tok.line.content[tok.col:tok.col + tok.length]
+    return tok.tval
 
 
 def TokenSliceLeft(tok, left_index):
@@ -232,22 +234,6 @@ class LineLexer(object):
             # LineLexer tells Lexer to read a new line.
             return self.eol_tok
 
-        # TODO: can inline this function with formula on 16-bit Id.
-        kind = consts.GetKind(tok_type)
-
-        # Save on allocations!  We often don't look at the token value.
-        # Whitelist doesn't work well?  Use blacklist for now.
-        # - Kind.KW is sometimes a literal in a word
-        # - Kind.Right is for " in here docs.  Lexer isn't involved.
-        # - Got an error with Kind.Left too that I don't understand
-        # - Kind.ControlFlow doesn't work because we word_.StaticEval()
-        # if kind in (Kind.Lit, Kind.VSub, Kind.Redir, Kind.Char, Kind.Backtick, Kind.KW, Kind.Right):
-        if kind in (Kind.Arith, Kind.Op, Kind.VTest, Kind.VOp0, Kind.VOp2,
-                    Kind.VOp3, Kind.WS, Kind.Ignored, Kind.Eof):
-            tok_val = None  # type: Optional[str]
-        else:
-            tok_val = line_str[line_pos:end_pos]
-
         # NOTE: We're putting the arena hook in LineLexer and not Lexer because we
         # want it to be "low level".  The only thing fabricated here is a newline
         # added at the last line, so we don't end with \0.
@@ -256,6 +242,21 @@ class LineLexer(object):
             self.replace_last_token = False
 
         tok_len = end_pos - line_pos
+        if self.arena.eager_tval:
+            # TODO: can inline this function with formula on 16-bit Id.
+            kind = consts.GetKind(tok_type)
+
+            # osh -n prints operators and whitespace without a value, as _
+            if kind in (Kind.Arith, Kind.Op, Kind.VTest, Kind.VOp0, Kind.VOp2,
+                        Kind.VOp3, Kind.WS, Kind.Ignored, Kind.Eof):
+                tok_val = None  # type: Optional[str]
+            else:
+                tok_val = line_str[line_pos:end_pos]
+        else:
+            # Save on allocations!  We often don't look at the token value, and
+            # TokenVal() slices src_line when we do.
+            tok_val = None
+
         t = self.arena.NewToken(tok_type, line_pos, tok_len, self.src_line,
                                 tok_val)
 
@@ -12,6 +12,7 @@ from _devbuild.gen.types_asdl import lex_mode_e
 from core.test_lib import Tok
 from mycpp.mylib import log
 from core import test_lib
+from frontend import lexer
 from frontend import lexer_def
 from frontend import consts
 from frontend import match
@@ -292,7 +293,8 @@ class LineLexerTest(unittest.TestCase):
         # self.assertTrue(test_lib.TokensEqual(left, right))
         self.assertEqual(left.id, right.id,
                          '%s != %s' % (Id_str(left.id), Id_str(right.id)))
-        self.assertEqual(left.tval, right.tval)
+        if left.tval is not None:
+            self.assertEqual(left.tval, lexer.TokenVal(right))
 
     def testReadOuter(self):
         l = test_lib.InitLineLexer('\n', self.arena)
@@ -11,6 +11,7 @@ from core import test_lib
 from core.test_lib import Tok
 from mycpp.mylib import log
 from frontend.lexer_def import LEXER_DEF
+from frontend import lexer
 from frontend import reader
 
 
@@ -57,6 +58,28 @@ class TokenTest(unittest.TestCase):
         t = Tok(Id.Op_Semi, ';')
         print(t)
 
+    def testTokenVal(self):
+        arena = test_lib.MakeArena('<lexer_test.py>')
+        _, lx = test_lib.InitLexer('echo ;', arena)
+
+        t = lx.Read(lex_mode_e.ShCommand)
+        self.assertEqual(None, t.tval)  # not computed yet
+        self.assertEqual('echo', lexer.TokenVal(t))
+        self.assertEqual('echo', t.tval)  # cached
+
+        # osh -n shows operators without a value
+        arena.EagerTokenValues()
+        _, lx = test_lib.InitLexer('echo ;', arena)
+
+        t = lx.Read(lex_mode_e.ShCommand)
+        self.assertEqual('echo', t.tval)
+        t = lx.Read(lex_mode_e.ShCommand)
+        self.assertEqual(Id.WS_Space, t.id)
+        t = lx.Read(lex_mode_e.ShCommand)
+        self.assertEqual(Id.Op_Semi, t.id)
+        self.assertEqual(None, t.tval)
+        self.assertEqual(';', lexer.TokenVal(t))
+
     def testPrintStats(self):
         states = sorted(LEXER_DEF.items(),
                         key=lambda pair: len(pair[1]),
@@ -279,6 +279,12 @@ def _Init(opt_def):
     opt_def.Add('failglob')
     opt_def.Add('extglob')
 
+    # OILS_PROFILE=out.txt turns this on.  Attributes time to shell stacks.
+    opt_def.Add('profile')
+
+    # Wait for children in poll(), woken by SIGCHLD and other signals
+    opt_def.Add('event_wait')
+
     # Compatibility
     opt_def.Add(
         'eval_unsafe_arith')  # recursive parsing and evaluation (ble.sh)
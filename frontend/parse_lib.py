@@ -4,13 +4,18 @@ parse_lib.py - Consolidate various parser instantiations here.
 
 from _devbuild.gen.id_kind_asdl import Id_t
 from _devbuild.gen.syntax_asdl import (Token, CompoundWord, expr_t, Redir,
-                                       ArgList, Proc, Func, command, pat_t)
+                                       ArgList, Proc, Func, command, pat_t,
+                                       command_t, source)
 from _devbuild.gen.types_asdl import lex_mode_e
 from _devbuild.gen import grammar_nt
 
+from core import pyutil
 from core import state
+from core import util
+from frontend import consts
 from frontend import lexer
 from frontend import reader
+from pgen2.pnode import PNodeAllocator
 
 from ysh import expr_parse
 from ysh import expr_to_ast
@@ -24,9 +29,10 @@ from mycpp.mylib import log
 
 _ = log
 
-from typing import Any, List, Tuple, Dict, TYPE_CHECKING
+from typing import Any, List, Tuple, Dict, Optional, TYPE_CHECKING
 if TYPE_CHECKING:
     from core.alloc import Arena
+    from core.pyutil import _ResourceLoader
     from core.util import _DebugFile
     from core import optview
     from frontend.lexer import Lexer
@@ -184,6 +190,83 @@ if TYPE_CHECKING:
     AliasesInFlight = List[Tuple[str, int]]
 
 
+class _ParseCacheEntry(object):
+
+    def __init__(self, src, nodes, opts):
+        # type: (source.ArgvWord, List[command_t], int) -> None
+        self.src = src  # shared by the tokens of every node
+        self.nodes = nodes
+        self.opts = opts  # parse options it was parsed with
+
+
+class ParseCache(object):
+    """A bounded LRU cache from code strings to parsed commands.
+
+    Used by 'eval' and 'trap', so code that's generated in a loop is only
+    parsed once.  Parsing depends on aliases and parse options, so 'alias' and
+    'unalias' call Clear(), and each entry remembers the parse options.
+    """
+
+    def __init__(self, mutable_opts, max_size):
+        # type: (state.MutableOpts, int) -> None
+        self.mutable_opts = mutable_opts
+
+        self.entries = {}  # type: Dict[str, _ParseCacheEntry]
+        self.lru = util.LruIndex('eval_trap', max_size)
+        self.generation = 0  # incremented by Clear()
+
+    def _ParseOpts(self):
+        # type: () -> int
+        bits = 0
+        for i, opt_num in enumerate(consts.PARSE_OPTION_NUMS):
+            if self.mutable_opts.Get(opt_num):
+                bits |= 1 << i
+        return bits
+
+    def Get(self, code_str, src):
+        # type: (str, source.ArgvWord) -> Optional[List[command_t]]
+        """Return the commands for code_str, or None.
+
+        On a hit, errors in the commands are blamed on src.location.
+        """
+        entry = self.entries.get(code_str)
+        if (entry is None or entry.src.what != src.what or
+                entry.opts != self._ParseOpts()):
+            self.lru.Miss()
+            return None
+
+        entry.src.location = src.location
+        self.lru.Hit(code_str)
+        return entry.nodes
+
+    def Stamp(self):
+        # type: () -> Tuple[int, int]
+        """Call before parsing, and pass the result to Put()."""
+        return self._ParseOpts(), self.generation
+
+    def Put(self, code_str, src, nodes, stamp):
+        # type: (str, source.ArgvWord, List[command_t], Tuple[int, int]) -> None
+        """Save the commands, unless aliases or parse options changed.
+
+        'eval' parses and runs one line at a time, so the code itself may
+        change them.
+        """
+        opts, generation = stamp
+        if generation != self.generation or opts != self._ParseOpts():
+            return
+
+        evicted = self.lru.Add(code_str)
+        if evicted is not None:
+            mylib.dict_erase(self.entries, evicted)
+        self.entries[code_str] = _ParseCacheEntry(src, nodes, opts)
+
+    def Clear(self):
+        # type: () -> None
+        self.entries.clear()
+        self.lru.Clear()
+        self.generation += 1
+
+
 class ParseContext(object):
     """Context shared between the mutually recursive Command and Word parsers.
 
@@ -197,24 +280,24 @@ class ParseContext(object):
                  aliases,
                  ysh_grammar,
                  one_pass_parse=False):
-        # type: (Arena, optview.Parse, Dict[str, str], Grammar, bool) -> None
+        # type: (Arena, optview.Parse, Dict[str, str], Optional[Grammar], bool) -> None
         self.arena = arena
         self.parse_opts = parse_opts
         self.aliases = aliases
-        self.ysh_grammar = ysh_grammar
         self.one_pass_parse = one_pass_parse
 
-        # NOTE: The transformer is really a pure function.
+        # If ysh_grammar is None, Init_GrammarLoader() may provide a way to load
+        # it on first use.  Otherwise it's a hack for unit tests.
+        self.ysh_grammar = None  # type: Optional[Grammar]
+        self.tr = None  # type: Optional[expr_to_ast.Transformer]
+        if mylib.PYTHON:
+            self.p_printer = None  # type: Optional[expr_parse.ParseTreePrinter]
         if ysh_grammar:
-            self.tr = expr_to_ast.Transformer(ysh_grammar)
-        else:  # hack for unit tests, which pass None
-            self.tr = None
+            self._SetGrammar(ysh_grammar)
+        self.loader = None  # type: Optional[_ResourceLoader]
 
-        if mylib.PYTHON:
-            if self.tr:
-                self.p_printer = self.tr.p_printer
-            else:
-                self.p_printer = None
+        # Shared by every expression we parse; see ctx_PNodeAllocator
+        self.pnode_alloc = PNodeAllocator()
 
         # Completion state lives here since it may span multiple parsers.
         self.trail = _BaseTrail()  # no-op by default
@@ -223,6 +306,23 @@ class ParseContext(object):
         # type: (_BaseTrail) -> None
         self.trail = trail
 
+    def Init_GrammarLoader(self, loader):
+        # type: (_ResourceLoader) -> None
+        """Load the YSH grammar when the first expression is parsed.
+
+        Building the grammar tables is a big part of shell startup, and most
+        OSH scripts never need them.
+        """
+        self.loader = loader
+
+    def _SetGrammar(self, ysh_grammar):
+        # type: (Grammar) -> None
+        self.ysh_grammar = ysh_grammar
+        # NOTE: The transformer is really a pure function.
+        self.tr = expr_to_ast.Transformer(ysh_grammar)
+        if mylib.PYTHON:
+            self.p_printer = self.tr.p_printer
+
     def MakeLexer(self, line_reader):
         # type: (_Reader) -> Lexer
         """Helper function.
@@ -293,13 +393,20 @@ class ParseContext(object):
         lx = self.MakeLexer(line_reader)
         return word_parse.WordParser(self, lx, line_reader)
 
+    def _YshGrammar(self):
+        # type: () -> Grammar
+        if self.ysh_grammar is None:
+            assert self.loader is not None
+            self._SetGrammar(pyutil.LoadYshGrammar(self.loader))
+        return self.ysh_grammar
+
     def _YshParser(self):
         # type: () -> expr_parse.ExprParser
-        return expr_parse.ExprParser(self, self.ysh_grammar, False)
+        return expr_parse.ExprParser(self, self._YshGrammar(), False)
 
     def _TeaParser(self):
         # type: () -> expr_parse.ExprParser
-        return expr_parse.ExprParser(self, self.ysh_grammar, True)
+        return expr_parse.ExprParser(self, self._YshGrammar(), True)
 
     def ParseVarDecl(self, kw_token, lexer):
         # type: (Token, Lexer) -> Tuple[command.VarDecl, Token]
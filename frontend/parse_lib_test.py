@@ -0,0 +1,83 @@
+#!/usr/bin/env python2
+"""
+parse_lib_test.py: Tests for parse_lib.py
+"""
+
+import unittest
+
+from _devbuild.gen.option_asdl import option_i
+from _devbuild.gen.syntax_asdl import command, loc, source
+from core import state
+from core import test_lib
+from frontend import parse_lib  # module under test
+
+
+def _MakeCache(max_size):
+    mem = state.Mem('', [], test_lib.MakeArena('<parse_lib_test.py>'), [])
+    _, _, mutable_opts = state.MakeOpts(mem, None)
+    return parse_lib.ParseCache(mutable_opts, max_size), mutable_opts
+
+
+class ParseCacheTest(unittest.TestCase):
+
+    def testHitAndMiss(self):
+        cache, _ = _MakeCache(10)
+        nodes = [command.NoOp]
+
+        src = source.ArgvWord('eval', loc.Missing)
+        self.assertEqual(None, cache.Get('echo hi', src))
+
+        cache.Put('echo hi', src, nodes, cache.Stamp())
+        self.assertEqual(nodes, cache.Get('echo hi', src))
+
+        # The error location is updated on a hit
+        blame = loc.Word(None)
+        self.assertEqual(nodes,
+                         cache.Get('echo hi', source.ArgvWord('eval', blame)))
+        self.assertEqual(blame, src.location)
+
+        # 'trap' doesn't share entries with 'eval'
+        trap_src = source.ArgvWord('trap', loc.Missing)
+        self.assertEqual(None, cache.Get('echo hi', trap_src))
+
+        self.assertEqual(2, cache.lru.num_hits)
+        self.assertEqual(2, cache.lru.num_misses)
+
+    def testEvictLeastRecentlyUsed(self):
+        cache, _ = _MakeCache(2)
+        src = source.ArgvWord('eval', loc.Missing)
+
+        cache.Put('a', src, [], cache.Stamp())
+        cache.Put('b', src, [], cache.Stamp())
+        cache.Get('a', src)
+        cache.Put('c', src, [], cache.Stamp())  # evicts b
+
+        self.assertEqual([], cache.Get('a', src))
+        self.assertEqual(None, cache.Get('b', src))
+        self.assertEqual([], cache.Get('c', src))
+        self.assertEqual(1, cache.lru.num_evictions)
+
+    def testInvalidation(self):
+        cache, mutable_opts = _MakeCache(10)
+        src = source.ArgvWord('eval', loc.Missing)
+
+        # alias changed while the code was run
+        stamp = cache.Stamp()
+        cache.Clear()
+        cache.Put('a', src, [], stamp)
+        self.assertEqual(None, cache.Get('a', src))
+
+        cache.Put('a', src, [], cache.Stamp())
+        cache.Clear()
+        self.assertEqual(None, cache.Get('a', src))
+
+        # Parse options are part of the key
+        cache.Put('a', src, [], cache.Stamp())
+        mutable_opts.Push(option_i.parse_paren, True)
+        self.assertEqual(None, cache.Get('a', src))
+        mutable_opts.Pop(option_i.parse_paren)
+        self.assertEqual([], cache.Get('a', src))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,8 +22,10 @@ def DefineTargets(ru):
         '//mycpp/runtime',
         # Could separate into //mycpp/runtime_{marksweep,bumpleak}
         srcs=[
+            'mycpp/alloc_profile.cc',
             'mycpp/bump_leak_heap.cc',
             'mycpp/gc_builtins.cc',
+            'mycpp/gc_image.cc',
             'mycpp/gc_mylib.cc',
             'mycpp/gc_str.cc',
             'mycpp/hash.cc',
@@ -42,12 +44,14 @@ def DefineTargets(ru):
                  phony_prefix='mycpp-unit')
 
     for test_main in [
+            'mycpp/alloc_profile_test.cc',
             'mycpp/mark_sweep_heap_test.cc',
             'mycpp/gc_heap_test.cc',
             'mycpp/gc_stress_test.cc',
             'mycpp/gc_builtins_test.cc',
             'mycpp/gc_mylib_test.cc',
             'mycpp/gc_dict_test.cc',
+            'mycpp/gc_image_test.cc',
             'mycpp/gc_list_test.cc',
             'mycpp/gc_str_test.cc',
             'mycpp/gc_tuple_test.cc',
@@ -60,6 +64,7 @@ def DefineTargets(ru):
                      phony_prefix='mycpp-unit')
 
     for test_main in [
+            'mycpp/demo/fork_pages.cc',
             'mycpp/demo/gc_header.cc',
             'mycpp/demo/hash_table.cc',
             'mycpp/demo/target_lang.cc',
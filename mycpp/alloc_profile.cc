@@ -0,0 +1,137 @@
+#include "mycpp/alloc_profile.h"
+
+#include <fcntl.h>     // open()
+#include <inttypes.h>  // PRId64
+#include <stdio.h>     // dprintf()
+#include <string.h>    // strlen()
+#include <unistd.h>    // getpid(), close()
+
+#include <algorithm>  // sort()
+#include <vector>
+
+#include "mycpp/gc_builtins.h"  // StringToInteger()
+
+const char* gAllocFunc = nullptr;
+
+const int64_t kDefaultInterval = 4096;
+
+void AllocProfile::Init() {
+  char* e = getenv("OILS_ALLOC_PROFILE");
+  if (e == nullptr || strlen(e) == 0) {
+    return;
+  }
+
+  int64_t interval = kDefaultInterval;
+  char* i = getenv("OILS_ALLOC_PROFILE_INTERVAL");
+  if (i) {
+    int result;
+    if (StringToInteger(i, strlen(i), 10, &result) && result > 0) {
+      interval = result;
+    }
+  }
+  Init(e, interval);
+}
+
+void AllocProfile::Init(const char* path, int64_t interval) {
+  path_ = path;
+  pid_ = getpid();
+  interval_ = interval;
+  countdown_ = interval;
+}
+
+void AllocProfile::Sample(void* place, size_t num_bytes) {
+  Flush();
+
+  // A big object may cross several intervals, and it represents all of them
+  int64_t n = -countdown_ / interval_ + 1;
+  countdown_ += n * interval_;
+
+  pending_ = static_cast<ObjHeader*>(place);
+  pending_func_ = gAllocFunc;
+  pending_bytes_ = num_bytes;
+  pending_weight_ = n * interval_;
+}
+
+void AllocProfile::Flush() {
+  if (pending_ == nullptr) {
+    return;
+  }
+  // Alloc<T>(), NewStr(), and NewSlab() have written the header by now
+  int type_tag = pending_->type_tag;
+  Counts& c = counts_[Key(pending_func_, type_tag)];
+  c.bytes += pending_weight_;
+  c.samples++;
+  c.sampled_bytes += pending_bytes_;
+
+  pending_ = nullptr;
+}
+
+static const char* TypeTagName(int type_tag) {
+  switch (type_tag) {
+  case TypeTag::OtherClass:
+    return "OtherClass";
+  case TypeTag::Str:
+    return "Str";
+  case TypeTag::Slab:
+    return "Slab";
+  case TypeTag::Tuple:
+    return "Tuple";
+  case TypeTag::List:
+    return "List";
+  case TypeTag::Dict:
+    return "Dict";
+  default:
+    return nullptr;  // an ASDL variant
+  }
+}
+
+void AllocProfile::WriteReport(int fd) {
+  Flush();
+
+  std::vector<std::pair<Key, Counts>> rows(counts_.begin(), counts_.end());
+  std::sort(rows.begin(), rows.end(),
+            [](const std::pair<Key, Counts>& a,
+               const std::pair<Key, Counts>& b) {
+              return a.second.bytes > b.second.bytes;
+            });
+
+  dprintf(fd, "bytes\tsamples\tavg_size\ttype_tag\tfunc\tlocation\n");
+  for (auto& row : rows) {
+    const char* func = row.first.first;
+    int type_tag = row.first.second;
+    Counts& c = row.second;
+
+    dprintf(fd, "%" PRId64 "\t%d\t%" PRId64 "\t", c.bytes, c.samples,
+            c.sampled_bytes / c.samples);
+    const char* name = TypeTagName(type_tag);
+    if (name) {
+      dprintf(fd, "%s\t", name);
+    } else {
+      dprintf(fd, "%d\t", type_tag);
+    }
+    // allocations outside translated code, e.g. in main()
+    dprintf(fd, "%s\n", func ? func : "-\t-");
+  }
+}
+
+void AllocProfile::MaybeWriteReport() {
+  if (!enabled()) {
+    return;
+  }
+
+  char child_path[1024];
+  const char* path = path_;
+  int pid = getpid();
+  if (pid != pid_) {
+    snprintf(child_path, sizeof(child_path), "%s.%d", path_, pid);
+    path = child_path;
+  }
+
+  int fd = open(path, O_WRONLY | O_CREAT | O_TRUNC, 0644);
+  if (fd < 0) {
+    log("OILS_ALLOC_PROFILE: couldn't open %s", path);
+    return;
+  }
+  WriteReport(fd);
+  close(fd);
+}
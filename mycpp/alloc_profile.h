@@ -0,0 +1,104 @@
+// alloc_profile.h: Sampling allocation profiler
+//
+// OILS_ALLOC_PROFILE=path turns it on.  Every allocation subtracts its size
+// from a countdown, and when it goes below zero, we record the TypeTag of the
+// object and the translated function that allocated it.  So we sample about
+// one object every OILS_ALLOC_PROFILE_INTERVAL bytes.
+//
+// At exit, MarkSweepHeap writes a TSV report to 'path', with one row per
+// (function, TypeTag) pair.  Child processes write to 'path.$PID'.
+
+#ifndef MYCPP_ALLOC_PROFILE_H
+#define MYCPP_ALLOC_PROFILE_H
+
+#include <stdint.h>  // int64_t
+#include <stdlib.h>  // size_t
+
+#include <map>
+#include <utility>  // std::pair
+
+#include "mycpp/common.h"
+#include "mycpp/gc_obj.h"  // ObjHeader
+
+// The innermost translated function that may allocate, or nullptr.
+// It's a string literal like "osh.word_.StaticEval\tosh/word_.py:42".
+extern const char* gAllocFunc;
+
+// mycpp generates
+//
+//   AllocFunc _alloc_func("osh.word_.StaticEval\tosh/word_.py:42");
+//
+// at the top of functions that may allocate.  It's always on, so it costs a
+// load and two stores, without a branch.
+class AllocFunc {
+ public:
+  explicit AllocFunc(const char* name) : saved_(gAllocFunc) {
+    gAllocFunc = name;
+  }
+
+  ~AllocFunc() {
+    gAllocFunc = saved_;
+  }
+
+ private:
+  const char* saved_;
+
+  DISALLOW_COPY_AND_ASSIGN(AllocFunc);
+};
+
+class AllocProfile {
+ public:
+  AllocProfile() {
+  }
+
+  // Read OILS_ALLOC_PROFILE and OILS_ALLOC_PROFILE_INTERVAL
+  void Init();
+  // For unit tests
+  void Init(const char* path, int64_t interval);
+
+  // Called by MarkSweepHeap::Allocate() for every object.  The header hasn't
+  // been written yet, so Sample() only remembers where it will be.
+  void OnAllocate(void* place, size_t num_bytes) {
+    countdown_ -= num_bytes;
+    if (countdown_ < 0) {
+      Sample(place, num_bytes);
+    }
+  }
+
+  // Record the pending sample.  Must be called before the GC frees it.
+  void Flush();
+
+  void WriteReport(int fd);
+  void MaybeWriteReport();
+
+  bool enabled() {
+    return path_ != nullptr;
+  }
+
+ private:
+  struct Counts {
+    int64_t bytes;          // estimated bytes allocated
+    int samples;            // number of objects sampled
+    int64_t sampled_bytes;  // their total size
+  };
+  // (gAllocFunc, type_tag)
+  typedef std::pair<const char*, int> Key;
+
+  void Sample(void* place, size_t num_bytes);
+
+  const char* path_ = nullptr;
+  int pid_ = 0;  // child processes write to a different file
+  int64_t interval_ = 0;
+  int64_t countdown_ = INT64_MAX;  // never sample when off
+
+  ObjHeader* pending_ = nullptr;
+  const char* pending_func_ = nullptr;
+  int64_t pending_bytes_ = 0;
+  int64_t pending_weight_ = 0;
+
+  std::map<Key, Counts> counts_;
+
+  DISALLOW_COPY_AND_ASSIGN(AllocProfile);
+};
+
+#endif  // MYCPP_ALLOC_PROFILE_H
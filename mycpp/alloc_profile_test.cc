@@ -0,0 +1,88 @@
+#include "mycpp/alloc_profile.h"
+
+#include <unistd.h>  // pipe()
+
+#include "mycpp/runtime.h"
+#include "vendor/greatest.h"
+
+// Write the report to a pipe and read it back
+static void ReadReport(AllocProfile* p, char* buf, int buf_len) {
+  int fds[2];
+  CHECK(pipe(fds) == 0);
+  p->WriteReport(fds[1]);
+  close(fds[1]);
+
+  int n = read(fds[0], buf, buf_len - 1);
+  CHECK(n >= 0);
+  buf[n] = '\0';
+  close(fds[0]);
+}
+
+TEST sample_test() {
+  AllocProfile p;
+  ASSERT_FALSE(p.enabled());
+  p.Init("unused", 100);
+  ASSERT(p.enabled());
+
+  ObjHeader str_header = ObjHeader::Str();
+  ObjHeader asdl_header = ObjHeader::AsdlClass(7, 2);
+
+  {
+    AllocFunc f("mod.Foo\tmod.py:10");
+    // 300 bytes crosses the interval at 120 and 210 bytes
+    for (int i = 0; i < 10; ++i) {
+      p.OnAllocate(&str_header, 30);
+    }
+  }
+  ASSERT_EQ(nullptr, gAllocFunc);
+
+  // One big object represents 3 intervals
+  p.OnAllocate(&asdl_header, 250);
+
+  char buf[1024];
+  ReadReport(&p, buf, sizeof(buf));
+  log("%s", buf);
+
+  ASSERT_STR_EQ(
+      "bytes\tsamples\tavg_size\ttype_tag\tfunc\tlocation\n"
+      "300\t1\t250\t7\t-\t-\n"
+      "200\t2\t30\tStr\tmod.Foo\tmod.py:10\n",
+      buf);
+
+  PASS();
+}
+
+TEST heap_test() {
+  gHeap.alloc_profile_.Init("/dev/null", 1);
+
+  {
+    AllocFunc f("mod.Bar\tmod.py:20");
+    StrFromC("hello");
+    NewList<int>();
+  }
+
+  char buf[1024];
+  ReadReport(&gHeap.alloc_profile_, buf, sizeof(buf));
+  log("%s", buf);
+
+  ASSERT(strstr(buf, "Str\tmod.Bar\tmod.py:20\n") != nullptr);
+  ASSERT(strstr(buf, "List\tmod.Bar\tmod.py:20\n") != nullptr);
+
+  PASS();
+}
+
+GREATEST_MAIN_DEFS();
+
+int main(int argc, char** argv) {
+  gHeap.Init();
+
+  GREATEST_MAIN_BEGIN();
+
+  RUN_TEST(sample_test);
+  RUN_TEST(heap_test);
+
+  gHeap.CleanProcessExit();
+
+  GREATEST_MAIN_END(); /* display results */
+  return 0;
+}
@@ -36,6 +36,16 @@ class BumpLeakHeap {
     roots_.pop_back();
 #endif
   }
+  void RemoveRoot(RawObject** p) {
+#ifdef BUMP_ROOT
+    for (int i = roots_.size() - 1; i >= 0; --i) {
+      if (roots_[i] == p) {
+        roots_.erase(roots_.begin() + i);
+        return;
+      }
+    }
+#endif
+  }
 
   void RootGlobalVar(void* root) {
   }
@@ -55,7 +65,11 @@ class BumpLeakHeap {
   void CleanProcessExit();
   void ProcessExit();
 
+  void OnFork() {
+  }
+
   bool is_initialized_ = true;  // mark/sweep doesn't need to be initialized
+  bool post_fork_ = false;      // there's no GC to defer
 
   // In number of live objects, since we aren't keeping track of total bytes
   int gc_threshold_;
@@ -0,0 +1,245 @@
+"""
+callgraph_pass.py - AST pass that finds functions that can collect garbage.
+
+The GC only runs at explicit mylib.MaybeCollect() calls.  A function that can't
+reach one of those calls doesn't need StackRoot registrations for its locals,
+which saves a push and pop on the roots_ vector per local.
+
+The analysis is conservative: calls we can't resolve (function values, Any,
+methods with unknown receivers) are assumed to collect.
+"""
+from typing import Optional, List
+
+from mypy.traverser import TraverserVisitor
+from mypy.nodes import (MypyFile, FuncBase, FuncDef, Decorator, CallExpr,
+                        NameExpr, MemberExpr, SuperExpr, RefExpr, TypeInfo,
+                        Var, Expression)
+from mypy.types import (Type, Instance, TupleType, UnionType, CallableType,
+                        TypeType, NoneType)
+
+from mycpp import pass_state
+from mycpp.util import log
+
+_ = log
+
+# The manual GC point, after NormalizeName()
+_COLLECT = 'mylib.MaybeCollect'
+
+# Runtime functions that call back into translated code.  raw_input() runs the
+# readline completer.
+_CALLBACK_FUNCS = ('builtins.raw_input',)
+
+
+def NormalizeName(fullname: str) -> str:
+    # mycpp_main.py removes these prefixes from module names too
+    for prefix in ('oil.', 'mycpp.'):
+        if fullname.startswith(prefix):
+            return fullname[len(prefix):]
+    return fullname
+
+
+def FuncName(func: FuncBase) -> str:
+    """Key for MayCollect, shared with cppgen_pass.py."""
+    return NormalizeName(func.fullname)
+
+
+def OwnMethod(info: TypeInfo, name: str) -> Optional[FuncBase]:
+    """A method defined directly in this class."""
+    sym = info.names.get(name)
+    if sym is None:
+        return None
+    node = sym.node
+    if isinstance(node, Decorator):  # @staticmethod
+        node = node.func
+    if isinstance(node, FuncBase):
+        return node
+    return None
+
+
+def LookupMethod(info: TypeInfo, name: str) -> Optional[FuncBase]:
+    for cls in info.mro:
+        if name in cls.names:
+            return OwnMethod(cls, name)
+    return None
+
+
+def IsGlobalRef(e: Expression) -> bool:
+    """f or module.f, but not obj.method."""
+    if isinstance(e, NameExpr):
+        return True
+    if isinstance(e, MemberExpr):
+        obj = e.expr
+        return isinstance(obj, RefExpr) and isinstance(obj.node, MypyFile)
+    return False
+
+
+class Build(TraverserVisitor):
+
+    def __init__(self, types, may_collect: pass_state.MayCollect,
+                 translated: List[str]) -> None:
+        self.types = types
+        self.may_collect = may_collect
+        self.translated = translated
+
+        # base class TypeInfo -> list of all (transitive) subclasses
+        self.subclasses = {}
+        self.current_func = None  # type: Optional[str]
+
+    def OnModule(self, o: MypyFile) -> None:
+        """Record the class hierarchy.
+
+        Call this on every module before visiting any of them, so method calls
+        can be resolved to overrides in modules we haven't visited yet.
+        """
+        for sym in o.names.values():
+            info = sym.node
+            if isinstance(info, TypeInfo) and info.module_name == o.fullname:
+                for base in info.mro[1:]:
+                    self.subclasses.setdefault(base, []).append(info)
+
+    def IsTranslated(self, fullname: str) -> bool:
+        for mod_name in self.translated:
+            if fullname.startswith(mod_name + '.'):
+                return True
+        return False
+
+    def _Unknown(self) -> None:
+        self.may_collect.OnCollect(self.current_func)
+
+    def _AddCallee(self, func: FuncBase) -> None:
+        self._AddCalleeName(FuncName(func))
+
+    def _AddCalleeName(self, callee: str) -> None:
+        if callee == _COLLECT:
+            self.may_collect.OnCollect(self.current_func)
+            return
+
+        if self.IsTranslated(callee):
+            self.may_collect.OnCall(self.current_func, callee)
+            return
+
+        # Other runtime functions are written in C++, and don't collect
+        if callee in _CALLBACK_FUNCS:
+            self.may_collect.OnCollect(self.current_func)
+
+    def _AddMissing(self, info: TypeInfo) -> None:
+        """The method isn't defined in Python."""
+        if self.IsTranslated(NormalizeName(info.fullname)):
+            # e.g. a field with a Callable type
+            self._Unknown()
+        # Otherwise it's a C++ class, like ASDL types or optview::Exec
+
+    def _AddConstructor(self, info: TypeInfo) -> None:
+        # The constructor, and the destructor for context managers
+        for name in ('__init__', '__exit__'):
+            func = LookupMethod(info, name)
+            if func:
+                self._AddCallee(func)
+
+    def _AddStatic(self, info: TypeInfo, name: str) -> None:
+        """Base.__init__(self), Class.static_method()"""
+        func = LookupMethod(info, name)
+        if func:
+            self._AddCallee(func)
+        else:
+            self._AddMissing(info)
+
+    def _AddMethod(self, info: TypeInfo, name: str) -> None:
+        """A virtual call could go to any override in a subclass."""
+        func = LookupMethod(info, name)
+        if func is None:
+            self._AddMissing(info)
+            return
+        self._AddCallee(func)
+
+        for sub in self.subclasses.get(info, []):
+            func = OwnMethod(sub, name)
+            if func:
+                self._AddCallee(func)
+
+    def _AddReceiver(self, typ: Type, name: str) -> None:
+        if isinstance(typ, Instance):
+            self._AddMethod(typ.type, name)
+        elif isinstance(typ, TupleType):
+            self._AddMethod(typ.partial_fallback.type, name)
+        elif isinstance(typ, UnionType):
+            for item in typ.items:
+                self._AddReceiver(item, name)
+        elif isinstance(typ, NoneType):  # the None in Optional[T]
+            pass
+        elif isinstance(typ, CallableType) and typ.is_type_obj():
+            self._AddStatic(typ.type_object(), name)
+        elif isinstance(typ, TypeType) and isinstance(typ.item, Instance):
+            self._AddStatic(typ.item.type, name)
+        else:
+            self._Unknown()
+
+    def _AddCall(self, callee: Expression) -> None:
+        if isinstance(callee, MemberExpr) and IsGlobalRef(callee):
+            mod_name = NormalizeName(callee.expr.node.fullname)
+            if mod_name not in self.translated:
+                # e.g. match.IsValidVarName is bound to a C++ function
+                self._AddCalleeName(NormalizeName(callee.fullname))
+                return
+
+        if IsGlobalRef(callee):
+            node = callee.node
+            if isinstance(node, Decorator):
+                node = node.func
+
+            if isinstance(node, FuncBase):  # f() or module.f()
+                self._AddCallee(node)
+            elif isinstance(node, TypeInfo):  # Foo()
+                self._AddConstructor(node)
+            elif isinstance(node, Var):  # case(), with a __call__ method
+                typ = self.types.get(callee) or node.type
+                if isinstance(typ, Instance):
+                    self._AddMethod(typ.type, '__call__')
+                else:
+                    self._Unknown()
+            else:
+                self._Unknown()
+            return
+
+        if isinstance(callee, MemberExpr):
+            obj = callee.expr
+            if isinstance(obj, RefExpr) and isinstance(obj.node, TypeInfo):
+                typ = self.types.get(callee)
+                if isinstance(typ, CallableType) and typ.is_type_obj():
+                    # value.Str(), an alias for a nested class
+                    self._AddConstructor(typ.type_object())
+                else:
+                    self._AddStatic(obj.node, callee.name)
+                return
+
+            typ = self.types.get(obj)
+            if typ is None:
+                self._Unknown()
+            else:
+                self._AddReceiver(typ, callee.name)
+            return
+
+        if isinstance(callee, SuperExpr) and callee.info:
+            self._AddStatic(callee.info.mro[1], callee.name)
+            return
+
+        # Calling a function value, etc.
+        self._Unknown()
+
+    def visit_func_def(self, o: FuncDef) -> None:
+        if self.current_func is not None:
+            # Nested functions aren't translated
+            TraverserVisitor.visit_func_def(self, o)
+            return
+
+        self.current_func = FuncName(o)
+        self.may_collect.OnFunc(self.current_func)
+
+        TraverserVisitor.visit_func_def(self, o)
+
+        self.current_func = None
+
+    def visit_call_expr(self, o: CallExpr) -> None:
+        if self.current_func is not None:
+            self._AddCall(o.callee)
+        TraverserVisitor.visit_call_expr(self, o)
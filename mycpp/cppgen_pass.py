@@ -7,6 +7,7 @@ import json  # for "C escaping"
 from typing import overload, Union, Optional, Dict
 
 import mypy
+from mypy.traverser import TraverserVisitor
 from mypy.visitor import ExpressionVisitor, StatementVisitor
 from mypy.types import (Type, AnyType, NoneTyp, TupleType, Instance, NoneType,
                         Overloaded, CallableType, UnionType, UninhabitedType,
@@ -14,8 +15,10 @@ from mypy.types import (Type, AnyType, NoneTyp, TupleType, Instance, NoneType,
 from mypy.nodes import (Expression, Statement, NameExpr, IndexExpr, MemberExpr,
                         TupleExpr, ExpressionStmt, IfStmt, StrExpr, SliceExpr,
                         FuncDef, UnaryExpr, OpExpr, ComparisonExpr, CallExpr,
-                        IntExpr, ListExpr, DictExpr, ListComprehension)
+                        IntExpr, ListExpr, DictExpr, ListComprehension,
+                        GeneratorExpr, YieldExpr)
 
+from mycpp import callgraph_pass
 from mycpp import format_strings
 from mycpp.crash import catch_errors
 from mycpp.util import log
@@ -358,6 +361,52 @@ def PythonStringLiteral(s: str) -> str:
     return json.dumps(format_strings.DecodeMyPyString(s))
 
 
+class _AllocSites(TraverserVisitor):
+    """Find expressions that may allocate.
+
+    Calls may allocate in the runtime, e.g. str.upper(), and so can string
+    operators and slices.
+    """
+
+    def __init__(self) -> None:
+        self.found = False
+
+    def visit_call_expr(self, o: CallExpr) -> None:
+        self.found = True
+
+    def visit_op_expr(self, o: OpExpr) -> None:
+        if o.op in ('+', '*', '%'):
+            self.found = True
+        TraverserVisitor.visit_op_expr(self, o)
+
+    def visit_slice_expr(self, o: SliceExpr) -> None:
+        self.found = True
+
+    def visit_list_expr(self, o: ListExpr) -> None:
+        self.found = True
+
+    def visit_dict_expr(self, o: DictExpr) -> None:
+        self.found = True
+
+    def visit_tuple_expr(self, o: TupleExpr) -> None:
+        self.found = True
+
+    def visit_list_comprehension(self, o: ListComprehension) -> None:
+        self.found = True
+
+    def visit_generator_expr(self, o: GeneratorExpr) -> None:
+        self.found = True
+
+    def visit_yield_expr(self, o: YieldExpr) -> None:
+        self.found = True  # appends to the accumulator
+
+
+def _MayAllocate(func: FuncDef) -> bool:
+    v = _AllocSites()
+    func.body.accept(v)
+    return v.found
+
+
 class Generate(ExpressionVisitor[T], StatementVisitor[None]):
 
     def __init__(self,
@@ -370,6 +419,8 @@ class Generate(ExpressionVisitor[T], StatementVisitor[None]):
                  field_gc=None,
                  decl=False,
                  forward_decl=False,
+                 may_collect=None,
+                 stack_alloc=None,
                  stack_roots_warn=None):
         self.types = types
         self.const_lookup = const_lookup
@@ -386,6 +437,11 @@ class Generate(ExpressionVisitor[T], StatementVisitor[None]):
 
         self.decl = decl
         self.forward_decl = forward_decl
+        # pass_state.MayCollect: functions that can't collect don't need
+        # StackRoot
+        self.may_collect = may_collect
+        # function name -> locals that escape_pass.py says can be StackAlloc<T>
+        self.stack_alloc = stack_alloc
         self.stack_roots_warn = stack_roots_warn
 
         self.unique_id = 0
@@ -393,6 +449,7 @@ class Generate(ExpressionVisitor[T], StatementVisitor[None]):
         self.indent = 0
         self.local_var_list = []  # Collected at assignment
         self.prepend_to_block = None  # For writing vars after {
+        self.prepend_alloc_func = None  # FuncDef for AllocFunc after {
         self.current_func_node = None
         self.current_stmt_node = None
         # Temporary lists to use as output params for generators
@@ -1336,6 +1393,19 @@ class Generate(ExpressionVisitor[T], StatementVisitor[None]):
 
             callee = o.rvalue.callee
 
+            #    buf = mylib.BufWriter()
+            # -> StackAlloc<mylib::BufWriter> _stack_buf;
+            #    buf = _stack_buf.get();
+            if self._IsStackAlloc(lval) and self._IsInstantiation(o.rvalue):
+                self.write_ind('StackAlloc<')
+                self.accept(callee)
+                self.write('> _stack_%s', lval.name)
+                if o.rvalue.args:  # avoid most vexing parse
+                    self._WriteArgList(o.rvalue)
+                self.write(';\n')
+                self.write_ind('%s = _stack_%s.get();\n', lval.name, lval.name)
+                return
+
             if callee.name == 'NewDict':
                 lval_type = self.types[lval]
 
@@ -1788,7 +1858,7 @@ class Generate(ExpressionVisitor[T], StatementVisitor[None]):
             # it's called in a loop by _ExecuteList().  Although the 'child'
             # variable is already live by other means.
             # TODO: Test how much this affects performance.
-            if CTypeIsManaged(c_item_type):
+            if CTypeIsManaged(c_item_type) and self._NeedsStackRoots():
                 self.write_ind('  StackRoot _for(&')
                 self.accept(index_expr)
                 self.write_ind(');\n')
@@ -2205,6 +2275,7 @@ class Generate(ExpressionVisitor[T], StatementVisitor[None]):
                 (lval_name, c_type, lval_name in arg_names)
                 for (lval_name, c_type) in self.local_vars[o]
             ]
+            self.prepend_alloc_func = o
 
         self.accept(o.body)
         self.current_func_node = None
@@ -2339,6 +2410,14 @@ class Generate(ExpressionVisitor[T], StatementVisitor[None]):
 
                 self.field_gc[o] = ('HeapTag::FixedSize', 'field_mask()')
 
+            # A ctx_ object lives on the C++ stack, where the GC can't see it.
+            # So a FieldRoots member roots its pointer fields while it's alive.
+            ctx_roots = []
+            if o.name.startswith('ctx_'):
+                for name in sorted_member_names:
+                    if CTypeIsManaged(GetCType(self.member_vars[name])):
+                        ctx_roots.append(name)
+
             # Write member variables
 
             #log('MEMBERS for %s: %s', o.name, list(self.member_vars.keys()))
@@ -2348,7 +2427,18 @@ class Generate(ExpressionVisitor[T], StatementVisitor[None]):
 
                 for name in sorted_member_names:
                     c_type = GetCType(self.member_vars[name])
-                    self.decl_write_ind('%s %s;\n', c_type, name)
+                    if name in ctx_roots:
+                        # Never trace an uninitialized pointer
+                        self.decl_write_ind('%s %s = nullptr;\n', c_type, name)
+                    else:
+                        self.decl_write_ind('%s %s;\n', c_type, name)
+
+            # Declared after the fields, so it's constructed after they're
+            # initialized, and destroyed after the destructor body runs
+            if ctx_roots:
+                self.decl_write_ind(
+                    'FieldRoots<%d> field_roots_{%s};\n', len(ctx_roots),
+                    ', '.join('&this->%s' % name for name in ctx_roots))
 
             self.current_class_name = None
 
@@ -2446,6 +2536,7 @@ class Generate(ExpressionVisitor[T], StatementVisitor[None]):
 
                     # Now visit the rest of the statements
                     self.indent += 1
+                    self._WriteAllocFunc(stmt)
                     for node in stmt.body.body[first_index:]:
                         self.accept(node)
                     self.indent -= 1
@@ -2583,11 +2674,36 @@ class Generate(ExpressionVisitor[T], StatementVisitor[None]):
 
     # Statements
 
+    def _NeedsStackRoots(self) -> bool:
+        if self.may_collect is None or self.current_func_node is None:
+            return True
+        func_name = callgraph_pass.FuncName(self.current_func_node)
+        return self.may_collect.CanCollect(func_name)
+
+    def _IsStackAlloc(self, lval) -> bool:
+        if (self.stack_alloc is None or self.current_func_node is None or
+                not isinstance(lval, NameExpr)):
+            return False
+        func_name = callgraph_pass.FuncName(self.current_func_node)
+        return lval.name in self.stack_alloc.get(func_name, ())
+
+    def _WriteAllocFunc(self, o: FuncDef) -> None:
+        """Attribute allocations in this function for OILS_ALLOC_PROFILE."""
+        if not _MayAllocate(o):
+            return
+        name = '%s\t%s:%d' % (callgraph_pass.FuncName(o), self.module_path,
+                               o.line)
+        self.write_ind('AllocFunc _alloc_func(%s);\n', json.dumps(name))
+
     def visit_block(self, block: 'mypy.nodes.Block') -> T:
         self.write('{\n')  # not indented to use same line as while/if
 
         self.indent += 1
 
+        if self.prepend_alloc_func:
+            self._WriteAllocFunc(self.prepend_alloc_func)
+            self.prepend_alloc_func = None
+
         if self.prepend_to_block:
             # TODO: put the pointers first, and then register a single
             # StackRoots record.
@@ -2606,7 +2722,7 @@ class Generate(ExpressionVisitor[T], StatementVisitor[None]):
                     roots.append(lval_name)
             #self.log('roots %s', roots)
 
-            if len(roots):
+            if len(roots) and self._NeedsStackRoots():
                 if (self.stack_roots_warn and
                         len(roots) > self.stack_roots_warn):
                     log('WARNING: %s::%s() has %d stack roots. Consider refactoring this function.'
@@ -0,0 +1,93 @@
+// mycpp/demo/fork_pages.cc: How many pages does a forked child copy?
+//
+// The parent builds a large heap, then forks children that act like a command
+// sub: they hash the parent's strings, allocate, and pass through collection
+// points.  wait4() reports each child's minor page faults, which are mostly
+// copy-on-write copies of the parent's pages.
+//
+// Compare the default GC with MarkSweepHeap::OnFork().
+
+#include <sys/resource.h>  // struct rusage
+#include <sys/wait.h>      // wait4()
+#include <unistd.h>        // fork()
+
+#include "mycpp/runtime.h"
+#include "vendor/greatest.h"
+
+const int kNumStrs = 200000;
+const int kNumForks = 10;
+
+// Like a command sub that looks up some names, and builds a few strings
+static void ChildWork(List<Str*>* strs) {
+  auto d = Alloc<Dict<Str*, int>>();
+  Str* s = nullptr;
+  StackRoots _roots({&strs, &d, &s});
+
+  for (int i = 0; i < len(strs); ++i) {
+    s = strs->at(i);
+    if (i % 4 == 0) {
+      d->set(s, i);
+    }
+    s = str_concat(s, s);
+    gHeap.MaybeCollect();
+  }
+}
+
+// Returns the average number of minor page faults per child
+static int ForkChildren(List<Str*>* strs, bool post_fork) {
+  int64_t total = 0;
+  for (int i = 0; i < kNumForks; ++i) {
+    pid_t pid = ::fork();
+    if (pid == 0) {
+      if (post_fork) {
+        gHeap.OnFork();
+      }
+      ChildWork(strs);
+      _exit(0);
+    }
+    int status;
+    struct rusage ru;
+    if (wait4(pid, &status, 0, &ru) < 0) {
+      return -1;
+    }
+    total += ru.ru_minflt;
+  }
+  return total / kNumForks;
+}
+
+TEST fork_pages_test() {
+  auto strs = NewList<Str*>();
+  StackRoots _roots({&strs});
+
+  for (int i = 0; i < kNumStrs; ++i) {
+    strs->append(str(i));
+  }
+  gHeap.Collect();  // the parent's heap is at rest
+
+  int gc_faults = ForkChildren(strs, false);
+  int post_fork_faults = ForkChildren(strs, true);
+
+  log("%d strings, %d forks", kNumStrs, kNumForks);
+  log("minor faults per child with GC:        %d", gc_faults);
+  log("minor faults per child with OnFork():  %d", post_fork_faults);
+
+  ASSERT(gc_faults > 0);
+  ASSERT(post_fork_faults > 0);
+
+  PASS();
+}
+
+GREATEST_MAIN_DEFS();
+
+int main(int argc, char** argv) {
+  gHeap.Init();
+
+  GREATEST_MAIN_BEGIN();
+
+  RUN_TEST(fork_pages_test);
+
+  gHeap.CleanProcessExit();
+
+  GREATEST_MAIN_END();
+  return 0;
+}
@@ -0,0 +1,339 @@
+"""
+escape_pass.py - AST pass that finds objects that can live on the C++ stack.
+
+An object can be allocated with StackAlloc<T> instead of Alloc<T> when
+
+1. It's assigned to a local variable in a function that can't collect (see
+   callgraph_pass.py).  Nothing traces the stack object, so its children are
+   only safe as long as no collection happens.
+2. The variable doesn't escape.  It's only used to read and write fields, call
+   methods, or it's passed to parameters that don't escape either.
+
+For example, the BufWriter in qsn.maybe_encode().
+"""
+from typing import Optional, List, Dict, Set, Tuple, Iterator
+
+from mypy.traverser import TraverserVisitor
+from mypy.nodes import (MypyFile, FuncDef, Decorator, Block, Statement,
+                        AssignmentStmt, IfStmt, WhileStmt, ForStmt, TryStmt,
+                        CallExpr, NameExpr, MemberExpr, RefExpr, TypeInfo,
+                        Var, ARG_POS, ARG_OPT)
+from mypy.types import Instance, CallableType
+
+from mycpp import callgraph_pass
+from mycpp import pass_state
+from mycpp.callgraph_pass import (FuncName, NormalizeName, LookupMethod,
+                                  OwnMethod, IsGlobalRef)
+from mycpp.util import log
+
+_ = log
+
+# Runtime classes whose methods don't retain 'this'
+_RUNTIME_CLASSES = ('mylib.BufWriter',)
+
+# A parameter or local variable of a function
+Node = Tuple[FuncDef, Var]
+
+
+class _Uses(TraverserVisitor):
+    """Classify every reference to a local variable or parameter."""
+
+    def __init__(self, types) -> None:
+        self.types = types
+        self.uses = {}  # type: Dict[Var, List[tuple]]
+        self.handled = set()  # type: Set[NameExpr]
+
+    def _Add(self, e: NameExpr, use: tuple) -> None:
+        if isinstance(e.node, Var):
+            self.uses.setdefault(e.node, []).append(use)
+        self.handled.add(e)
+
+    def visit_assignment_stmt(self, o: AssignmentStmt) -> None:
+        for lval in o.lvalues:
+            if isinstance(lval, NameExpr):
+                self._Add(lval, ('def', o))
+        TraverserVisitor.visit_assignment_stmt(self, o)
+
+    def visit_call_expr(self, o: CallExpr) -> None:
+        callee = o.callee
+        if isinstance(callee, MemberExpr) and isinstance(
+                callee.expr, NameExpr):
+            self._Add(callee.expr, ('method', callee.name, callee.expr))
+
+        for i, arg in enumerate(o.args):
+            if isinstance(arg, NameExpr):
+                if o.arg_kinds[i] == ARG_POS:
+                    self._Add(arg, ('arg', o, i))
+                else:
+                    self._Add(arg, ('escape',))
+
+        TraverserVisitor.visit_call_expr(self, o)
+
+    def visit_member_expr(self, o: MemberExpr) -> None:
+        if isinstance(o.expr, NameExpr) and o.expr not in self.handled:
+            if isinstance(self.types.get(o), CallableType):
+                # A bound method captures the object
+                self._Add(o.expr, ('escape',))
+            else:
+                self._Add(o.expr, ('field',))
+        TraverserVisitor.visit_member_expr(self, o)
+
+    def visit_name_expr(self, o: NameExpr) -> None:
+        # Returned, stored, compared, iterated over, etc.
+        if o not in self.handled:
+            self._Add(o, ('escape',))
+
+
+class _FuncIndex(TraverserVisitor):
+
+    def __init__(self, funcs: List[FuncDef]) -> None:
+        self.funcs = funcs
+
+    def visit_func_def(self, o: FuncDef) -> None:
+        self.funcs.append(o)
+
+
+class Analyze(object):
+
+    def __init__(self, types, graph: callgraph_pass.Build,
+                 may_collect: pass_state.MayCollect) -> None:
+        self.types = types
+        self.graph = graph
+        self.may_collect = may_collect
+
+        self.funcs = []  # type: List[FuncDef]
+        self.uses = {}  # type: Dict[FuncDef, _Uses]
+
+    def OnModule(self, o: MypyFile) -> None:
+        o.accept(_FuncIndex(self.funcs))
+
+    def _GetUses(self, func: FuncDef) -> _Uses:
+        u = self.uses.get(func)
+        if u is None:
+            u = _Uses(self.types)
+            func.body.accept(u)
+            self.uses[func] = u
+        return u
+
+    def _IsTranslatedFunc(self, func) -> bool:
+        return (isinstance(func, FuncDef) and
+                self.graph.IsTranslated(FuncName(func)))
+
+    def _Param(self, func: FuncDef, i: int) -> Optional[Node]:
+        if i >= len(func.arguments):
+            return None
+        arg = func.arguments[i]
+        if arg.kind not in (ARG_POS, ARG_OPT):
+            return None
+        return (func, arg.variable)
+
+    def _MethodTargets(self, typ, name: str) -> Optional[List[FuncDef]]:
+        """Methods that obj.name() could call, or None if we don't know."""
+        if not isinstance(typ, Instance):
+            return None
+        info = typ.type
+        subclasses = self.graph.subclasses.get(info, [])
+
+        if NormalizeName(info.fullname) in _RUNTIME_CLASSES:
+            return None if subclasses else []
+
+        func = LookupMethod(info, name)
+        if not self._IsTranslatedFunc(func):
+            return None
+        result = [func]
+        for sub in subclasses:
+            func = OwnMethod(sub, name)
+            if func is None:
+                continue
+            if not self._IsTranslatedFunc(func):
+                return None
+            result.append(func)
+        return result
+
+    def _ArgTargets(self, call: CallExpr,
+                    i: int) -> Optional[List[Optional[Node]]]:
+        """Parameters that receive call.args[i]."""
+        callee = call.callee
+        if IsGlobalRef(callee):
+            node = callee.node
+            if isinstance(node, Decorator):
+                node = node.func
+            if self._IsTranslatedFunc(node):  # f(x)
+                return [self._Param(node, i)]
+            if isinstance(node, TypeInfo):  # Foo(x)
+                init = LookupMethod(node, '__init__')
+                if self._IsTranslatedFunc(init):
+                    return [self._Param(init, i + 1)]
+            return None
+
+        if isinstance(callee, MemberExpr):
+            obj = callee.expr
+            # Base.__init__(self, x), Class.static_method(x)
+            if isinstance(obj, RefExpr) and isinstance(obj.node, TypeInfo):
+                func = LookupMethod(obj.node, callee.name)
+                if self._IsTranslatedFunc(func):
+                    return [self._Param(func, i)]
+                return None
+
+            # obj.method(x)
+            funcs = self._MethodTargets(self.types.get(obj), callee.name)
+            if funcs is None:
+                return None
+            return [self._Param(func, i + 1) for func in funcs]
+
+        return None
+
+    def _Requires(self, node: Node) -> Optional[List[Node]]:
+        """What else must not escape for this node not to escape.
+
+        Returns None if it escapes directly.
+        """
+        func, var = node
+        required = []  # type: List[Node]
+        for use in self._GetUses(func).uses.get(var, []):
+            kind = use[0]
+            if kind in ('def', 'field'):
+                continue
+
+            if kind == 'method':
+                _, name, e = use
+                funcs = self._MethodTargets(self.types.get(e), name)
+                if funcs is None:
+                    return None
+                params = [self._Param(f, 0) for f in funcs]
+            elif kind == 'arg':
+                _, call, i = use
+                params = self._ArgTargets(call, i)
+                if params is None:
+                    return None
+            else:
+                return None
+
+            for p in params:
+                if p is None:
+                    return None
+                required.append(p)
+        return required
+
+    def _Candidates(self, func: FuncDef) -> List[Tuple[str, Node, TypeInfo]]:
+        result = []
+        for block in _Blocks(func.body):
+            for i, stmt in enumerate(block.body):
+                c = self._Candidate(func, stmt, block.body[i + 1:])
+                if c:
+                    result.append(c)
+        return result
+
+    def _Candidate(self, func: FuncDef, stmt: Statement,
+                   rest: List[Statement]) -> Optional[Tuple[str, Node, TypeInfo]]:
+        """
+        buf = mylib.BufWriter()
+
+        The StackAlloc<T> lives until the end of the enclosing C++ block, so
+        every use must come after it in the same block.
+        """
+        if not isinstance(stmt, AssignmentStmt) or len(stmt.lvalues) != 1:
+            return None
+        lval = stmt.lvalues[0]
+        rval = stmt.rvalue
+        if not (isinstance(lval, NameExpr) and isinstance(lval.node, Var)):
+            return None
+        if not (isinstance(rval, CallExpr) and IsGlobalRef(rval.callee)):
+            return None
+        info = rval.callee.node
+        if not isinstance(info, TypeInfo):
+            return None
+
+        class_name = NormalizeName(info.fullname)
+        if (not self.graph.IsTranslated(class_name) and
+                class_name not in _RUNTIME_CLASSES):
+            return None
+        # The destructor of a stack object would run __exit__
+        if LookupMethod(info, '__exit__'):
+            return None
+
+        var = lval.node
+        uses = self._GetUses(func).uses[var]
+        if sum(1 for use in uses if use[0] == 'def') != 1:
+            return None
+
+        after = _Uses(self.types)
+        for st in rest:
+            st.accept(after)
+        if len(after.uses.get(var, [])) != len(uses) - 1:
+            return None
+
+        return (lval.name, (func, var), info)
+
+    def Calculate(self) -> Dict[str, Set[str]]:
+        """Returns function name -> names of locals to allocate on the stack."""
+        candidates = []
+        for func in self.funcs:
+            if self.may_collect.CanCollect(FuncName(func)):
+                continue
+            candidates.extend(
+                (FuncName(func), name, node, info)
+                for name, node, info in self._Candidates(func))
+
+        # Discover the nodes that candidates depend on
+        requires = {}  # type: Dict[Node, Optional[List[Node]]]
+        worklist = []  # type: List[Node]
+        for _, _, node, info in candidates:
+            required = self._Requires(node)
+            init = LookupMethod(info, '__init__')
+            if required is not None and self._IsTranslatedFunc(init):
+                required.append(self._Param(init, 0))
+            requires[node] = required
+            worklist.extend(required or [])
+
+        while worklist:
+            node = worklist.pop()
+            if node in requires:
+                continue
+            required = self._Requires(node)
+            requires[node] = required
+            worklist.extend(required or [])
+
+        # Propagate escapes backward
+        dependents = {}  # type: Dict[Node, List[Node]]
+        for node, required in requires.items():
+            for r in required or []:
+                dependents.setdefault(r, []).append(node)
+
+        escapes = set(node for node, required in requires.items()
+                      if required is None)
+        worklist = list(escapes)
+        while worklist:
+            node = worklist.pop()
+            for d in dependents.get(node, []):
+                if d not in escapes:
+                    escapes.add(d)
+                    worklist.append(d)
+
+        result = {}  # type: Dict[str, Set[str]]
+        for func_name, var_name, node, _ in candidates:
+            if node not in escapes:
+                result.setdefault(func_name, set()).add(var_name)
+        return result
+
+
+def _Blocks(block: Block) -> Iterator[Block]:
+    """The function body, and blocks nested in if, while, for, and try.
+
+    We skip 'with' because switch and tagswitch become C++ case labels.
+    """
+    yield block
+    for stmt in block.body:
+        if isinstance(stmt, IfStmt):
+            children = stmt.body + [stmt.else_body]
+        elif isinstance(stmt, (WhileStmt, ForStmt)):
+            children = [stmt.body, stmt.else_body]
+        elif isinstance(stmt, TryStmt):
+            children = [stmt.body] + stmt.handlers + [
+                stmt.else_body, stmt.finally_body
+            ]
+        else:
+            continue
+        for child in children:
+            if child is not None:
+                yield from _Blocks(child)
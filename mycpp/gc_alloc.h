@@ -96,6 +96,35 @@ class StackRoots {
   int n_;
 };
 
+// mycpp generates a FieldRoots member for ctx_ classes, which live on the C++
+// stack.  It roots the object's pointer fields while the object is alive, and
+// removes exactly those roots, even if other roots were pushed in between.
+template <int N>
+class FieldRoots {
+ public:
+  FieldRoots(std::initializer_list<void*> roots) {
+    DCHECK(roots.size() == N);
+    int i = 0;
+    for (auto root : roots) {
+      // Not validated, since the fields are still nullptr
+      roots_[i] = reinterpret_cast<RawObject**>(root);
+      gHeap.PushRoot(roots_[i]);
+      i++;
+    }
+  }
+
+  ~FieldRoots() {
+    for (int i = N - 1; i >= 0; --i) {
+      gHeap.RemoveRoot(roots_[i]);
+    }
+  }
+
+ private:
+  RawObject** roots_[N];
+
+  DISALLOW_COPY_AND_ASSIGN(FieldRoots);
+};
+
 // Note:
 // - This function causes code bloat due to template expansion on hundreds of
 //   types.  Could switch to a GC_NEW() macro
@@ -142,6 +171,40 @@ T* Alloc(Args&&... args) {
   return new (obj) T(std::forward<Args>(args)...);
 }
 
+// A GC object on the C++ stack, for objects that mycpp proves don't escape a
+// function that can't collect.  See mycpp/escape_pass.py.
+//
+// Like GcGlobal<T>, it has HeapTag::Global, so the GC neither marks nor sweeps
+// it.  Its children are therefore only safe until the next collection.
+template <typename T>
+class StackAlloc {
+ public:
+  template <typename... Args>
+  explicit StackAlloc(Args&&... args) : header_(T::obj_header()) {
+    static_assert(offsetof(StackAlloc, obj_) == sizeof(ObjHeader),
+                  "ObjHeader doesn't fit");
+    header_.heap_tag = HeapTag::Global;
+    header_.obj_id = kIsGlobal;
+    // Same as Alloc<T>()
+    memset(obj_, 0, sizeof(T));
+    new (obj_) T(std::forward<Args>(args)...);
+  }
+
+  ~StackAlloc() {
+    get()->~T();
+  }
+
+  T* get() {
+    return reinterpret_cast<T*>(obj_);
+  }
+
+ private:
+  ObjHeader header_;
+  alignas(T) char obj_[sizeof(T)];
+
+  DISALLOW_COPY_AND_ASSIGN(StackAlloc);
+};
+
 //
 // String "Constructors".  We need these because of the "flexible array"
 // pattern.  I don't think "new Str()" can do that, and placement new would
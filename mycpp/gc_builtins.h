@@ -136,6 +136,11 @@ inline int to_int(bool b) {
   return b;
 }
 
+// int(3.9) truncates toward zero, like Python
+inline int to_int(double d) {
+  return static_cast<int>(d);
+}
+
 bool to_bool(Str* s);
 
 // Used by division operator
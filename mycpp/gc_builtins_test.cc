@@ -38,6 +38,9 @@ TEST int_test() {
   ASSERT_EQ(1, to_int(true));
   ASSERT_EQ(0, to_int(false));
 
+  ASSERT_EQ(3, to_int(3.9));
+  ASSERT_EQ(-3, to_int(-3.9));
+
   PASS();
 }
 
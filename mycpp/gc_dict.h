@@ -8,6 +8,10 @@
 // - It's integrated with our mark and sweep GC, using Slab<int>, Slab<K>, and
 //   Slab<V>
 // - We use linear probing, not the pseudo-random number generator
+// - Small dicts have no index_ at all.  They're searched linearly, which saves
+//   an allocation for the common case of proc frames, JSON objects, etc.
+// - Deleting leaves tombstones in the index, which are removed by compact()
+//   when there are too many of them
 
 #ifndef MYCPP_GC_DICT_H
 #define MYCPP_GC_DICT_H
@@ -32,6 +36,10 @@ const int kNotFound = -3;
 // Return value for hash_and_probe(), not stored in index_.
 const int kTooSmall = -4;
 
+// Dicts with at most this many entries have no index_, and are searched
+// linearly.
+const int kMaxSmallDict = 8;
+
 // Helper for keys() and values()
 template <typename T>
 List<T>* ListFromDictSlab(Slab<T>* slab, int n) {
@@ -53,6 +61,7 @@ class GlobalDict {
   int len_;
   int capacity_;
   int index_len_;
+  int num_deleted_;
   GlobalSlab<int, N>* index_;
   GlobalSlab<K, N>* keys_;
   GlobalSlab<V, N>* values_;
@@ -68,6 +77,7 @@ class GlobalDict {
       {.len_ = N,                                                              \
        .capacity_ = N,                                                         \
        .index_len_ = 0,                                                        \
+       .num_deleted_ = 0,                                                      \
        .index_ = nullptr,                                                      \
        .keys_ = &_keys_##name.obj,                                             \
        .values_ = &_vals_##name.obj},                                          \
@@ -81,6 +91,7 @@ class Dict {
       : len_(0),
         capacity_(0),
         index_len_(0),
+        num_deleted_(0),
         index_(nullptr),
         keys_(nullptr),
         values_(nullptr) {
@@ -90,6 +101,7 @@ class Dict {
       : len_(0),
         capacity_(0),
         index_len_(0),
+        num_deleted_(0),
         index_(nullptr),
         keys_(nullptr),
         values_(nullptr) {
@@ -105,6 +117,10 @@ class Dict {
   // Reserve enough space for at LEAST this many key-value pairs.
   void reserve(int num_desired);
 
+  // Remove tombstones from the index, and shrink the slabs if they're mostly
+  // empty.  Called by mylib::dict_erase().
+  void compact();
+
   // d[key] in Python: raises KeyError if not found
   V at(K key) const;
 
@@ -140,15 +156,30 @@ class Dict {
   // - kNotFound
   int find_kv_index(K key) const;
 
+  // Is this a small dict without an index?  GlobalDict instances are also
+  // searched linearly, but they're never mutated.
+  bool is_small() const {
+    return index_ == nullptr;
+  }
+
+  // Helper used by reserve() and compact()
+  void resize(int num_desired);
+
+  // Helper used by resize() and compact(): point an empty index slot at
+  // keys_[kv_index] and values_[kv_index]
+  void insert_index(int kv_index);
+
   static constexpr ObjHeader obj_header() {
-    return ObjHeader::ClassFixed(field_mask(), sizeof(Dict));
+    return ObjHeader::Dict(field_mask(), sizeof(Dict));
   }
 
-  int len_;        // number of entries (keys and values, almost dense)
-  int capacity_;   // number of k/v slots
-  int index_len_;  // number of index slots
+  int len_;          // number of entries (keys and values, almost dense)
+  int capacity_;     // number of k/v slots
+  int index_len_;    // number of index slots, or 0 for small dicts
+  int num_deleted_;  // number of kDeletedEntry tombstones in index_
 
-  // These 3 slabs are resized at the same time.
+  // These 3 slabs are resized at the same time.  index_ is nullptr for small
+  // dicts.
   Slab<int>* index_;  // kEmptyEntry, kDeletedEntry, or a valid index into
                       // keys_ and values_
   Slab<K>* keys_;     // Dict<K, int>
@@ -206,40 +237,99 @@ inline bool dict_contains(const Dict<K, V>* haystack, K needle) {
 
 template <typename K, typename V>
 void Dict<K, V>::reserve(int num_desired) {
-  if (capacity_ >= num_desired) {
-    return;  // Don't do anything if there's already enough space.
+  // Don't do anything if there's already enough space.  But a small dict
+  // becomes a big one when it has too many entries to search linearly.
+  if (capacity_ >= num_desired &&
+      (index_ != nullptr || num_desired <= kMaxSmallDict)) {
+    return;
   }
+  resize(num_desired);
+}
+
+template <typename K, typename V>
+void Dict<K, V>::resize(int num_desired) {
+  DCHECK(num_desired >= len_);
 
-  int old_len = len_;
   Slab<K>* old_k = keys_;
   Slab<V>* old_v = values_;
 
   // Calculate the number of keys and values we should have
   capacity_ = HowManyPairs(num_desired);
 
-  // 1) Ensure index len a power of 2, to avoid expensive modulus % operation
-  // 2) Introduce hash table load factor.   Use capacity_+1 to simulate ceil()
-  // div, not floor() div.
-  index_len_ = RoundUp((capacity_ + 1) * 5 / 4);
-  DCHECK(index_len_ > capacity_);
-
-  index_ = NewSlab<int>(index_len_);
-  for (int i = 0; i < index_len_; ++i) {
-    index_->items_[i] = kEmptyEntry;
+  if (num_desired <= kMaxSmallDict) {
+    index_len_ = 0;
+    index_ = nullptr;
+  } else {
+    // 1) Ensure index len a power of 2, to avoid expensive modulus %
+    //    operation
+    // 2) Introduce hash table load factor.   Use capacity_+1 to simulate
+    //    ceil() div, not floor() div.
+    index_len_ = RoundUp((capacity_ + 1) * 5 / 4);
+    DCHECK(index_len_ > capacity_);
+
+    index_ = NewSlab<int>(index_len_);
+    for (int i = 0; i < index_len_; ++i) {
+      index_->items_[i] = kEmptyEntry;
+    }
   }
+  num_deleted_ = 0;
 
   // These are DENSE, while index_ is sparse.
   keys_ = NewSlab<K>(capacity_);
   values_ = NewSlab<V>(capacity_);
 
-  if (old_k != nullptr) {  // rehash if there were any entries
-    len_ = 0;
-    for (int i = 0; i < old_len; ++i) {
-      set(old_k->items_[i], old_v->items_[i]);
+  if (old_k != nullptr) {  // copy entries in order, and rehash
+    memcpy(keys_->items_, old_k->items_, len_ * sizeof(K));
+    memcpy(values_->items_, old_v->items_, len_ * sizeof(V));
+  }
+  if (index_ != nullptr) {
+    for (int i = 0; i < len_; ++i) {
+      insert_index(i);
     }
   }
 }
 
+template <typename K, typename V>
+void Dict<K, V>::insert_index(int kv_index) {
+  unsigned h = hash_key(keys_->items_[kv_index]);
+  for (int i = 0; i < index_len_; ++i) {
+    // faster % using & -- assuming index_len_ is power of 2
+    int slot = (h + i) & (index_len_ - 1);
+    if (index_->items_[slot] == kEmptyEntry) {
+      index_->items_[slot] = kv_index;
+      return;
+    }
+  }
+  FAIL(kShouldNotGetHere);  // index_len_ > capacity_
+}
+
+template <typename K, typename V>
+void Dict<K, V>::compact() {
+  if (index_ == nullptr) {
+    return;  // small dicts don't have tombstones
+  }
+
+  // Shrink if at most a quarter of the k/v slots are used.  Leave room to
+  // grow, so alternating set() and dict_erase() doesn't thrash.  This may turn
+  // it back into a small dict.
+  if (len_ * 4 <= capacity_) {
+    int num_desired = len_ * 2;
+    if (HowManyPairs(num_desired) < capacity_) {
+      resize(num_desired);
+      return;
+    }
+  }
+
+  // Otherwise rebuild the index in place, which removes the tombstones
+  for (int i = 0; i < index_len_; ++i) {
+    index_->items_[i] = kEmptyEntry;
+  }
+  for (int i = 0; i < len_; ++i) {
+    insert_index(i);
+  }
+  num_deleted_ = 0;
+}
+
 template <typename K, typename V>
 V Dict<K, V>::at(K key) const {
   int kv_index = find_kv_index(key);
@@ -294,6 +384,7 @@ void Dict<K, V>::clear() {
     memset(values_->items_, 0, len_ * sizeof(V));  // zero for GC scan
   }
   len_ = 0;
+  num_deleted_ = 0;
 }
 
 // TODO:
@@ -307,6 +398,7 @@ int Dict<K, V>::hash_and_probe(K key) const {
   if (capacity_ == 0) {
     return kTooSmall;
   }
+  DCHECK(index_ != nullptr);  // small dicts don't have slots
 
   // Hash the key onto a slot in the index. If the first slot is occupied,
   // probe until an empty one is found.
@@ -376,7 +468,7 @@ int Dict<K, V>::find_kv_index(K key) const {
     return kv_index;
   }
 
-  // Linear search on GlobalDict instances.
+  // Linear search on small dicts and GlobalDict instances.
   // TODO: Should we populate and compare their hash values?
   for (int i = 0; i < len_; ++i) {
     if (keys_equal(keys_->items_[i], key)) {
@@ -390,6 +482,23 @@ int Dict<K, V>::find_kv_index(K key) const {
 template <typename K, typename V>
 void Dict<K, V>::set(K key, V val) {
   DCHECK(obj_header().heap_tag != HeapTag::Global);
+
+  if (index_ == nullptr) {  // small dict, or empty dict
+    int kv_index = find_kv_index(key);
+    if (kv_index != kNotFound) {
+      values_->items_[kv_index] = val;
+      return;
+    }
+    reserve(len_ + 1);  // may allocate an index
+    if (index_ == nullptr) {
+      keys_->items_[len_] = key;
+      values_->items_[len_] = val;
+      len_++;
+      DCHECK(len_ <= capacity_);
+      return;
+    }
+  }
+
   int pos = hash_and_probe(key);
   if (pos == kTooSmall) {
     reserve(len_ + 1);
@@ -400,6 +509,9 @@ void Dict<K, V>::set(K key, V val) {
   int kv_index = index_->items_[pos];
   DCHECK(kv_index < len_);
   if (kv_index < 0) {
+    if (kv_index == kDeletedEntry) {
+      num_deleted_--;  // reusing a tombstone
+    }
     // Write new entries to the end of the k/v arrays. This allows us to recall
     // insertion order until the first deletion.
     keys_->items_[len_] = key;
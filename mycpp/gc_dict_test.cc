@@ -666,6 +666,94 @@ TEST test_dict_ordering() {
   PASS();
 }
 
+TEST test_small_dict() {
+  auto d = Alloc<Dict<Str*, int>>();
+  StackRoots _roots({&d});
+
+  for (int i = 0; i < kMaxSmallDict; ++i) {
+    d->set(str_repeat(StrFromC("x"), i), i);
+  }
+  ASSERT_EQ(kMaxSmallDict, len(d));
+  // No index, searched linearly
+  ASSERT(d->is_small());
+  ASSERT_EQ(nullptr, d->index_);
+  ASSERT_EQ(0, d->index_len_);
+  ASSERT_EQ(3, d->at(StrFromC("xxx")));
+
+  // Overwrite doesn't change the size
+  d->set(StrFromC("xxx"), 99);
+  ASSERT_EQ(kMaxSmallDict, len(d));
+  ASSERT_EQ(99, d->at(StrFromC("xxx")));
+
+  // Erase preserves insertion order
+  mylib::dict_erase(d, kEmptyString);
+  ASSERT_EQ(kMaxSmallDict - 1, len(d));
+  ASSERT(!dict_contains(d, kEmptyString));
+  ASSERT(str_equals0("x", d->keys()->at(0)));
+  ASSERT(str_equals0("xx", d->keys()->at(1)));
+
+  // Growing past the limit builds an index, and keeps the order
+  d->set(kEmptyString, 0);
+  d->set(StrFromC("y"), 100);
+  ASSERT_EQ(kMaxSmallDict + 1, len(d));
+  ASSERT(!d->is_small());
+  ASSERT(d->index_ != nullptr);
+
+  List<Str*>* keys = d->keys();
+  ASSERT(str_equals0("x", keys->at(0)));
+  ASSERT(str_equals(kEmptyString, keys->at(kMaxSmallDict - 1)));
+  ASSERT(str_equals0("y", keys->at(kMaxSmallDict)));
+  ASSERT_EQ(99, d->at(StrFromC("xxx")));
+  ASSERT_EQ(100, d->at(StrFromC("y")));
+
+  PASS();
+}
+
+TEST test_dict_compact() {
+  auto d = Alloc<Dict<int, int>>();
+  StackRoots _roots({&d});
+
+  int n = 1000;
+  for (int i = 0; i < n; ++i) {
+    d->set(i, i);
+  }
+  int big_capacity = d->capacity_;
+  ASSERT(big_capacity >= n);
+
+  // Tombstones never take up more than a quarter of the index
+  for (int i = 0; i < n - 10; ++i) {
+    mylib::dict_erase(d, i);
+    ASSERT(d->num_deleted_ * 4 <= d->index_len_);
+  }
+  ASSERT_EQ(10, len(d));
+
+  // And the slabs shrank
+  log("capacity %d -> %d", big_capacity, d->capacity_);
+  ASSERT(d->capacity_ < big_capacity / 4);
+
+  for (int i = n - 10; i < n; ++i) {
+    ASSERT_EQ(i, d->at(i));
+  }
+  for (int i = 0; i < n - 10; ++i) {
+    ASSERT(!dict_contains(d, i));
+  }
+
+  // Reusing tombstones
+  d->clear();
+  d->reserve(100);
+  for (int i = 0; i < 50; ++i) {
+    d->set(i, i);
+  }
+  mylib::dict_erase(d, 7);
+  mylib::dict_erase(d, 8);
+  ASSERT_EQ(2, d->num_deleted_);
+  d->set(7, 7);
+  ASSERT_EQ(7, d->at(7));
+  ASSERT_EQ(49, len(d));
+
+  PASS();
+}
+
 GREATEST_MAIN_DEFS();
 
 int main(int argc, char** argv) {
@@ -685,6 +773,8 @@ int main(int argc, char** argv) {
   RUN_TEST(test_global_dict);
   RUN_TEST(test_dict_ordering);
   RUN_TEST(test_dict_probe);
+  RUN_TEST(test_small_dict);
+  RUN_TEST(test_dict_compact);
 
   RUN_TEST(dict_methods_test);
   RUN_TEST(dict_iters_test);
@@ -465,6 +465,34 @@ TEST stack_roots_test() {
   PASS();
 }
 
+TEST stack_alloc_test() {
+  gHeap.Collect();
+  ASSERT_NUM_LIVE_OBJS(0);
+
+  {
+    StackAlloc<DerivedObj> _stack_obj;
+    DerivedObj* obj = _stack_obj.get();
+
+    // Not on the heap, and the header is where the GC expects it
+    ASSERT_NUM_LIVE_OBJS(0);
+    ObjHeader* header = ObjHeader::FromObject(obj);
+    ASSERT_EQ_FMT(HeapTag::Global, header->heap_tag, "%d");
+    ASSERT_EQ_FMT(TypeTag::OtherClass, header->type_tag, "%d");
+
+    // Constructor and virtual methods work
+    ASSERT_EQ_FMT(253, obj->derived_member_, "%d");
+    ASSERT_EQ_FMT(4, obj->Method(), "%d");
+
+    StackAlloc<mylib::BufWriter> _stack_buf;
+    mylib::BufWriter* buf = _stack_buf.get();
+    buf->write(StrFromC("foo"));
+    buf->write(StrFromC("bar"));
+    ASSERT(str_equals0("foobar", buf->getvalue()));
+  }
+
+  PASS();
+}
+
 GREATEST_MAIN_DEFS();
 
 int main(int argc, char** argv) {
@@ -486,6 +514,7 @@ int main(int argc, char** argv) {
   RUN_TEST(inheritance_test);
 
   RUN_TEST(stack_roots_test);
+  RUN_TEST(stack_alloc_test);
 
   gHeap.CleanProcessExit();
 
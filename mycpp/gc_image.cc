@@ -0,0 +1,273 @@
+#include "mycpp/gc_image.h"
+
+#include <errno.h>
+#include <stdint.h>    // int64_t
+#include <string.h>    // memcmp(), memcpy()
+#include <sys/mman.h>  // mmap()
+#include <sys/stat.h>  // fstat()
+#include <unistd.h>    // write()
+
+#include <unordered_map>
+#include <vector>
+
+#if defined(__GLIBC__)
+  #include <malloc.h>  // malloc_usable_size()
+#endif
+
+#include "mycpp/gc_alloc.h"  // gHeap
+#include "mycpp/gc_slab.h"
+
+#if MARK_SWEEP
+
+// Global objects like GLOBAL_STR live in the binary, so they're saved as an
+// offset from this variable rather than copied.
+static char gImageAnchor;
+
+namespace {
+
+const char kMagic[8] = {'O', 'I', 'L', 'S', 'I', 'M', 'G', '1'};
+
+// The file starts with this header.  Then each object is stored as a uint64_t
+// size, followed by its ObjHeader and fields, padded to 8 bytes.
+//
+// A pointer field is stored as
+//
+//   0     nullptr
+//   even  offset of the object in the file
+//   odd   2 * (offset of a global object from gImageAnchor) + 1
+struct ImageFileHeader {
+  char magic[8];
+  int64_t exe_size;  // identifies the binary that wrote the image
+  int64_t exe_mtime;
+  uint64_t num_bytes;  // of the whole file
+  uint64_t root;
+};
+
+void ExeStamp(int64_t* size, int64_t* mtime) {
+  struct stat st;
+  if (stat("/proc/self/exe", &st) == 0) {
+    *size = st.st_size;
+    *mtime = st.st_mtime;
+  } else {
+    *size = 0;
+    *mtime = 0;
+  }
+}
+
+uint64_t RoundUp(uint64_t n) {
+  return (n + 7) & ~static_cast<uint64_t>(7);
+}
+
+// Call f(RawObject** field) on each pointer field, the way the GC traces them.
+template <typename F>
+void ForEachField(ObjHeader* header, F f) {
+  switch (header->heap_tag) {
+  case HeapTag::FixedSize: {
+    auto fixed = reinterpret_cast<LayoutFixed*>(header->ObjectAddress());
+    int mask = FIELD_MASK(*header);
+    for (int i = 0; i < kFieldMaskBits; ++i) {
+      if (mask & (1 << i)) {
+        f(&fixed->children_[i]);
+      }
+    }
+    break;
+  }
+  case HeapTag::Scanned: {
+    auto slab = reinterpret_cast<Slab<RawObject*>*>(header->ObjectAddress());
+    int n = NUM_POINTERS(*header);
+    for (int i = 0; i < n; ++i) {
+      f(&slab->items_[i]);
+    }
+    break;
+  }
+  default:  // Opaque objects have no pointers
+    break;
+  }
+}
+
+// Number of bytes to copy, including the header, or 0 if we can't tell.  We
+// copy the whole pool cell or malloc() block, which may be a bit more than
+// the object.
+size_t ObjectSize(ObjHeader* header) {
+  #ifndef NO_POOL_ALLOC
+  if (header->pool_id == 1) {
+    return gHeap.pool1_.kMaxObjSize;
+  }
+  if (header->pool_id == 2) {
+    return gHeap.pool2_.kMaxObjSize;
+  }
+  #endif
+  #if defined(__GLIBC__) && !defined(BUMP_SMALL)
+  return malloc_usable_size(header);
+  #else
+  return 0;
+  #endif
+}
+
+uint64_t EncodeGlobal(RawObject* obj) {
+  int64_t delta = reinterpret_cast<char*>(obj) - &gImageAnchor;
+  return static_cast<uint64_t>(delta) * 2 + 1;
+}
+
+bool WriteAll(int fd, const char* buf, size_t n) {
+  while (n > 0) {
+    ssize_t num_written = ::write(fd, buf, n);
+    if (num_written < 0) {
+      if (errno == EINTR) {
+        continue;
+      }
+      return false;
+    }
+    buf += num_written;
+    n -= num_written;
+  }
+  return true;
+}
+
+}  // namespace
+
+#endif  // MARK_SWEEP
+
+int SaveImage(RawObject* root, int fd) {
+#if MARK_SWEEP
+  std::unordered_map<RawObject*, uint64_t> offsets;
+  std::vector<ObjHeader*> objs;
+  std::vector<size_t> sizes;
+  uint64_t pos = sizeof(ImageFileHeader);
+
+  // Assign each reachable object an offset, breadth first
+  bool ok = true;
+  auto visit = [&](RawObject* obj) {
+    if (obj == nullptr) {
+      return;
+    }
+    ObjHeader* header = ObjHeader::FromObject(obj);
+    if (header->heap_tag == HeapTag::Global || offsets.count(obj)) {
+      return;
+    }
+    size_t size = ObjectSize(header);
+    if (header->type_tag == TypeTag::OtherClass || size == 0) {
+      ok = false;
+      return;
+    }
+    offsets[obj] = pos + sizeof(uint64_t) + sizeof(ObjHeader);
+    objs.push_back(header);
+    sizes.push_back(size);
+    pos += sizeof(uint64_t) + RoundUp(size);
+  };
+
+  visit(root);
+  for (size_t i = 0; i < objs.size() && ok; ++i) {
+    ForEachField(objs[i], [&](RawObject** field) { visit(*field); });
+  }
+  if (!ok) {
+    return ImageStatus::Unsupported;
+  }
+
+  auto encode = [&](RawObject* obj) -> uint64_t {
+    if (obj == nullptr) {
+      return 0;
+    }
+    if (ObjHeader::FromObject(obj)->heap_tag == HeapTag::Global) {
+      return EncodeGlobal(obj);
+    }
+    return offsets[obj];
+  };
+
+  std::vector<char> buf(pos, 0);
+
+  ImageFileHeader file_header;
+  memcpy(file_header.magic, kMagic, sizeof(kMagic));
+  ExeStamp(&file_header.exe_size, &file_header.exe_mtime);
+  file_header.num_bytes = pos;
+  file_header.root = encode(root);
+  memcpy(buf.data(), &file_header, sizeof(file_header));
+
+  char* p = buf.data() + sizeof(ImageFileHeader);
+  for (size_t i = 0; i < objs.size(); ++i) {
+    uint64_t size = sizes[i];
+    memcpy(p, &size, sizeof(size));
+
+    auto copy = reinterpret_cast<ObjHeader*>(p + sizeof(uint64_t));
+    memcpy(copy, objs[i], size);
+    copy->pool_id = kNotInPool;
+    copy->obj_id = kUndefinedId;  // assigned by LoadImage()
+    ForEachField(copy, [&](RawObject** field) {
+      *field = reinterpret_cast<RawObject*>(encode(*field));
+    });
+
+    p += sizeof(uint64_t) + RoundUp(size);
+  }
+
+  if (!WriteAll(fd, buf.data(), buf.size())) {
+    return ImageStatus::WriteError;
+  }
+  return ImageStatus::Ok;
+#else
+  return ImageStatus::Unsupported;
+#endif
+}
+
+RawObject* LoadImage(int fd) {
+#if MARK_SWEEP
+  struct stat st;
+  if (fstat(fd, &st) < 0 ||
+      st.st_size < static_cast<off_t>(sizeof(ImageFileHeader))) {
+    return nullptr;
+  }
+
+  // MAP_PRIVATE: pages are copied when the shell mutates them
+  void* m = mmap(nullptr, st.st_size, PROT_READ | PROT_WRITE, MAP_PRIVATE, fd,
+                 0);
+  if (m == MAP_FAILED) {
+    return nullptr;
+  }
+  char* base = static_cast<char*>(m);
+  auto file_header = reinterpret_cast<ImageFileHeader*>(base);
+
+  int64_t exe_size, exe_mtime;
+  ExeStamp(&exe_size, &exe_mtime);
+  if (memcmp(file_header->magic, kMagic, sizeof(kMagic)) != 0 ||
+      file_header->exe_size != exe_size ||
+      file_header->exe_mtime != exe_mtime ||
+      file_header->num_bytes != static_cast<uint64_t>(st.st_size)) {
+    munmap(m, st.st_size);
+    return nullptr;
+  }
+
+  auto decode = [&](uint64_t n) -> RawObject* {
+    if (n == 0) {
+      return nullptr;
+    }
+    if (n & 1) {
+      int64_t delta = static_cast<int64_t>(n - 1) / 2;
+      return reinterpret_cast<RawObject*>(&gImageAnchor + delta);
+    }
+    return reinterpret_cast<RawObject*>(base + n);
+  };
+
+  char* p = base + sizeof(ImageFileHeader);
+  char* end = base + file_header->num_bytes;
+  while (p < end) {
+    uint64_t size;
+    memcpy(&size, p, sizeof(size));
+    CHECK(size >= sizeof(ObjHeader) &&
+          size <= static_cast<uint64_t>(end - p) - sizeof(uint64_t));
+
+    auto header = reinterpret_cast<ObjHeader*>(p + sizeof(uint64_t));
+    // Like a malloc()'d object that isn't in live_objs_: it's marked and
+    // traced, but never swept
+    header->obj_id = gHeap.greatest_obj_id_++;
+    CHECK(gHeap.greatest_obj_id_ <= kMaxObjId);
+    ForEachField(header, [&](RawObject** field) {
+      *field = decode(reinterpret_cast<uint64_t>(*field));
+    });
+
+    p += sizeof(uint64_t) + RoundUp(size);
+  }
+
+  return decode(file_header->root);
+#else
+  return nullptr;
+#endif
+}
@@ -0,0 +1,36 @@
+// gc_image.h: Save an object graph to a file, and map it back in
+//
+// The image holds a copy of every object reachable from a root, found with
+// the same ObjHeader metadata the GC uses: FIELD_MASK() for FixedSize objects,
+// and NUM_POINTERS() for Scanned objects.  Pointers are written as offsets, and
+// LoadImage() relocates them after mmap().
+//
+// Loaded objects are never freed, but they get fresh object IDs, so the GC
+// traces through them.  That means they can be mutated to point at new heap
+// objects, e.g. after 'x=new' on a variable cell from the image.
+//
+// Only ASDL objects, Str, Slab, Tuple, List, and Dict can be saved.  Other
+// classes may have a vtable or point to memory that isn't managed by the GC.
+//
+// An image can only be loaded by the same binary that saved it, because
+// object layouts and the addresses of global objects differ between builds.
+
+#ifndef MYCPP_GC_IMAGE_H
+#define MYCPP_GC_IMAGE_H
+
+#include "mycpp/gc_obj.h"
+
+namespace ImageStatus {
+const int Ok = 0;
+const int Unsupported = 1;  // reachable object that can't be saved
+const int WriteError = 2;   // errno is set
+};  // namespace ImageStatus
+
+// Write everything reachable from root to fd.  Returns an ImageStatus:: code.
+int SaveImage(RawObject* root, int fd);
+
+// Map the image in fd, and return its root.  Returns nullptr if it's not an
+// image, or it was saved by a different binary.
+RawObject* LoadImage(int fd);
+
+#endif  // MYCPP_GC_IMAGE_H
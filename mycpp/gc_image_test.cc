@@ -0,0 +1,132 @@
+#include "mycpp/gc_image.h"
+
+#include <fcntl.h>   // open()
+#include <unistd.h>  // close(), unlink()
+
+#include "mycpp/runtime.h"
+#include "vendor/greatest.h"
+
+GLOBAL_STR(kGlobal, "global");
+
+// Like an ASDL class: a type_tag that isn't OtherClass, pointers first
+class Cell {
+ public:
+  Cell(Str* name, List<Str*>* items, int n) : name(name), items(items), n(n) {
+  }
+
+  static constexpr ObjHeader obj_header() {
+    return ObjHeader::AsdlClass(42, 2);
+  }
+
+  Str* name;
+  List<Str*>* items;
+  int n;
+};
+
+class Opaque {
+ public:
+  static constexpr ObjHeader obj_header() {
+    return ObjHeader::ClassFixed(kZeroMask, sizeof(Opaque));
+  }
+};
+
+static const char* kPath = "_tmp/gc_image_test.img";
+
+static int Save(RawObject* root) {
+  int fd = ::open(kPath, O_CREAT | O_TRUNC | O_WRONLY, 0644);
+  if (fd < 0) {
+    return -1;
+  }
+  int status = SaveImage(root, fd);
+  ::close(fd);
+  return status;
+}
+
+static RawObject* Load() {
+  int fd = ::open(kPath, O_RDONLY);
+  if (fd < 0) {
+    return nullptr;
+  }
+  RawObject* root = LoadImage(fd);
+  ::close(fd);  // the mapping stays
+  return root;
+}
+
+TEST round_trip_test() {
+  auto d = Alloc<Dict<Str*, Cell*>>();
+  auto items = NewList<Str*>(std::initializer_list<Str*>{
+      StrFromC("a"), nullptr, kGlobal});
+  Cell* c = Alloc<Cell>(StrFromC("x"), items, 42);
+  d->set(StrFromC("x"), c);
+  d->set(StrFromC("y"), c);  // shared
+  StackRoots _roots({&d, &items, &c});
+
+  ASSERT_EQ(ImageStatus::Ok, Save(reinterpret_cast<RawObject*>(d)));
+
+  auto d2 = reinterpret_cast<Dict<Str*, Cell*>*>(Load());
+  ASSERT(d2 != nullptr);
+  ASSERT(d2 != d);
+  ASSERT_EQ(2, len(d2));
+
+  Cell* c2 = d2->at(StrFromC("x"));
+  ASSERT(c2 != c);
+  ASSERT_EQ(c2, d2->at(StrFromC("y")));
+  ASSERT(str_equals(StrFromC("x"), c2->name));
+  ASSERT_EQ(42, c2->n);
+
+  ASSERT_EQ(3, len(c2->items));
+  ASSERT(str_equals(StrFromC("a"), c2->items->at(0)));
+  ASSERT_EQ(nullptr, c2->items->at(1));
+  ASSERT_EQ(kGlobal, c2->items->at(2));  // not copied
+
+  // Mutate the image to point to a new object, which the GC must keep alive
+  StackRoots _roots2({&d2, &c2});
+  c2->items->append(StrFromC("new"));
+  c2->name = StrFromC("y");
+  gHeap.Collect();
+  ASSERT(str_equals(StrFromC("new"), c2->items->at(3)));
+  ASSERT(str_equals(StrFromC("y"), c2->name));
+
+  PASS();
+}
+
+TEST unsupported_test() {
+  auto list = NewList<RawObject*>();
+  StackRoots _roots({&list});
+  list->append(reinterpret_cast<RawObject*>(Alloc<Opaque>()));
+
+  ASSERT_EQ(ImageStatus::Unsupported, Save(reinterpret_cast<RawObject*>(list)));
+
+  PASS();
+}
+
+TEST not_an_image_test() {
+  int fd = ::open(kPath, O_CREAT | O_TRUNC | O_WRONLY, 0644);
+  ASSERT(fd >= 0);
+  const char* s = "echo hi\n";
+  ASSERT_EQ(8, ::write(fd, s, 8));
+  ::close(fd);
+
+  ASSERT_EQ(nullptr, Load());
+
+  PASS();
+}
+
+GREATEST_MAIN_DEFS();
+
+int main(int argc, char** argv) {
+  gHeap.Init();
+
+  GREATEST_MAIN_BEGIN();
+
+  RUN_TEST(round_trip_test);
+  RUN_TEST(unsupported_test);
+  RUN_TEST(not_an_image_test);
+
+  ::unlink(kPath);
+
+  gHeap.CleanProcessExit();
+
+  GREATEST_MAIN_END();
+  return 0;
+}
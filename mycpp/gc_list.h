@@ -82,7 +82,7 @@ class List {
   void extend(List<T>* other);
 
   static constexpr ObjHeader obj_header() {
-    return ObjHeader::ClassFixed(field_mask(), sizeof(List<T>));
+    return ObjHeader::List(field_mask(), sizeof(List<T>));
   }
 
   int len_;       // number of entries
@@ -43,6 +43,25 @@ template <typename K, typename V>
 void dict_erase(Dict<K, V>* haystack, K needle) {
   DCHECK(haystack->obj_header().heap_tag != HeapTag::Global);
 
+  if (haystack->is_small()) {
+    int kv_index = haystack->find_kv_index(needle);
+    if (kv_index == kNotFound) {
+      return;
+    }
+    // Small dicts have no index, so shift entries down, which also preserves
+    // insertion order
+    int n = haystack->len_;
+    for (int i = kv_index; i < n - 1; ++i) {
+      haystack->keys_->items_[i] = haystack->keys_->items_[i + 1];
+      haystack->values_->items_[i] = haystack->values_->items_[i + 1];
+    }
+    // Zero out for GC.  These could be nullptr or 0
+    haystack->keys_->items_[n - 1] = 0;
+    haystack->values_->items_[n - 1] = 0;
+    haystack->len_--;
+    return;
+  }
+
   int pos = haystack->hash_and_probe(needle);
   if (pos == kTooSmall) {
     return;
@@ -82,8 +101,16 @@ void dict_erase(Dict<K, V>* haystack, K needle) {
   haystack->keys_->items_[last_kv_index] = 0;
   haystack->values_->items_[last_kv_index] = 0;
   haystack->index_->items_[pos] = kDeletedEntry;
+  haystack->num_deleted_++;
   haystack->len_--;
   DCHECK(haystack->len_ < haystack->capacity_);
+
+  // Tombstones make probing for absent keys slow, so get rid of them once
+  // they take up a quarter of the index.  Also shrink mostly empty dicts.
+  if (haystack->num_deleted_ * 4 > haystack->index_len_ ||
+      haystack->len_ * 4 <= haystack->capacity_) {
+    haystack->compact();
+  }
 }
 
 // NOTE: Can use OverAllocatedStr for all of these, rather than copying
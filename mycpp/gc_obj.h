@@ -103,6 +103,16 @@ struct ObjHeader {
             kUndefinedId};
   }
 
+  static constexpr ObjHeader List(uint32_t field_mask, uint32_t obj_len) {
+    return {TypeTag::List, field_mask, HeapTag::FixedSize, kNotInPool,
+            kUndefinedId};
+  }
+
+  static constexpr ObjHeader Dict(uint32_t field_mask, uint32_t obj_len) {
+    return {TypeTag::Dict, field_mask, HeapTag::FixedSize, kNotInPool,
+            kUndefinedId};
+  }
+
   // Used by GLOBAL_STR, GLOBAL_LIST, GLOBAL_DICT
   static constexpr ObjHeader Global(uint8_t type_tag) {
     return {type_tag, kZeroMask, HeapTag::Global, kNotInPool, kIsGlobal};
@@ -526,11 +526,17 @@ List<Str*>* Str::split(Str* sep) {
 }
 
 unsigned Str::hash(HashFunc h) {
-  if (!is_hashed_) {
-    hash_ = h(data_, len_) >> 1;
+  if (is_hashed_) {
+    return hash_;
+  }
+  unsigned result = h(data_, len_) >> 1;
+  // A forked child doesn't cache it, because the string is probably on a page
+  // it shares with the parent.  See MarkSweepHeap::OnFork().
+  if (!gHeap.post_fork_) {
+    hash_ = result;
     is_hashed_ = 1;
   }
-  return hash_;
+  return result;
 }
 
 static inline Str* _StrFormat(const char* fmt, int fmt_len, va_list args) {
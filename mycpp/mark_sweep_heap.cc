@@ -3,6 +3,7 @@
 #include <inttypes.h>  // PRId64
 #include <stdlib.h>    // getenv()
 #include <string.h>    // strlen()
+#include <sys/mman.h>  // mmap()
 #include <sys/time.h>  // gettimeofday()
 #include <time.h>      // clock_gettime(), CLOCK_PROCESS_CPUTIME_ID
 #include <unistd.h>    // STDERR_FILENO
@@ -14,6 +15,52 @@
 // TODO: Remove this guard when we have separate binaries
 #if MARK_SWEEP
 
+ForkArena::Chunk* ForkArena::NewChunk(size_t num_bytes) {
+  void* m = mmap(nullptr, num_bytes, PROT_READ | PROT_WRITE,
+                 MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+  CHECK(m != MAP_FAILED);
+
+  Chunk* chunk = static_cast<Chunk*>(m);
+  chunk->next = chunks_;
+  chunk->num_bytes = num_bytes;
+  chunks_ = chunk;
+  return chunk;
+}
+
+void* ForkArena::Allocate(size_t num_bytes) {
+  size_t n = aligned(num_bytes);
+  size_t header_size = aligned(sizeof(Chunk));
+  bytes_allocated_ += n;
+
+  // A big object gets its own chunk, rather than wasting the current one
+  if (n > kChunkSize / 4) {
+    Chunk* chunk = NewChunk(header_size + n);
+    return reinterpret_cast<char*>(chunk) + header_size;
+  }
+
+  if (pos_ + n > end_) {  // also true before the first chunk
+    Chunk* chunk = NewChunk(kChunkSize);
+    pos_ = reinterpret_cast<char*>(chunk) + header_size;
+    end_ = reinterpret_cast<char*>(chunk) + kChunkSize;
+  }
+
+  void* result = pos_;
+  pos_ += n;
+  return result;
+}
+
+void ForkArena::Free() {
+  Chunk* chunk = chunks_;
+  while (chunk) {
+    Chunk* next = chunk->next;
+    munmap(chunk, chunk->num_bytes);
+    chunk = next;
+  }
+  chunks_ = nullptr;
+  pos_ = nullptr;
+  end_ = nullptr;
+}
+
 void MarkSweepHeap::Init() {
   Init(1000);  // collect at 1000 objects in tests
 }
@@ -37,11 +84,27 @@ void MarkSweepHeap::Init(int gc_threshold) {
     gc_verbose_ = true;
   }
 
+  alloc_profile_.Init();
+
   live_objs_.reserve(KiB(10));
   roots_.reserve(KiB(1));  // prevent resizing in common case
 }
 
+void MarkSweepHeap::OnFork() {
+  post_fork_ = true;
+}
+
 int MarkSweepHeap::MaybeCollect() {
+  if (post_fork_) {
+    if (fork_arena_.bytes_allocated() < kPostForkBytes) {
+      num_gc_points_++;
+      return -1;  // a GC would write to pages shared with the parent
+    }
+    // This child isn't short-lived, so resume collecting.  Objects already in
+    // the arena are traced, but never freed.
+    post_fork_ = false;
+  }
+
   // Maybe collect BEFORE allocation, because the new object won't be rooted
   #if GC_ALWAYS
   int result = Collect();
@@ -65,7 +128,32 @@ BumpLeakHeap gBumpLeak;
 // Allocate and update stats
 // TODO: Make this interface nicer.
 void* MarkSweepHeap::Allocate(size_t num_bytes, int* obj_id, int* pool_id) {
+  void* result = AllocateObj(num_bytes, obj_id, pool_id);
+  alloc_profile_.OnAllocate(result, num_bytes);
+  return result;
+}
+
+// Like LoadImage(), give the object an ID so it can be marked, but don't add
+// it to live_objs_, so Sweep() never frees it.
+void* MarkSweepHeap::AllocatePostFork(size_t num_bytes, int* obj_id,
+                                      int* pool_id) {
+  *pool_id = 0;
+  *obj_id = greatest_obj_id_;
+  greatest_obj_id_++;
+  CHECK(greatest_obj_id_ <= kMaxObjId);
+
+  num_allocated_++;
+  bytes_allocated_ += num_bytes;
+
+  return fork_arena_.Allocate(num_bytes);
+}
+
+void* MarkSweepHeap::AllocateObj(size_t num_bytes, int* obj_id, int* pool_id) {
   // log("Allocate %d", num_bytes);
+  if (post_fork_) {
+    return AllocatePostFork(num_bytes, obj_id, pool_id);
+  }
+
   #ifndef NO_POOL_ALLOC
   if (num_bytes <= pool1_.kMaxObjSize) {
     *pool_id = 1;
@@ -258,6 +346,9 @@ int MarkSweepHeap::Collect() {
         num_collections_, num_roots + num_globals, num_globals, num_live());
   }
 
+  // The sampled object may be freed below
+  alloc_profile_.Flush();
+
   // Resize it
   mark_set_.ReInit(greatest_obj_id_);
   #ifndef NO_POOL_ALLOC
@@ -365,6 +456,9 @@ void MarkSweepHeap::PrintStats(int fd) {
           static_cast<int>(roots_.capacity()));
   dprintf(fd, " objs capacity     = %10d\n",
           static_cast<int>(live_objs_.capacity()));
+  dprintf(fd, "\n");
+  dprintf(fd, "fork arena bytes   = %10" PRId64 "\n",
+          fork_arena_.bytes_allocated());
 }
 
 // Cleanup at the end of main() to remain ASAN-safe
@@ -389,6 +483,8 @@ void MarkSweepHeap::MaybePrintStats() {
   if (stats_fd != -1) {
     PrintStats(stats_fd);
   }
+
+  alloc_profile_.MaybeWriteReport();
 }
 
 void MarkSweepHeap::FreeEverything() {
@@ -405,6 +501,7 @@ void MarkSweepHeap::FreeEverything() {
   pool1_.Free();
   pool2_.Free();
   #endif
+  fork_arena_.Free();
 }
 
 void MarkSweepHeap::CleanProcessExit() {
@@ -5,6 +5,7 @@
 
 #include <vector>
 
+#include "mycpp/alloc_profile.h"
 #include "mycpp/common.h"
 #include "mycpp/gc_obj.h"
 
@@ -189,6 +190,41 @@ class Pool {
   DISALLOW_COPY_AND_ASSIGN(Pool<CellsPerBlock COMMA CellSize>);
 };
 
+// A bump allocator for a forked child.  Pool cells and malloc() chunks share
+// pages with the parent, so writing new objects to them makes the kernel copy
+// those pages.  The arena hands out fresh pages from mmap() instead.
+//
+// Objects are never freed individually.  The chunks are unmapped by Free().
+class ForkArena {
+ public:
+  ForkArena() = default;
+
+  void* Allocate(size_t num_bytes);
+  void Free();
+
+  int64_t bytes_allocated() {
+    return bytes_allocated_;
+  }
+
+  static constexpr size_t kChunkSize = MiB(1);
+
+ private:
+  // Each chunk starts with this header, so we don't need a std::vector
+  struct Chunk {
+    Chunk* next;
+    size_t num_bytes;
+  };
+
+  Chunk* NewChunk(size_t num_bytes);
+
+  Chunk* chunks_ = nullptr;
+  char* pos_ = nullptr;
+  char* end_ = nullptr;
+  int64_t bytes_allocated_ = 0;
+
+  DISALLOW_COPY_AND_ASSIGN(ForkArena);
+};
+
 class MarkSweepHeap {
  public:
   // reserve 32 frames to start
@@ -206,6 +242,17 @@ class MarkSweepHeap {
     roots_.pop_back();
   }
 
+  // Remove a root that may not be on top, e.g. for FieldRoots
+  void RemoveRoot(RawObject** p) {
+    for (int i = roots_.size() - 1; i >= 0; --i) {
+      if (roots_[i] == p) {
+        roots_.erase(roots_.begin() + i);
+        return;
+      }
+    }
+    FAIL(kShouldNotGetHere);
+  }
+
   void RootGlobalVar(void* root) {
     global_roots_.push_back(reinterpret_cast<RawObject*>(root));
   }
@@ -228,6 +275,13 @@ class MarkSweepHeap {
   void CleanProcessExit();  // do one last GC, used in unit tests
   void ProcessExit();       // main() lets OS clean up, except ASAN variant
 
+  // Called in the child after fork().  Until the child allocates
+  // kPostForkBytes, new objects go in fork_arena_ and collection is deferred,
+  // so pages shared with the parent stay shared.
+  void OnFork();
+
+  static constexpr int64_t kPostForkBytes = MiB(16);
+
   int num_live() {
     return num_live_
 #ifndef NO_POOL_ALLOC
@@ -247,6 +301,10 @@ class MarkSweepHeap {
   // Show debug logging
   bool gc_verbose_ = false;
 
+  // In a forked child that hasn't allocated much.  Str::hash() doesn't cache
+  // hashes in this mode, since that writes to objects the parent owns.
+  bool post_fork_ = false;
+
   // Current stats
   int num_live_ = 0;
   // Should we keep track of sizes?
@@ -284,7 +342,14 @@ class MarkSweepHeap {
 
   int greatest_obj_id_ = 0;
 
+  ForkArena fork_arena_;
+
+  // OILS_ALLOC_PROFILE
+  AllocProfile alloc_profile_;
+
  private:
+  void* AllocateObj(size_t num_bytes, int* obj_id, int* pool_id);
+  void* AllocatePostFork(size_t num_bytes, int* obj_id, int* pool_id);
   void FreeEverything();
   void MaybePrintStats();
 
@@ -1,6 +1,7 @@
 #include "mycpp/mark_sweep_heap.h"
 
-#include "mycpp/gc_alloc.h"  // gHeap
+#include "mycpp/gc_alloc.h"     // gHeap
+#include "mycpp/gc_builtins.h"  // str_equals()
 #include "mycpp/gc_list.h"
 #include "vendor/greatest.h"
 
@@ -311,6 +312,95 @@ TEST hybrid_root_test() {
   PASS();
 }
 
+TEST post_fork_test() {
+  Str *before = StrFromC("before");
+  Str *after = nullptr;
+  Str *big = nullptr;
+  StackRoots _roots({&before, &after, &big});
+
+  int num_objs = gHeap.live_objs_.size();
+  gHeap.OnFork();
+
+  // New objects go in the arena, which Sweep() doesn't know about
+  after = StrFromC("after");
+  ASSERT_EQ(num_objs, static_cast<int>(gHeap.live_objs_.size()));
+  ASSERT_EQ(0, static_cast<int>(ObjHeader::FromObject(after)->pool_id));
+
+  // Objects the parent owns aren't written to
+  ASSERT_EQ(before->hash(fnv1), before->hash(fnv1));
+  ASSERT_EQ(0, static_cast<int>(before->is_hashed_));
+
+  // No collection, even over the threshold
+  int threshold = gHeap.gc_threshold_;
+  gHeap.gc_threshold_ = 0;
+  ASSERT_EQ(-1, gHeap.MaybeCollect());
+
+  // Until the child allocates enough
+  big = OverAllocatedStr(MarkSweepHeap::kPostForkBytes);
+  ASSERT(gHeap.MaybeCollect() >= 0);
+  ASSERT_EQ(false, gHeap.post_fork_);
+  gHeap.gc_threshold_ = threshold;
+
+  // Arena objects survive, and can be marked
+  ASSERT(str_equals(StrFromC("after"), after));
+  gHeap.Collect();
+  ASSERT(str_equals(StrFromC("after"), after));
+
+  before->hash(fnv1);
+  ASSERT_EQ(1, static_cast<int>(before->is_hashed_));
+
+  PASS();
+}
+
+// Like the code mycpp generates for a ctx_ class
+class ctx_Fake {
+ public:
+  ctx_Fake(Str* s) {
+    List<Str*>* tmp = nullptr;
+    StackRoots _roots({&s, &tmp});
+
+    tmp = NewList<Str*>();
+    tmp->append(s);
+    this->restore = tmp;
+    this->name = StrFromC("name");
+    gHeap.Collect();
+  }
+  ~ctx_Fake() {
+    gHeap.Collect();
+  }
+
+  List<Str*>* restore = nullptr;
+  Str* name = nullptr;
+  FieldRoots<2> field_roots_{&this->restore, &this->name};
+};
+
+TEST field_roots_test() {
+  int num_roots = gHeap.roots_.size();
+  {
+    // The StackRoots in the constructor is pushed after the fields and popped
+    // before the constructor returns
+    ctx_Fake ctx(StrFromC("x"));
+    ASSERT_EQ(num_roots + 2, static_cast<int>(gHeap.roots_.size()));
+
+    gHeap.Collect();
+    ASSERT(str_equals(StrFromC("x"), ctx.restore->at(0)));
+    ASSERT(str_equals(StrFromC("name"), ctx.name));
+  }
+  ASSERT_EQ(num_roots, static_cast<int>(gHeap.roots_.size()));
+
+  // Roots pushed in between aren't removed
+  Str* a = nullptr;
+  Str* b = nullptr;
+  auto field_roots = new FieldRoots<1>({&a});
+  gHeap.PushRoot(reinterpret_cast<RawObject**>(&b));
+  delete field_roots;
+  ASSERT_EQ(num_roots + 1, static_cast<int>(gHeap.roots_.size()));
+  ASSERT_EQ(reinterpret_cast<RawObject**>(&b), gHeap.roots_.back());
+  gHeap.PopRoot();
+
+  PASS();
+}
+
 GREATEST_MAIN_DEFS();
 
 int main(int argc, char **argv) {
@@ -328,6 +418,8 @@ int main(int argc, char **argv) {
   RUN_SUITE(pool_alloc);
 
   RUN_TEST(hybrid_root_test);
+  RUN_TEST(post_fork_test);
+  RUN_TEST(field_roots_test);
 
   gHeap.CleanProcessExit();
 
@@ -14,9 +14,11 @@ from mypy.build import build as mypy_build
 from mypy.build import BuildSource
 from mypy.main import process_options
 
+from mycpp import callgraph_pass
 from mycpp import const_pass
 from mycpp import cppgen_pass
 from mycpp import debug_pass
+from mycpp import escape_pass
 from mycpp import pass_state
 from mycpp.util import log
 
@@ -92,7 +94,8 @@ def get_mypy_config(
 _FIRST = ('asdl.runtime', 'core.vm')
 
 # should be LAST because they use base classes
-_LAST = ('builtin.bracket_osh', 'builtin.completion_osh', 'core.shell')
+_LAST = ('builtin.bracket_osh', 'builtin.completion_osh', 'core.main_loop',
+         'core.shell')
 
 
 def ModulesToCompile(result, mod_names):
@@ -316,6 +319,33 @@ def main(argv):
     # TODO: This could be a class with 2 members
     fmt_ids = {'_counter': 0}
 
+    # Which functions can reach mylib.MaybeCollect()?  The others don't need
+    # StackRoot registrations.
+    log('\tmycpp pass: CALL GRAPH')
+
+    may_collect = pass_state.MayCollect()
+    p_graph = callgraph_pass.Build(result.types, may_collect,
+                                   [name for name, _ in to_compile])
+    for name, module in to_compile:
+        p_graph.OnModule(module)
+    for name, module in to_compile:
+        p_graph.visit_mypy_file(module)
+    may_collect.Calculate()
+    if 0:
+        log('may collect %d of %d functions', len(may_collect.collect),
+            len(may_collect.funcs))
+
+    # Which objects don't escape, and can be allocated on the stack?
+    log('\tmycpp pass: ESCAPE')
+
+    p_escape = escape_pass.Analyze(result.types, p_graph, may_collect)
+    for name, module in to_compile:
+        p_escape.OnModule(module)
+    stack_alloc = p_escape.Calculate()
+    if 0:
+        for func_name, var_names in sorted(stack_alloc.items()):
+            log('stack alloc %s %s', func_name, sorted(var_names))
+
     log('\tmycpp pass: PROTOTYPES')
 
     # First generate ALL C++ declarations / "headers".
@@ -350,6 +380,8 @@ def main(argv):
                                   local_vars=local_vars,
                                   fmt_ids=fmt_ids,
                                   field_gc=field_gc,
+                                  may_collect=may_collect,
+                                  stack_alloc=stack_alloc,
                                   stack_roots_warn=opts.stack_roots_warn)
         p4.visit_mypy_file(module)
         MaybeExitWithErrors(p4)
@@ -91,3 +91,50 @@ class Virtual(object):
             return self.can_reorder_fields[class_name]
         else:
             return True  # by default they can be reordered
+
+
+class MayCollect(object):
+    """
+  Which functions can reach a garbage collection point?
+
+  Collection only happens at mylib.MaybeCollect() calls, so a function that
+  can't reach one doesn't need to register its locals with StackRoot.
+
+  See unit test for example usage.
+  """
+
+    def __init__(self) -> None:
+        # callee -> callers
+        self.callers: dict[str, list[str]] = defaultdict(list)
+        self.funcs: set[str] = set()
+        self.collect: set[str] = set()
+
+    # These are called on the call graph pass
+    def OnFunc(self, func: str) -> None:
+        self.funcs.add(func)
+
+    def OnCall(self, caller: str, callee: str) -> None:
+        self.callers[callee].append(caller)
+
+    def OnCollect(self, func: str) -> None:
+        """The function collects, or calls something we can't analyze."""
+        self.collect.add(func)
+
+    def Calculate(self) -> None:
+        """
+    Propagate OnCollect() from callees to callers.
+    """
+        worklist = list(self.collect)
+        while worklist:
+            func = worklist.pop()
+            for caller in self.callers[func]:
+                if caller not in self.collect:
+                    self.collect.add(caller)
+                    worklist.append(caller)
+
+    # This is called on the IMPL pass
+    def CanCollect(self, func: str) -> bool:
+        # Be conservative about functions the call graph pass didn't see
+        if func not in self.funcs:
+            return True
+        return func in self.collect
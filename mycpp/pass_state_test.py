@@ -84,5 +84,56 @@ class VirtualTest(unittest.TestCase):
         self.assertEqual(True, v.CanReorderFields('Klass2'))
 
 
+class MayCollectTest(unittest.TestCase):
+
+    def testMayCollect(self):
+        """
+    def Leaf():  # no collection
+      pass
+
+    def Loop():
+      mylib.MaybeCollect()
+
+    def Outer():
+      Leaf()
+      Middle()
+
+    def Middle():
+      Loop()
+    """
+        m = pass_state.MayCollect()
+        for func in ('Leaf', 'Loop', 'Middle', 'Outer'):
+            m.OnFunc(func)
+        m.OnCollect('Loop')
+        m.OnCall('Outer', 'Leaf')
+        m.OnCall('Outer', 'Middle')
+        m.OnCall('Middle', 'Loop')
+
+        m.Calculate()
+
+        self.assertEqual(False, m.CanCollect('Leaf'))
+        self.assertEqual(True, m.CanCollect('Loop'))
+        self.assertEqual(True, m.CanCollect('Middle'))
+        self.assertEqual(True, m.CanCollect('Outer'))
+
+        # Not seen by the call graph pass
+        self.assertEqual(True, m.CanCollect('Unknown'))
+
+    def testRecursion(self):
+        m = pass_state.MayCollect()
+        for func in ('f', 'g', 'h'):
+            m.OnFunc(func)
+        m.OnCall('f', 'g')
+        m.OnCall('g', 'f')
+        m.OnCall('h', 'h')
+        m.OnCollect('g')
+
+        m.Calculate()
+
+        self.assertEqual(True, m.CanCollect('f'))
+        self.assertEqual(True, m.CanCollect('g'))
+        self.assertEqual(False, m.CanCollect('h'))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -177,8 +177,8 @@ class _RangeParser(object):
 def _RangePartDetect(tok):
     # type: (Token) -> Optional[word_part.BracedRange]
     """Parse the token and return a new word_part if it looks like a range."""
-    lexer = match.BraceRangeLexer(tok.tval)
-    p = _RangeParser(lexer, tok)
+    lex = match.BraceRangeLexer(lexer.TokenVal(tok))
+    p = _RangeParser(lex, tok)
     try:
         part = p.Parse()
     except _NotARange as e:
@@ -346,61 +346,70 @@ def _IntToString(i, width):
         return s
 
 
-def _RangeStrings(part):
-    # type: (word_part.BracedRange) -> List[str]
-
-    if part.kind == Id.Range_Int:
-        nums = []  # type: List[str]
+class RangeGen(object):
+    """Generates the strings of a BracedRange on demand.
 
-        z1 = _LeadingZeros(part.start)
-        z2 = _LeadingZeros(part.end)
+    So 'for i in {1..1000000}' doesn't need a list of a million strings.
+    """
 
-        if z1 == 0 and z2 == 0:
-            width = 0
+    def __init__(self, part):
+        # type: (word_part.BracedRange) -> None
+        self.is_char = part.kind == Id.Range_Char
+        # The parser ensures that the step has the same sign as end - start,
+        # so there's at least one string
+        self.step = part.step
+
+        if self.is_char:
+            self.start = ord(part.start)
+            self.length = (ord(part.end) - self.start) // self.step + 1
+            self.width = 0
         else:
-            if z1 < z2:
-                width = len(part.end)
+            self.start = int(part.start)
+            self.length = (int(part.end) - self.start) // self.step + 1
+
+            z1 = _LeadingZeros(part.start)
+            z2 = _LeadingZeros(part.end)
+
+            if z1 == 0 and z2 == 0:
+                self.width = 0
             else:
-                width = len(part.start)
-
-        n = int(part.start)
-        end = int(part.end)
-        step = part.step
-        if step > 0:
-            while True:
-                nums.append(_IntToString(n, width))
-                n += step
-                if n > end:
-                    break
-        else:
-            while True:
-                nums.append(_IntToString(n, width))
-                n += step
-                if n < end:
-                    break
-
-        return nums
-
-    else:  # Id.Range_Char
-        chars = []  # type: List[str]
-
-        n = ord(part.start)
-        ord_end = ord(part.end)
-        step = part.step
-        if step > 0:
-            while True:
-                chars.append(chr(n))
-                n += step
-                if n > ord_end:
-                    break
-        else:
-            while True:
-                chars.append(chr(n))
-                n += step
-                if n < ord_end:
-                    break
+                if z1 < z2:
+                    self.width = len(part.end)
+                else:
+                    self.width = len(part.start)
+
+    def Get(self, i):
+        # type: (int) -> str
+        n = self.start + i * self.step
+        if self.is_char:
+            return chr(n)
+        return _IntToString(n, self.width)
+
 
-        return chars
+def LoneRange(w):
+    # type: (word_t) -> Optional[word_part.BracedRange]
+    """If the word is a single range like {1..10}, return it.
+
+    Otherwise return None.
+    """
+    if w.tag() != word_e.BracedTree:
+        return None
+    tree = cast(word.BracedTree, w)
+    if len(tree.parts) != 1:
+        return None
+    part0 = tree.parts[0]
+    if part0.tag() != word_part_e.BracedRange:
+        return None
+    return cast(word_part.BracedRange, part0)
+
+
+def _RangeStrings(part):
+    # type: (word_part.BracedRange) -> List[str]
+    gen = RangeGen(part)
+    strs = []  # type: List[str]
+    for i in xrange(gen.length):
+        strs.append(gen.Get(i))
+    return strs
 
 
 def _ExpandPart(
@@ -50,6 +50,7 @@ from _devbuild.gen.syntax_asdl import (
     pat,
     pat_e,
     word,
+    word_t,
 )
 from _devbuild.gen.runtime_asdl import (
     y_lvalue,
@@ -63,6 +64,7 @@ from _devbuild.gen.runtime_asdl import (
     RedirValue,
     redirect_arg,
     flow_e,
+    flow_t,
     scope_e,
     CommandStatus,
     StatusArray,
@@ -84,6 +86,7 @@ from frontend import lexer
 from frontend import location
 from osh import braces
 from osh import sh_expr_eval
+from osh import word_
 from osh import word_eval
 from mycpp import mylib
 from mycpp.mylib import log, switch, tagswitch
@@ -100,7 +103,7 @@ from typing import List, Dict, Tuple, Optional, Any, cast, TYPE_CHECKING
 if TYPE_CHECKING:
     from _devbuild.gen.id_kind_asdl import Id_t
     from _devbuild.gen.option_asdl import builtin_t
-    from _devbuild.gen.runtime_asdl import cmd_value_t
+    from _devbuild.gen.runtime_asdl import cmd_value_t, ResourceUsage
     from _devbuild.gen.syntax_asdl import Redir, EnvPair
     from core.alloc import Arena
     from core import optview
@@ -140,6 +143,8 @@ class Deps(object):
         self.mutable_opts = None  # type: state.MutableOpts
         self.dumper = None  # type: dev.CrashDumper
         self.debug_f = None  # type: util._DebugFile
+        # Waiter totals, for 'time'
+        self.child_usage = None  # type: Optional[ResourceUsage]
 
 
 def _PackFlags(keyword_id, flags=0):
@@ -226,6 +231,30 @@ def PlusEquals(old_val, val):
             else:
                 raise AssertionError()  # parsing should prevent this
 
+        elif case(value_e.SparseArray):
+            if tag == value_e.Str:
+                e_die("Can't append string to array")
+
+            elif tag == value_e.BashArray:
+                sparse_val = cast(value.SparseArray, UP_old_val)
+                to_append = cast(value.BashArray, UP_val)
+
+                # Like bash, append after the last index
+                indices = []  # type: List[int]
+                indices.extend(sparse_val.indices)
+                strs = []
+                strs.extend(sparse_val.strs)
+                index = indices[-1] + 1 if len(indices) else 0
+                for s in to_append.strs:
+                    if s is not None:
+                        indices.append(index)
+                        strs.append(s)
+                    index += 1
+                val = state.MaybeDenseArray(value.SparseArray(indices, strs))
+
+            else:
+                raise AssertionError()  # parsing should prevent this
+
         elif case(value_e.BashAssoc):
             # TODO: Could try to match bash, it will append to ${A[0]}
             pass
@@ -316,12 +345,19 @@ class CommandEvaluator(object):
         self.mutable_opts = cmd_deps.mutable_opts
         self.dumper = cmd_deps.dumper
         self.debug_f = cmd_deps.debug_f  # Used by ShellFuncAction too
+        self.child_usage = cmd_deps.child_usage
 
         self.trap_state = trap_state
         self.signal_safe = signal_safe
 
         self.running_err_trap = False
         self.loop_level = 0  # for detecting bad top-level break/continue
+
+        # return, break, and continue don't raise exceptions.  They set this,
+        # and _Execute(), loops, and RunProc() unwind by checking it.
+        self.pending_flow = None  # type: Optional[vm.IntControlFlow]
+        # The value of a pending 'return (x)' in a func
+        self.pending_retval = None  # type: Optional[value_t]
         self.check_command_sub_status = False  # a hack.  Modified by ShellExecutor
 
         self.status_array_pool = []  # type: List[StatusArray]
@@ -599,7 +635,10 @@ class CommandEvaluator(object):
             if case(cmd_value_e.Argv):
                 cmd_val = cast(cmd_value.Argv, UP_cmd_val)
                 self.tracer.OnSimpleCommand(cmd_val.argv)
-                return self.shell_ex.RunSimpleCommand(cmd_val, cmd_st, do_fork)
+                status = self.shell_ex.RunSimpleCommand(
+                    cmd_val, cmd_st, do_fork)
+                self.tracer.OnSimpleCommandEnd(status)
+                return status
 
             elif case(cmd_value_e.Assign):
                 cmd_val = cast(cmd_value.Assign, UP_cmd_val)
@@ -703,7 +742,7 @@ class CommandEvaluator(object):
         # x = 'foo' in Hay blocks
         if node.keyword is None:
             # Note: there's only one LHS
-            lval = location.LName(node.lhs[0].name.tval)
+            lval = location.LName(lexer.TokenVal(node.lhs[0].name))
             val = self.expr_ev.EvalExpr(node.rhs, loc.Missing)
 
             self.mem.SetNamed(lval,
@@ -719,7 +758,7 @@ class CommandEvaluator(object):
 
             num_lhs = len(node.lhs)
             if num_lhs == 1:
-                lvals = [location.LName(node.lhs[0].name.tval)]
+                lvals = [location.LName(lexer.TokenVal(node.lhs[0].name))]
                 rhs_vals = [right_val]
             else:
                 items = val_ops.ToList(
@@ -735,7 +774,7 @@ class CommandEvaluator(object):
                 lvals = []
                 rhs_vals = []
                 for i, lhs_val in enumerate(node.lhs):
-                    lval = location.LName(lhs_val.name.tval)
+                    lval = location.LName(lexer.TokenVal(lhs_val.name))
                     lvals.append(lval)
                     rhs_vals.append(items[i])
 
@@ -1082,7 +1121,9 @@ class CommandEvaluator(object):
     def _DoRetval(self, node):
         # type: (command.Retval) -> int
         val = self.expr_ev.EvalExpr(node.val, node.keyword)
-        raise vm.ValueControlFlow(node.keyword, val)
+        self.pending_flow = vm.IntControlFlow(node.keyword, 0)
+        self.pending_retval = val
+        return 0
 
     def _DoControlFlow(self, node):
         # type: (command.ControlFlow) -> int
@@ -1114,7 +1155,7 @@ class CommandEvaluator(object):
             else:
                 arg = 1  # break or continue 1 level by default
 
-        self.tracer.OnControlFlow(keyword.tval, arg)
+        self.tracer.OnControlFlow(lexer.TokenVal(keyword), arg)
 
         # NOTE: A top-level 'return' is OK, unlike in bash.  If you can return
         # from a sourced script, it makes sense to return from a main script.
@@ -1128,7 +1169,8 @@ class CommandEvaluator(object):
                 raise util.UserExit(
                     arg)  # handled differently than other control flow
             else:
-                raise vm.IntControlFlow(keyword, arg)
+                self.pending_flow = vm.IntControlFlow(keyword, arg)
+                return 0
         else:
             msg = 'Invalid control flow at top level'
             if self.exec_opts.strict_control_flow():
@@ -1154,6 +1196,8 @@ class CommandEvaluator(object):
         i = 1
         n = len(node.children)
         while i < n:
+            if self.pending_flow is not None:
+                break
             #log('i %d status %d', i, status)
             child = node.children[i]
             op = node.ops[i - 1]
@@ -1182,6 +1226,18 @@ class CommandEvaluator(object):
 
         return status
 
+    def _HandleLoop(self):
+        # type: () -> flow_t
+        """Handle a pending break or continue after a loop iteration.
+
+        If it returns flow_e.Raise, the flow stays pending for an enclosing
+        loop or function.
+        """
+        action = self.pending_flow.HandleLoop()
+        if action != flow_e.Raise:
+            self.pending_flow = None
+        return action
+
     def _DoWhileUntil(self, node):
         # type: (command.WhileUntil) -> int
         status = 0
@@ -1190,27 +1246,49 @@ class CommandEvaluator(object):
                 try:
                     # blame while/until spid
                     b = self._EvalCondition(node.cond, node.keyword)
-                    if node.keyword.id == Id.KW_Until:
-                        b = not b
-                    if not b:
-                        break
-                    status = self._Execute(node.body)  # last one wins
+                    if self.pending_flow is None:
+                        if node.keyword.id == Id.KW_Until:
+                            b = not b
+                        if not b:
+                            break
+                        status = self._Execute(node.body)  # last one wins
+
+                except vm.IntControlFlow as e:  # e.g. 'eval break'
+                    self.pending_flow = e
 
-                except vm.IntControlFlow as e:
+                if self.pending_flow is not None:
                     status = 0
-                    action = e.HandleLoop()
-                    if action == flow_e.Break:
+                    if self._HandleLoop() != flow_e.Nothing:
                         break
-                    elif action == flow_e.Raise:
-                        raise
 
         return status
 
+    def _WordsIter(self, words):
+        # type: (List[word_t]) -> val_ops._ContainerIter
+        """Iterate over the words of 'for x in a b c'.
+
+        The common cases {1..1000000} and "$@" are generated lazily, rather
+        than materialized as a List[str].
+        """
+        if len(words) == 1:
+            w = words[0]
+
+            part = braces.LoneRange(w)
+            if part:
+                return val_ops.BraceRangeIter(part)
+
+            if word_.IsQuotedDollarAt(w):
+                argv, offset = self.mem.GetArgvInPlace()
+                return val_ops.ArgvIter(argv, offset)
+
+        expanded = braces.BraceExpandWords(words)
+        return val_ops.ArrayIter(self.word_ev.EvalWordSequence(expanded))
+
     def _DoForEach(self, node):
         # type: (command.ForEach) -> int
 
         # for the 2 kinds of shell loop
-        iter_list = None  # type: List[str]
+        it2 = None  # type: val_ops._ContainerIter
 
         # for YSH loop
         iter_expr = None  # type: expr_t
@@ -1221,12 +1299,12 @@ class CommandEvaluator(object):
 
         with tagswitch(node.iterable) as case:
             if case(for_iter_e.Args):
-                iter_list = self.mem.GetArgv()
+                argv, offset = self.mem.GetArgvInPlace()
+                it2 = val_ops.ArgvIter(argv, offset)
 
             elif case(for_iter_e.Words):
                 iterable = cast(for_iter.Words, UP_iterable)
-                words = braces.BraceExpandWords(iterable.words)
-                iter_list = self.word_ev.EvalWordSequence(words)
+                it2 = self._WordsIter(iterable.words)
 
             elif case(for_iter_e.YshExpr):
                 iterable = cast(for_iter.YshExpr, UP_iterable)
@@ -1241,8 +1319,7 @@ class CommandEvaluator(object):
         name1 = None  # type: LeftName
         name2 = None  # type: Optional[LeftName]
 
-        it2 = None  # type: val_ops._ContainerIter
-        if iter_list is None:  # for_expr.YshExpr
+        if iter_expr:  # for_expr.YshExpr
             val = self.expr_ev.EvalExpr(iter_expr, expr_blame)
 
             UP_val = val
@@ -1298,9 +1375,6 @@ class CommandEvaluator(object):
                     raise error.TypeErr(val, 'for loop expected List or Dict',
                                         node.keyword)
         else:
-            #log('iter list %s', iter_list)
-            it2 = val_ops.ArrayIter(iter_list)
-
             if n == 1:
                 name1 = location.LName(node.iter_names[0])
             elif n == 2:
@@ -1326,13 +1400,13 @@ class CommandEvaluator(object):
 
                 try:
                     status = self._Execute(node.body)  # last one wins
-                except vm.IntControlFlow as e:
+                except vm.IntControlFlow as e:  # e.g. 'eval break'
+                    self.pending_flow = e
+
+                if self.pending_flow is not None:
                     status = 0
-                    action = e.HandleLoop()
-                    if action == flow_e.Break:
+                    if self._HandleLoop() != flow_e.Nothing:
                         break
-                    elif action == flow_e.Raise:
-                        raise
 
         return status
 
@@ -1360,13 +1434,13 @@ class CommandEvaluator(object):
 
                 try:
                     status = self._Execute(body)
-                except vm.IntControlFlow as e:
+                except vm.IntControlFlow as e:  # e.g. 'eval break'
+                    self.pending_flow = e
+
+                if self.pending_flow is not None:
                     status = 0
-                    action = e.HandleLoop()
-                    if action == flow_e.Break:
+                    if self._HandleLoop() != flow_e.Nothing:
                         break
-                    elif action == flow_e.Raise:
-                        raise
 
                 if update:
                     self.arith_ev.Eval(update)
@@ -1431,6 +1505,8 @@ class CommandEvaluator(object):
         done = False
         for if_arm in node.arms:
             b = self._EvalCondition(if_arm.cond, if_arm.keyword)
+            if self.pending_flow is not None:
+                return 0
             if b:
                 status = self._ExecuteList(if_arm.action)
                 done = True
@@ -1506,15 +1582,24 @@ class CommandEvaluator(object):
     def _DoTimeBlock(self, node):
         # type: (command.TimeBlock) -> int
         # TODO:
-        # - When do we need RUSAGE_CHILDREN?
         # - Respect TIMEFORMAT environment variable.
         # "If this variable is not set, Bash acts as if it had the value"
         # $'\nreal\t%3lR\nuser\t%3lU\nsys\t%3lS'
         # "A trailing newline is added when the format string is displayed."
 
+        # Like bash, user and sys include the child processes that finished,
+        # which the Waiter adds up from wait4().
+        children = self.child_usage
+        c_user = children.user if children else 0.0
+        c_sys = children.sys if children else 0.0
+
         s_real, s_user, s_sys = pyos.Time()
         status = self._Execute(node.pipeline)
         e_real, e_user, e_sys = pyos.Time()
+
+        if children:
+            e_user += children.user - c_user
+            e_sys += children.sys - c_sys
         # note: mycpp doesn't support %.3f
         libc.print_time(e_real - s_real, e_user - s_user, e_sys - s_sys)
 
@@ -1539,6 +1624,7 @@ class CommandEvaluator(object):
                 # TODO: blame_tok should always be set.
                 if node.blame_tok is not None:
                     self.mem.SetTokenForLine(node.blame_tok)
+                    self.tracer.OnCommand(node.blame_tok)
                 status = self._DoSimple(node, cmd_st)
 
             elif case(command_e.ExpandedAlias):
@@ -1562,12 +1648,14 @@ class CommandEvaluator(object):
                 node = cast(command.DBracket, UP_node)
 
                 self.mem.SetTokenForLine(node.left)
+                self.tracer.OnCommand(node.left)
                 status = self._DoDBracket(node, cmd_st)
 
             elif case(command_e.DParen):
                 node = cast(command.DParen, UP_node)
 
                 self.mem.SetTokenForLine(node.left)
+                self.tracer.OnCommand(node.left)
                 status = self._DoDParen(node, cmd_st)
 
             elif case(command_e.VarDecl):
@@ -1575,12 +1663,14 @@ class CommandEvaluator(object):
 
                 # Point to var name (bare assignment has no keyword)
                 self.mem.SetTokenForLine(node.lhs[0].name)
+                self.tracer.OnCommand(node.lhs[0].name)
                 status = self._DoVarDecl(node)
 
             elif case(command_e.Mutation):
                 node = cast(command.Mutation, UP_node)
 
                 self.mem.SetTokenForLine(node.keyword)  # point to setvar/set
+                self.tracer.OnCommand(node.keyword)
                 self._DoMutation(node)
                 status = 0  # if no exception is thrown, it succeeds
 
@@ -1588,19 +1678,21 @@ class CommandEvaluator(object):
                 node = cast(command.ShAssignment, UP_node)
 
                 self.mem.SetTokenForLine(node.pairs[0].left)
+                self.tracer.OnCommand(node.pairs[0].left)
                 status = self._DoShAssignment(node, cmd_st)
 
             elif case(command_e.Expr):
                 node = cast(command.Expr, UP_node)
 
                 self.mem.SetTokenForLine(node.keyword)
+                self.tracer.OnCommand(node.keyword)
                 status = self._DoExpr(node)
 
             elif case(command_e.Retval):
                 node = cast(command.Retval, UP_node)
 
                 self.mem.SetTokenForLine(node.keyword)
-                self._DoRetval(node)
+                status = self._DoRetval(node)
 
             elif case(command_e.ControlFlow):
                 node = cast(command.ControlFlow, UP_node)
@@ -1708,6 +1800,7 @@ class CommandEvaluator(object):
                         # Trace it.  TODO: Show the trap kind too
                         with dev.ctx_Tracer(self.tracer, 'trap', None):
                             self._Execute(trap_node)
+                            self._RaisePendingFlow()
 
     def _Execute(self, node):
         # type: (command_t) -> int
@@ -1813,6 +1906,11 @@ class CommandEvaluator(object):
                     # I/O error when applying redirects, e.g. bad file descriptor.
                     status = 1
 
+        if self.pending_flow is not None:
+            # return, break, continue: unwind without setting $? or checking
+            # errexit
+            return status
+
         # Compute status from _process_sub_status
         if process_sub_st.codes is None:
             # Optimized to avoid allocs
@@ -1837,7 +1935,7 @@ class CommandEvaluator(object):
         # - function def (however this always exits 0 anyway)
         # - assignment - its result should be the result of the RHS?
         #   - e.g. arith sub, command sub?  I don't want arith sub.
-        # - ControlFlow: always raises, it has no status.
+        # - ControlFlow: always unwinds, it has no status.
         if check_errexit:
             #log('cmd_st %s', cmd_st)
             self._CheckStatus(status, cmd_st, node, errexit_loc)
@@ -1850,6 +1948,8 @@ class CommandEvaluator(object):
         for child in children:
             # last status wins
             status = self._Execute(child)
+            if self.pending_flow is not None:
+                break
         return status
 
     def LastStatus(self):
@@ -1945,6 +2045,7 @@ class CommandEvaluator(object):
 
         try:
             status = self._Execute(node)
+            self._RaisePendingFlow()
         except vm.IntControlFlow as e:
             if cmd_flags & RaiseControlFlow:
                 raise  # 'eval break' and 'source return.sh', etc.
@@ -1975,6 +2076,10 @@ class CommandEvaluator(object):
             err = e
 
         if err:
+            # Don't leave control flow pending for the next command
+            self.pending_flow = None
+            self.pending_retval = None
+
             status = err.ExitStatus()
 
             is_fatal = True
@@ -2009,6 +2114,7 @@ class CommandEvaluator(object):
         status = 0
         try:
             status = self._Execute(block)  # can raise FatalRuntimeError, etc.
+            self._RaisePendingFlow()
         except vm.IntControlFlow as e:  # A block is more like a function.
             # return in a block
             if e.IsReturn():
@@ -2062,6 +2168,7 @@ class CommandEvaluator(object):
                     with state.ctx_DebugTrap(self.mem):
                         # Don't catch util.UserExit, etc.
                         self._Execute(node)
+                        self._RaisePendingFlow()
 
     def _MaybeRunErrTrap(self):
         # type: () -> None
@@ -2080,6 +2187,49 @@ class CommandEvaluator(object):
                 #with state.ctx_Registers(self.mem):  # prevent setting $? etc.
                 with ctx_ErrTrap(self):
                     self._Execute(node)
+                    self._RaisePendingFlow()
+
+    def _TakePendingFlow(self):
+        # type: () -> Optional[vm.IntControlFlow]
+        """Return the pending return, break, or continue, and clear it."""
+        if self.pending_retval is not None:
+            self._RaisePendingFlow()  # only funcs handle 'return (x)'
+
+        flow = self.pending_flow
+        self.pending_flow = None
+        return flow
+
+    def _RaisePendingFlow(self):
+        # type: () -> None
+        """Raise pending control flow as an exception.
+
+        For callers that can't unwind by checking self.pending_flow, like
+        'eval', 'source', and traps.  They're rarely on the hot path.
+        """
+        flow = self.pending_flow
+        if flow is None:
+            return
+        self.pending_flow = None
+
+        if self.pending_retval is not None:
+            val = self.pending_retval
+            self.pending_retval = None
+            raise vm.ValueControlFlow(flow.token, val)
+
+        raise flow
+
+    def TakeRetval(self):
+        # type: () -> Optional[value_t]
+        """For funcs: the value of a pending 'return (x)', or None."""
+        if self.pending_flow is None:
+            return None
+
+        val = self.pending_retval
+        if val is None:
+            raise AssertionError('IntControlFlow in func')
+        self.pending_flow = None
+        self.pending_retval = None
+        return val
 
     def RunProc(self, proc, cmd_val):
         # type: (value.Proc, cmd_value.Argv) -> int
@@ -2100,21 +2250,26 @@ class CommandEvaluator(object):
 
             # Redirects still valid for functions.
             # Here doc causes a pipe and Process(SubProgramThunk).
+            flow = None  # type: Optional[vm.IntControlFlow]
             try:
                 status = self._Execute(proc.body)
-            except vm.IntControlFlow as e:
-                if e.IsReturn():
-                    status = e.StatusCode()
-                else:
-                    # break/continue used in the wrong place.
-                    e_die(
-                        'Unexpected %r (in function call)' %
-                        lexer.TokenVal(e.token), e.token)
+                flow = self._TakePendingFlow()
+            except vm.IntControlFlow as e:  # e.g. 'eval return'
+                flow = e
             except error.FatalRuntime as e:
                 # Dump the stack before unwinding it
                 self.dumper.MaybeRecord(self, e)
                 raise
 
+            if flow:
+                if flow.IsReturn():
+                    status = flow.StatusCode()
+                else:
+                    # break/continue used in the wrong place.
+                    e_die(
+                        'Unexpected %r (in function call)' %
+                        lexer.TokenVal(flow.token), flow.token)
+
         return status
 
     def RunFuncForCompletion(self, proc, argv):
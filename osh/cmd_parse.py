@@ -432,7 +432,7 @@ class VarChecker(object):
             return
 
         top = self.names[-1]
-        name = name_tok.tval
+        name = lexer.TokenVal(name_tok)
         if keyword_id in (Id.KW_Const, Id.KW_Var):
             if name in top:
                 p_die('%r was already declared' % name, name_tok)
@@ -2314,7 +2314,7 @@ class CommandParser(object):
                 part0 = parts[0]
                 if part0.tag() == word_part_e.Literal:
                     tok = cast(Token, part0)
-                    if (match.IsValidVarName(tok.tval) and
+                    if (match.IsValidVarName(lexer.TokenVal(tok)) and
                             self.w_parser.LookPastSpace() == Id.Lit_Equals):
                         assert tok.id == Id.Lit_Chars, tok
 
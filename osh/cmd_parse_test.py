@@ -11,6 +11,7 @@ from core import error
 from core import state
 from core import test_lib
 from core import ui
+from frontend import lexer
 
 from osh import word_
 
@@ -197,7 +198,7 @@ def assertHereDocToken(test, expected_token_val, node):
     """A sanity check for some ad hoc tests."""
     test.assertEqual(1, len(node.redirects))
     h = node.redirects[0].arg
-    test.assertEqual(expected_token_val, h.stdin_parts[0].tval)
+    test.assertEqual(expected_token_val, lexer.TokenVal(h.stdin_parts[0]))
 
 
 class HereDocTest(unittest.TestCase):
@@ -870,7 +871,7 @@ fi
         self.assertEqual(Id.BoolBinary_EqualTilde, node.expr.op_id)
         right = node.expr.right
         self.assertEqual(5, len(right.parts))
-        self.assertEqual('(', right.parts[0].tval)
+        self.assertEqual('(', lexer.TokenVal(right.parts[0]))
 
         # TODO: Implement BASH_REGEX_CHARS
         return
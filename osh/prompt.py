@@ -16,6 +16,7 @@ from core import error
 from core import pyos
 from core import state
 from core import ui
+from core import util
 from frontend import consts
 from frontend import match
 from frontend import reader
@@ -106,8 +107,12 @@ class Evaluator(object):
 
         # These caches should reduce memory pressure a bit.  We don't want to
         # reparse the prompt twice every time you hit enter.
+        # They're bounded because prompts with the time or git status in them
+        # produce a new string every time.
         self.tokens_cache = {}  # type: Dict[str, List[Tuple[Id_t, str]]]
+        self.tokens_lru = util.LruIndex('ps1_tokens', 16)
         self.parse_cache = {}  # type: Dict[str, CompoundWord]
+        self.parse_lru = util.LruIndex('ps1_words', 16)
 
     def CheckCircularDeps(self):
         # type: () -> None
@@ -225,8 +230,14 @@ class Evaluator(object):
         # Parse backslash escapes (cached)
         tokens = self.tokens_cache.get(val.s)
         if tokens is None:
+            self.tokens_lru.Miss()
             tokens = match.Ps1Tokens(val.s)
+            evicted = self.tokens_lru.Add(val.s)
+            if evicted is not None:
+                mylib.dict_erase(self.tokens_cache, evicted)
             self.tokens_cache[val.s] = tokens
+        else:
+            self.tokens_lru.Hit(val.s)
 
         # Replace values.
         ps1_str = self._ReplaceBackslashCodes(tokens)
@@ -236,13 +247,19 @@ class Evaluator(object):
         # NOTE: This is copied from the PS4 logic in Tracer.
         ps1_word = self.parse_cache.get(ps1_str)
         if ps1_word is None:
+            self.parse_lru.Miss()
             w_parser = self.parse_ctx.MakeWordParserForPlugin(ps1_str)
             try:
                 ps1_word = w_parser.ReadForPlugin()
             except error.Parse as e:
                 ps1_word = word_.ErrorWord("<ERROR: Can't parse PS1: %s>" %
                                            e.UserErrorString())
+            evicted = self.parse_lru.Add(ps1_str)
+            if evicted is not None:
+                mylib.dict_erase(self.parse_cache, evicted)
             self.parse_cache[ps1_str] = ps1_word
+        else:
+            self.parse_lru.Hit(ps1_str)
 
         # Evaluate, e.g. "${debian_chroot}\u" -> '\u'
         val2 = self.word_ev.EvalForPlugin(ps1_word)
@@ -277,6 +294,7 @@ class UserPlugin(object):
 
         self.arena = parse_ctx.arena
         self.parse_cache = {}  # type: Dict[str, command_t]
+        self.parse_lru = util.LruIndex('prompt_command', 8)
 
     def Run(self):
         # type: () -> None
@@ -289,6 +307,7 @@ class UserPlugin(object):
         prompt_cmd = cast(value.Str, val).s
         node = self.parse_cache.get(prompt_cmd)
         if node is None:
+            self.parse_lru.Miss()
             line_reader = reader.StringLineReader(prompt_cmd, self.arena)
             c_parser = self.parse_ctx.MakeOshParser(line_reader)
 
@@ -301,7 +320,12 @@ class UserPlugin(object):
                     self.errfmt.PrettyPrintError(e)
                     return  # don't execute
 
+            evicted = self.parse_lru.Add(prompt_cmd)
+            if evicted is not None:
+                mylib.dict_erase(self.parse_cache, evicted)
             self.parse_cache[prompt_cmd] = node
+        else:
+            self.parse_lru.Hit(prompt_cmd)
 
         # Save this so PROMPT_COMMAND can't set $?
         with state.ctx_Registers(self.mem):
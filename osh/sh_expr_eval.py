@@ -38,6 +38,7 @@ from _devbuild.gen.syntax_asdl import (
     sh_lhs_t,
     BracedVarSub,
     SimpleVarSub,
+    word_part_e,
 )
 from _devbuild.gen.option_asdl import option_i
 from _devbuild.gen.types_asdl import bool_arg_type_e
@@ -47,6 +48,7 @@ from core.error import e_die, e_die_status, e_strict, e_usage
 from core import state
 from core import ui
 from frontend import consts
+from frontend import lexer
 from frontend import match
 from frontend import parse_lib
 from frontend import reader
@@ -129,19 +131,19 @@ def OldValue(lval, mem, exec_opts):
         elif case(sh_lvalue_e.Indexed):
             lval = cast(sh_lvalue.Indexed, UP_lval)
 
-            array_val = None  # type: value.BashArray
+            s = None  # type: Optional[str]
             with tagswitch(val) as case2:
                 if case2(value_e.Undef):
-                    array_val = value.BashArray([])
+                    pass
                 elif case2(value_e.BashArray):
-                    tmp = cast(value.BashArray, UP_val)
-                    # mycpp rewrite: add tmp.  cast() creates a new var in inner scope
-                    array_val = tmp
+                    array_val = cast(value.BashArray, UP_val)
+                    s = word_eval.GetArrayItem(array_val.strs, lval.index)
+                elif case2(value_e.SparseArray):
+                    sparse_val = cast(value.SparseArray, UP_val)
+                    s = state.SparseArrayGet(sparse_val, lval.index)
                 else:
                     e_die("Can't use [] on value of type %s" % ui.ValType(val))
 
-            s = word_eval.GetArrayItem(array_val.strs, lval.index)
-
             if s is None:
                 val = value.Str('')  # NOTE: Other logic is value.Undef?  0?
             else:
@@ -467,14 +469,21 @@ class ArithEvaluator(object):
         """ For x = y  and   x += y  and  ++x """
 
         lval = self.EvalArithLhs(node)
+        if lval.tag() == sh_lvalue_e.Var:
+            named_lval = cast(LeftName, lval)
+            int_val = self.mem.GetShInt(named_lval.name)
+            if int_val:
+                return int_val.i, lval
+
         val = OldValue(lval, self.mem, self.exec_opts)
 
         # BASH_LINENO, arr (array name without strict_array), etc.
-        if (val.tag() in (value_e.BashArray, value_e.BashAssoc) and
+        if (val.tag() in (value_e.BashArray, value_e.SparseArray,
+                          value_e.BashAssoc) and
                 lval.tag() == sh_lvalue_e.Var):
             named_lval = cast(LeftName, lval)
             if word_eval.ShouldArrayDecay(named_lval.name, self.exec_opts):
-                if val.tag() == value_e.BashArray:
+                if val.tag() in (value_e.BashArray, value_e.SparseArray):
                     lval = sh_lvalue.Indexed(named_lval.name, 0, loc.Missing)
                 elif val.tag() == value_e.BashAssoc:
                     lval = sh_lvalue.Keyed(named_lval.name, '0', loc.Missing)
@@ -489,6 +498,13 @@ class ArithEvaluator(object):
 
     def _Store(self, lval, new_int):
         # type: (sh_lvalue_t, int) -> None
+        if lval.tag() == sh_lvalue_e.Var:
+            # Stays an integer until it's used as a string
+            named_lval = cast(LeftName, lval)
+            self.mem.SetShInt(named_lval, new_int,
+                              self.mem.ScopesForWriting())
+            return
+
         val = value.Str(str(new_int))
         state.OshLanguageSetValue(self.mem, lval, val)
 
@@ -498,11 +514,35 @@ class ArithEvaluator(object):
 
         Also used internally.
         """
+        # Fast paths for the leaves of (( i < 10 )), which don't need to box
+        # the integer, or evaluate and reparse a word
+        UP_node = node
+        with tagswitch(node) as case:
+            if case(arith_expr_e.VarSub):
+                vsub = cast(SimpleVarSub, UP_node)
+                int_val = self.mem.GetShInt(vsub.var_name)
+                if int_val:
+                    return int_val.i
+
+            elif case(arith_expr_e.Word):
+                w = cast(CompoundWord, UP_node)
+                if (len(w.parts) == 1 and
+                        w.parts[0].tag() == word_part_e.Literal):
+                    tok = cast(Token, w.parts[0])
+                    # 017 is octal
+                    if (tok.id == Id.Lit_Digits and
+                        (tok.length == 1 or
+                         not lexer.TokenVal(tok).startswith('0'))):
+                        try:
+                            return int(lexer.TokenVal(tok))
+                        except ValueError:
+                            pass  # too big, so use the slow path's error
+
         val = self.Eval(node)
 
         # BASH_LINENO, arr (array name without strict_array), etc.
-        if val.tag() in (value_e.BashArray, value_e.BashAssoc
-                         ) and node.tag() == arith_expr_e.VarSub:
+        if val.tag() in (value_e.BashArray, value_e.SparseArray,
+                         value_e.BashAssoc) and node.tag() == arith_expr_e.VarSub:
             vsub = cast(SimpleVarSub, node)
             if word_eval.ShouldArrayDecay(vsub.var_name, self.exec_opts):
                 val = word_eval.DecayArray(val)
@@ -675,6 +715,11 @@ class ArithEvaluator(object):
                             index = self.EvalToInt(node.right)
                             s = word_eval.GetArrayItem(array_val.strs, index)
 
+                        elif case(value_e.SparseArray):
+                            sparse_val = cast(value.SparseArray, UP_left)
+                            index = self.EvalToInt(node.right)
+                            s = state.SparseArrayGet(sparse_val, index)
+
                         elif case(value_e.BashAssoc):
                             left = cast(value.BashAssoc, UP_left)
                             key = self.EvalWordToString(node.right)
@@ -30,6 +30,7 @@ from _devbuild.gen.runtime_asdl import (value, value_e, scope_e, span_e, emit_i,
                                         char_kind_i, state_i)
 from mycpp.mylib import log
 from core import pyutil
+from core import util
 from frontend import consts
 from mycpp import mylib
 from mycpp.mylib import tagswitch
@@ -96,6 +97,7 @@ class SplitContext(object):
         # Split into (ifs_whitespace, ifs_other)
         self.splitters = {
         }  # type: Dict[str, IfsSplitter]  # aka IFS value -> splitter instance
+        self.splitters_lru = util.LruIndex('ifs_splitters', 16)
 
     def _GetSplitter(self, ifs=None):
         # type: (str) -> IfsSplitter
@@ -118,6 +120,7 @@ class SplitContext(object):
 
         sp = self.splitters.get(ifs)
         if sp is None:
+            self.splitters_lru.Miss()
             # Figure out what kind of splitter we should instantiate.
 
             ifs_whitespace = mylib.BufWriter()
@@ -134,7 +137,12 @@ class SplitContext(object):
             # NOTE: Technically, we could make the key more precise.  IFS=$' \t' is
             # the same as IFS=$'\t '.  But most programs probably don't do that, and
             # everything should work in any case.
+            evicted = self.splitters_lru.Add(ifs)
+            if evicted is not None:
+                mylib.dict_erase(self.splitters, evicted)
             self.splitters[ifs] = sp
+        else:
+            self.splitters_lru.Hit(ifs)
 
         return sp
 
@@ -8,6 +8,7 @@ from _devbuild.gen.syntax_asdl import (
     CompoundWord,
     DoubleQuoted,
     SingleQuoted,
+    SimpleVarSub,
     word,
     word_e,
     word_t,
@@ -74,11 +75,11 @@ def _EvalWordPart(part):
 
         elif case(word_part_e.Literal):
             tok = cast(Token, UP_part)
-            return True, tok.tval, False
+            return True, lexer.TokenVal(tok), False
 
         elif case(word_part_e.EscapedLiteral):
             part = cast(word_part.EscapedLiteral, UP_part)
-            val = part.token.tval
+            val = lexer.TokenVal(part.token)
             assert len(val) == 2, val  # e.g. \*
             assert val[0] == '\\'
             s = val[1]
@@ -86,7 +87,8 @@ def _EvalWordPart(part):
 
         elif case(word_part_e.SingleQuoted):
             part = cast(SingleQuoted, UP_part)
-            tmp = [t.tval for t in part.tokens]  # on its own line for mycpp
+            # on its own line for mycpp
+            tmp = [lexer.TokenVal(t) for t in part.tokens]
             s = ''.join(tmp)
             return True, s, True
 
@@ -143,10 +145,8 @@ def FastStrEval(w):
 
                 # TODO: word_part.Literal should have lazy (str? sval) field
 
-                # TODO: instances created by lexer.DummyToken() don't have
-                # tok.line field, so they can't use lexer.TokenVal()
-                return part0.tval
-                #return lexer.TokenVal(part0)
+                # lexer.DummyToken() sets tval, since it has no tok.line
+                return lexer.TokenVal(part0)
 
             else:
                 # e.g. Id.Lit_Star needs to be glob expanded
@@ -254,7 +254,8 @@ def TildeDetect(UP_w):
         return CompoundWord(new_parts)
 
     # Lit_Chars is for ~/foo,
-    if id_ == Id.Lit_Chars and cast(Token, part1).tval.startswith('/'):
+    if (id_ == Id.Lit_Chars and
+            lexer.TokenVal(cast(Token, part1)).startswith('/')):
         new_parts.extend(w.parts[1:])
         return CompoundWord(new_parts)
 
@@ -279,7 +280,8 @@ def TildeDetectAssign(w):
             if next_part:
                 is_tilde = (LiteralId(next_part) == Id.Lit_Colon or
                             (LiteralId(next_part) == Id.Lit_Chars and
-                             cast(Token, next_part).tval.startswith('/')))
+                             lexer.TokenVal(cast(
+                                 Token, next_part)).startswith('/')))
             else:
                 is_tilde = True  # you can expand :~
 
@@ -314,6 +316,31 @@ def HasArrayPart(w):
     return False
 
 
+def IsQuotedDollarAt(UP_w):
+    # type: (word_t) -> bool
+    """Is the word exactly "$@"?
+
+    Used to iterate over argv without copying it.
+    """
+    if UP_w.tag() != word_e.Compound:
+        return False
+    w = cast(CompoundWord, UP_w)
+    if len(w.parts) != 1:
+        return False
+
+    part0 = w.parts[0]
+    if part0.tag() != word_part_e.DoubleQuoted:
+        return False
+    dq = cast(DoubleQuoted, part0)
+    if len(dq.parts) != 1:
+        return False
+
+    inner = dq.parts[0]
+    if inner.tag() != word_part_e.SimpleVarSub:
+        return False
+    return cast(SimpleVarSub, inner).left.id == Id.VSub_At
+
+
 def ShFunctionName(w):
     # type: (CompoundWord) -> str
     """Returns a valid shell function name, or the empty string.
@@ -14,6 +14,7 @@ from _devbuild.gen.syntax_asdl import (
 )
 from mycpp.mylib import log
 from frontend import consts
+from frontend import lexer
 from osh import string_ops
 from mycpp.mylib import switch
 from data_lang import qsn_native  # IsWhitespace
@@ -28,7 +29,7 @@ def EvalCharLiteralForRegex(tok):
     Similar logic as below.
     """
     id_ = tok.id
-    value = tok.tval
+    value = lexer.TokenVal(tok)
 
     with switch(id_) as case:
         if case(Id.Char_UBraced):
@@ -50,8 +51,8 @@ def EvalCharLiteralForRegex(tok):
             # Id.Expr_Name: [a-z] is ['a'-'Z'], and [a z] is ['a' 'Z']
             # Id.Expr_DecInt: [0-9] is ['0'-'9'], and [0 9] is ['0' '9']
 
-            assert len(tok.tval) == 1, tok
-            return CharCode(ord(tok.tval[0]), False, tok)
+            assert len(lexer.TokenVal(tok)) == 1, tok
+            return CharCode(ord(lexer.TokenVal(tok)[0]), False, tok)
 
         else:
             raise AssertionError(tok)
@@ -67,7 +68,7 @@ def EvalCStringToken(tok):
     (TODO: will it be used by read --j8?)
     """
     id_ = tok.id
-    value = tok.tval
+    value = lexer.TokenVal(tok)
 
     if 0:
         log('tok %s', tok)
@@ -130,7 +131,7 @@ def EvalSingleQuoted(part):
             for t in part.tokens:
                 log('sq tok %s', t)
 
-        tmp = [t.tval for t in part.tokens]
+        tmp = [lexer.TokenVal(t) for t in part.tokens]
         s = ''.join(tmp)
 
     elif part.left.id in (Id.Left_DollarSingleQuote,
@@ -185,19 +186,19 @@ def RemoveLeadingSpaceDQ(parts):
     if UP_first.tag() == word_part_e.Literal:
         first = cast(Token, UP_first)
         #log('T %s', first_part)
-        if qsn_native.IsWhitespace(first.tval):
+        if qsn_native.IsWhitespace(lexer.TokenVal(first)):
             # Remove the first part.  TODO: This could be expensive if there are many
             # lines.
             parts.pop(0)
-        if first.tval.endswith('\n'):
+        if lexer.TokenVal(first).endswith('\n'):
             line_ended = True
 
     UP_last = parts[-1]
     to_strip = None  # type: Optional[str]
     if UP_last.tag() == word_part_e.Literal:
         last = cast(Token, UP_last)
-        if IsLeadingSpace(last.tval):
-            to_strip = last.tval
+        if IsLeadingSpace(lexer.TokenVal(last)):
+            to_strip = lexer.TokenVal(last)
             parts.pop()  # Remove the last part
 
     if to_strip is not None:
@@ -210,12 +211,12 @@ def RemoveLeadingSpaceDQ(parts):
             p = cast(Token, UP_p)
 
             if line_ended:
-                if p.tval.startswith(to_strip):
+                if lexer.TokenVal(p).startswith(to_strip):
                     # MUTATING the part here
-                    p.tval = p.tval[n:]
+                    p.tval = lexer.TokenVal(p)[n:]
 
             line_ended = False
-            if p.tval.endswith('\n'):
+            if lexer.TokenVal(p).endswith('\n'):
                 line_ended = True
                 #log('%s', p)
 
@@ -239,16 +240,16 @@ def RemoveLeadingSpaceSQ(tokens):
 
     first = tokens[0]
     if first.id in (Id.Lit_Chars, Id.Char_Literals):
-        if qsn_native.IsWhitespace(first.tval):
+        if qsn_native.IsWhitespace(lexer.TokenVal(first)):
             tokens.pop(0)  # Remove the first part
-        if first.tval.endswith('\n'):
+        if lexer.TokenVal(first).endswith('\n'):
             line_ended = True
 
     last = tokens[-1]
     to_strip = None  # type: Optional[str]
     if last.id in (Id.Lit_Chars, Id.Char_Literals):
-        if IsLeadingSpace(last.tval):
-            to_strip = last.tval
+        if IsLeadingSpace(lexer.TokenVal(last)):
+            to_strip = lexer.TokenVal(last)
             tokens.pop()  # Remove the last part
 
     if to_strip is not None:
@@ -259,11 +260,11 @@ def RemoveLeadingSpaceSQ(tokens):
                 continue
 
             if line_ended:
-                if tok.tval.startswith(to_strip):
+                if lexer.TokenVal(tok).startswith(to_strip):
                     # MUTATING the token here
-                    tok.tval = tok.tval[n:]
+                    tok.tval = lexer.TokenVal(tok)[n:]
 
             line_ended = False
-            if tok.tval.endswith('\n'):
+            if lexer.TokenVal(tok).endswith('\n'):
                 line_ended = True
                 #log('yes %r', tok.tval)
@@ -109,6 +109,9 @@ def DecayArray(val):
     if val.tag() == value_e.BashArray:
         array_val = cast(value.BashArray, val)
         s = array_val.strs[0] if len(array_val.strs) else None
+    elif val.tag() == value_e.SparseArray:
+        sparse_val = cast(value.SparseArray, val)
+        s = state.SparseArrayGet(sparse_val, 0)
     elif val.tag() == value_e.BashAssoc:
         assoc_val = cast(value.BashAssoc, val)
         s = assoc_val.d['0'] if '0' in assoc_val.d else None
@@ -219,6 +222,10 @@ def _ValueToPartValue(val, quoted, part_loc):
             val = cast(value.BashArray, UP_val)
             return part_value.Array(val.strs)
 
+        elif case(value_e.SparseArray):
+            val = cast(value.SparseArray, UP_val)
+            return part_value.Array(val.strs)
+
         elif case(value_e.BashAssoc):
             val = cast(value.BashAssoc, UP_val)
             # bash behavior: splice values!
@@ -390,6 +397,34 @@ def _PerformSlice(
 
             result = value.BashArray(strs)
 
+        elif case(value_e.SparseArray):
+            val = cast(value.SparseArray, UP_val)
+            if has_length and length < 0:
+                e_die(
+                    "The length index of a array slice can't be negative: %d" %
+                    length, loc.WordPart(part))
+
+            indices = val.indices
+            n = len(indices)
+            if begin < 0:
+                # Counts back from the last index, like ${a[-1]}
+                begin += (indices[n - 1] + 1) if n else 0
+            # Like the dense case, begin is an index, and length counts
+            # entries.  Binary search for the first entry.
+            lo = 0
+            hi = n
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if indices[mid] < begin:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if has_length and lo + length < n:
+                hi = lo + length
+            else:
+                hi = n
+            result = value.BashArray(val.strs[lo:hi])
+
         elif case(value_e.BashAssoc):
             e_die("Can't slice associative arrays", loc.WordPart(part))
 
@@ -617,6 +652,9 @@ class AbstractWordEvaluator(StringWordEvaluator):
             elif case(value_e.BashArray):
                 val = cast(value.BashArray, UP_val)
                 is_falsey = len(val.strs) == 0
+            elif case(value_e.SparseArray):
+                val = cast(value.SparseArray, UP_val)
+                is_falsey = len(val.strs) == 0
             elif case(value_e.BashAssoc):
                 val = cast(value.BashAssoc, UP_val)
                 is_falsey = len(val.d) == 0
@@ -737,6 +775,10 @@ class AbstractWordEvaluator(StringWordEvaluator):
                     if s is not None:
                         length += 1
 
+            elif case(value_e.SparseArray):
+                val = cast(value.SparseArray, UP_val)
+                length = len(val.strs)
+
             elif case(value_e.BashAssoc):
                 val = cast(value.BashAssoc, UP_val)
                 length = len(val.d)
@@ -763,6 +805,11 @@ class AbstractWordEvaluator(StringWordEvaluator):
                         indices.append(str(i))
                 return value.BashArray(indices)
 
+            elif case(value_e.SparseArray):
+                val = cast(value.SparseArray, UP_val)
+                indices = [str(i) for i in val.indices]
+                return value.BashArray(indices)
+
             elif case(value_e.BashAssoc):
                 val = cast(value.BashAssoc, UP_val)
                 assert val.d is not None  # for MyPy, so it's not Optional[]
@@ -791,7 +838,8 @@ class AbstractWordEvaluator(StringWordEvaluator):
                 return self._VarRefValue(bvs_part, quoted, vsub_state,
                                          vtest_place)
 
-            elif case(value_e.BashArray):  # caught earlier but OK
+            elif case(value_e.BashArray,
+                      value_e.SparseArray):  # caught earlier but OK
                 e_die('Indirect expansion of array')
 
             elif case(value_e.BashAssoc):  # caught earlier but OK
@@ -833,6 +881,15 @@ class AbstractWordEvaluator(StringWordEvaluator):
                                     s, op.op, arg_val.s, has_extglob))
                     new_val = value.BashArray(strs)
 
+                elif case(value_e.SparseArray):
+                    val = cast(value.SparseArray, UP_val)
+                    strs = []
+                    for s in val.strs:
+                        strs.append(
+                            string_ops.DoUnarySuffixOp(s, op.op, arg_val.s,
+                                                       has_extglob))
+                    new_val = value.BashArray(strs)
+
                 elif case(value_e.BashAssoc):
                     val = cast(value.BashAssoc, UP_val)
                     strs = []
@@ -894,6 +951,13 @@ class AbstractWordEvaluator(StringWordEvaluator):
                         strs.append(replacer.Replace(s, op))
                 val = value.BashArray(strs)
 
+            elif case2(value_e.SparseArray):
+                sparse_val = cast(value.SparseArray, val)
+                strs = []
+                for s in sparse_val.strs:
+                    strs.append(replacer.Replace(s, op))
+                val = value.BashArray(strs)
+
             elif case2(value_e.BashAssoc):
                 assoc_val = cast(value.BashAssoc, val)
                 strs = []
@@ -937,7 +1001,7 @@ class AbstractWordEvaluator(StringWordEvaluator):
                 with tagswitch(val) as case2:
                     if case2(value_e.Str):
                         val = value.Str('')
-                    elif case2(value_e.BashArray):
+                    elif case2(value_e.BashArray, value_e.SparseArray):
                         val = value.BashArray([])
                     else:
                         raise NotImplementedError()
@@ -972,6 +1036,10 @@ class AbstractWordEvaluator(StringWordEvaluator):
                     array_val = cast(value.BashArray, UP_val)
                     tmp = [qsn.maybe_shell_encode(s) for s in array_val.strs]
                     result = value.Str(' '.join(tmp))
+                elif case(value_e.SparseArray):
+                    sparse_val = cast(value.SparseArray, UP_val)
+                    tmp = [qsn.maybe_shell_encode(s) for s in sparse_val.strs]
+                    result = value.Str(' '.join(tmp))
                 else:
                     e_die("Can't use @Q on %s" %
                           ui.ValType(val))  # TODO: location
@@ -981,7 +1049,7 @@ class AbstractWordEvaluator(StringWordEvaluator):
             # spec/ble-idioms.test.sh.
             chars = []  # type: List[str]
             with tagswitch(val) as case:
-                if case(value_e.BashArray):
+                if case(value_e.BashArray, value_e.SparseArray):
                     chars.append('a')
                 elif case(value_e.BashAssoc):
                     chars.append('A')
@@ -1069,6 +1137,18 @@ class AbstractWordEvaluator(StringWordEvaluator):
                 else:
                     val = value.Str(s)
 
+            elif case2(value_e.SparseArray):
+                sparse_val = cast(value.SparseArray, UP_val)
+                index = self.arith_ev.EvalToInt(anode)
+                vtest_place.index = a_index.Int(index)
+
+                s = state.SparseArrayGet(sparse_val, index)
+
+                if s is None:
+                    val = value.Undef
+                else:
+                    val = value.Str(s)
+
             elif case2(value_e.BashAssoc):
                 assoc_val = cast(value.BashAssoc, UP_val)
                 key = self.arith_ev.EvalWordToString(anode)
@@ -1169,7 +1249,8 @@ class AbstractWordEvaluator(StringWordEvaluator):
         else:  # no bracket op
             var_name = vtest_place.name
             if (var_name is not None and
-                    val.tag() in (value_e.BashArray, value_e.BashAssoc) and
+                    val.tag() in (value_e.BashArray, value_e.SparseArray,
+                                  value_e.BashAssoc) and
                     not vsub_state.is_type_query):
                 if ShouldArrayDecay(var_name, self.exec_opts,
                                     not (part.prefix_op or part.suffix_op)):
@@ -1394,6 +1475,9 @@ class AbstractWordEvaluator(StringWordEvaluator):
                     raise AssertionError()
 
         # After applying suffixes, process join_array here.
+        if val.tag() == value_e.SparseArray:
+            # Only the values are left to use, in order
+            val = value.BashArray(cast(value.SparseArray, val).strs)
         UP_val = val
         if val.tag() == value_e.BashArray:
             array_val = cast(value.BashArray, UP_val)
@@ -1461,7 +1545,8 @@ class AbstractWordEvaluator(StringWordEvaluator):
         if token.id == Id.VSub_DollarName:
             # TODO: Special case for LINENO
             val = self.mem.GetValue(var_name)
-            if val.tag() in (value_e.BashArray, value_e.BashAssoc):
+            if val.tag() in (value_e.BashArray, value_e.SparseArray,
+                             value_e.BashAssoc):
                 if ShouldArrayDecay(var_name, self.exec_opts):
                     # for $BASH_SOURCE, etc.
                     val = DecayArray(val)
@@ -1587,7 +1672,7 @@ class AbstractWordEvaluator(StringWordEvaluator):
                 part = cast(Token, UP_part)
                 # Split if it's in a substitution.
                 # That is: echo is not split, but ${foo:-echo} is split
-                v = part_value.String(part.tval, quoted, is_subst)
+                v = part_value.String(lexer.TokenVal(part), quoted, is_subst)
                 part_vals.append(v)
 
             elif case(word_part_e.EscapedLiteral):
@@ -638,7 +638,7 @@ class WordParser(WordEmitter):
                 tok = self.cur_token
                 # Happens in lex_mode_e.SQ: 'one\two' is ambiguous, should be
                 # r'one\two' or c'one\\two'
-                if no_backslashes and '\\' in tok.tval:
+                if no_backslashes and '\\' in lexer.TokenVal(tok):
                     p_die(
                         r"Strings with backslashes should look like r'\n' or $'\n'",
                         tok)
@@ -998,7 +998,8 @@ class WordParser(WordEmitter):
                 #log("TOK %s", self.cur_token)
 
                 if self.token_type == Id.Backtick_Quoted:
-                    parts.append(self.cur_token.tval[1:])  # Remove leading \
+                    # Remove leading \
+                    parts.append(lexer.TokenSliceLeft(self.cur_token, 1))
 
                 elif self.token_type == Id.Backtick_DoubleQuote:
                     # Compatibility: If backticks are double quoted, then double quotes
@@ -1006,13 +1007,13 @@ class WordParser(WordEmitter):
                     # Shells aren't smart enough to match nested " and ` quotes (but OSH
                     # is)
                     if d_quoted:
-                        parts.append(
-                            self.cur_token.tval[1:])  # Remove leading \
+                        # Remove leading \
+                        parts.append(lexer.TokenSliceLeft(self.cur_token, 1))
                     else:
-                        parts.append(self.cur_token.tval)
+                        parts.append(lexer.TokenVal(self.cur_token))
 
                 elif self.token_type == Id.Backtick_Other:
-                    parts.append(self.cur_token.tval)
+                    parts.append(lexer.TokenVal(self.cur_token))
 
                 elif self.token_type == Id.Backtick_Right:
                     break
@@ -1855,7 +1856,7 @@ class WordParser(WordEmitter):
                 # parse_raw_string: Is there an r'' at the beginning of a word?
                 if (self.parse_opts.parse_raw_string() and
                         self.token_type == Id.Lit_Chars and
-                        self.cur_token.tval == 'r'):
+                        lexer.TokenVal(self.cur_token) == 'r'):
                     if (self.lexer.LookAheadOne(
                             lex_mode_e.ShCommand) == Id.Left_SingleQuote):
                         self._SetNext(lex_mode_e.ShCommand)
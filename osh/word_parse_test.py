@@ -175,11 +175,11 @@ class WordParserTest(unittest.TestCase):
 
     def testDisambiguatePrefix(self):
         w = _assertReadWord(self, '${#}')
-        self.assertEqual('#', _GetVarSub(self, w).token.tval)
+        self.assertEqual('#', lexer.TokenVal(_GetVarSub(self, w).token))
         w = _assertReadWord(self, '${!}')
-        self.assertEqual('!', _GetVarSub(self, w).token.tval)
+        self.assertEqual('!', lexer.TokenVal(_GetVarSub(self, w).token))
         w = _assertReadWord(self, '${?}')
-        self.assertEqual('?', _GetVarSub(self, w).token.tval)
+        self.assertEqual('?', lexer.TokenVal(_GetVarSub(self, w).token))
 
         w = _assertReadWord(self, '${var}')
 
@@ -192,7 +192,7 @@ class WordParserTest(unittest.TestCase):
 
         # Length of length
         w = _assertReadWord(self, '${##}')
-        self.assertEqual('#', _GetVarSub(self, w).token.tval)
+        self.assertEqual('#', lexer.TokenVal(_GetVarSub(self, w).token))
         self.assertEqual(Id.VSub_Pound, _GetPrefixOp(self, w))
 
         w = _assertReadWord(self, '${array[0]}')
@@ -442,7 +442,7 @@ class WordParserTest(unittest.TestCase):
         w_parser = test_lib.InitWordParser(code)
         w = w_parser.ReadWord(lex_mode_e.ShCommand)
         assert w
-        self.assertEqual('foo', w.parts[0].tval)
+        self.assertEqual('foo', lexer.TokenVal(w.parts[0]))
 
         w = w_parser.ReadWord(lex_mode_e.ShCommand)
         assert w
@@ -450,7 +450,7 @@ class WordParserTest(unittest.TestCase):
 
         w = w_parser.ReadWord(lex_mode_e.ShCommand)
         assert w
-        self.assertEqual('bar', w.parts[0].tval)
+        self.assertEqual('bar', lexer.TokenVal(w.parts[0]))
 
         w = w_parser.ReadWord(lex_mode_e.ShCommand)
         assert w
@@ -468,11 +468,11 @@ class WordParserTest(unittest.TestCase):
 
         w = w_parser.ReadWord(lex_mode_e.BashRegex)
         assert w
-        self.assertEqual('(', w.parts[0].tval)
-        self.assertEqual('foo', w.parts[1].tval)
-        self.assertEqual('|', w.parts[2].tval)
-        self.assertEqual('bar', w.parts[3].tval)
-        self.assertEqual(')', w.parts[4].tval)
+        self.assertEqual('(', lexer.TokenVal(w.parts[0]))
+        self.assertEqual('foo', lexer.TokenVal(w.parts[1]))
+        self.assertEqual('|', lexer.TokenVal(w.parts[2]))
+        self.assertEqual('bar', lexer.TokenVal(w.parts[3]))
+        self.assertEqual(')', lexer.TokenVal(w.parts[4]))
         self.assertEqual(5, len(w.parts))
 
         w = w_parser.ReadWord(lex_mode_e.ShCommand)
@@ -541,7 +541,7 @@ ls bar
             self.assertEqual(1, len(w.parts))
             part = w.parts[0]
             self.assertEqual(id_, part.id)
-            self.assertEqual(val, part.tval)
+            self.assertEqual(val, lexer.TokenVal(part))
 
         print('--MULTI')
         w = w_parser.ReadWord(lex_mode_e.ShCommand)
@@ -576,16 +576,16 @@ ls bar
 
         w_parser = test_lib.InitWordParser(words)
         w = w_parser.ReadWord(lex_mode_e.ShCommand)
-        self.assertEqual('z', w.parts[0].tval)
+        self.assertEqual('z', lexer.TokenVal(w.parts[0]))
 
         w = w_parser.ReadWord(lex_mode_e.ShCommand)
-        self.assertEqual('\xce\xbb', w.parts[0].tval)
+        self.assertEqual('\xce\xbb', lexer.TokenVal(w.parts[0]))
 
         w = w_parser.ReadWord(lex_mode_e.ShCommand)
-        self.assertEqual('\xe4\xb8\x89', w.parts[0].tval)
+        self.assertEqual('\xe4\xb8\x89', lexer.TokenVal(w.parts[0]))
 
         w = w_parser.ReadWord(lex_mode_e.ShCommand)
-        self.assertEqual('\xf0\x9f\x98\x98', w.parts[0].tval)
+        self.assertEqual('\xf0\x9f\x98\x98', lexer.TokenVal(w.parts[0]))
 
     def testParseErrorLocation(self):
         w = _assertSpanForWord(self, 'a=(1 2 3)')
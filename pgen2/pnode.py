@@ -54,14 +54,26 @@ class PNode(object):
 
 
 class PNodeAllocator(object):
+  """Hands out PNodes for one ParseContext.
+
+  In C++ the nodes live in blocks that are reused: Reset(mark) frees every
+  node allocated since Mark().  Python relies on the GC, so we only count.
+  """
+
   def __init__(self):
     # type: () -> None
-    return
+    self.num_used = 0
 
   def NewPNode(self, typ, tok):
     # type: (int, Optional[Token]) -> PNode
+    self.num_used += 1
     return PNode(typ, tok, [])
 
-  def Clear(self):
-    # type: () -> None
-    return
+  def Mark(self):
+    # type: () -> int
+    return self.num_used
+
+  def Reset(self, mark):
+    # type: (int) -> None
+    assert 0 <= mark <= self.num_used, mark
+    self.num_used = mark
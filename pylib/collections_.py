@@ -134,6 +134,12 @@ class OrderedDict(dict):
         for k, v in other.iteritems():
             self[k] = v
 
+    # Oils patch: __init__() doesn't take items, so pickle sets them one at a
+    # time.  Used by --save-image.
+    def __reduce__(self):
+        'Return state information for pickling'
+        return self.__class__, (), None, None, self.iteritems()
+
     __marker = object()
 
     def pop(self, key, default=__marker):
@@ -625,3 +625,40 @@ three
 two
 two
 ## END
+
+#### Sparse array with a big index
+a[1000000]=x
+a[5]=five
+a+=(y)
+argv.py "${#a[@]}" "${!a[@]}" "${a[@]}"
+argv.py "${a[-1]}" "${a[1000000]}" "${a[7]-unset}" "${a[@]:6}" "${a[@]:0:2}"
+unset 'a[5]'
+argv.py "${!a[@]}" "${a[@]/y/Y}"
+## STDOUT:
+['3', '5', '1000000', '1000001', 'five', 'x', 'y']
+['y', 'x', 'unset', 'x', 'y', 'five', 'x']
+['1000000', '1000001', 'x', 'Y']
+## END
+## N-I dash status: 2
+## N-I dash stdout-json: ""
+
+#### Sparse array looks like any other array
+e[100]=x
+unset 'e[100]'
+e+=(n)
+declare -p e
+
+f=(a)
+f[100]=b
+unset 'f[100]'
+declare -p f
+## STDOUT:
+declare -a e=(n)
+declare -a f=(a)
+## END
+## OK bash STDOUT:
+declare -a e=([0]="n")
+declare -a f=([0]="a")
+## END
+## N-I dash status: 2
+## N-I dash stdout-json: ""
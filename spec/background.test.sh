@@ -180,3 +180,69 @@ cat tmp.txt | wc -w  # each line is a single "word"
 2
 2
 ## END
+
+#### wait with shopt -s event_wait
+case $SH in (dash|mksh|zsh) exit ;; esac
+case $SH in (*osh) shopt -s event_wait ;; esac
+
+sleep 0.2 & p1=$!
+{ sleep 0.1; exit 3; } &
+wait -n
+echo wait-n=$?
+
+wait $p1
+echo p1=$?
+
+for i in 1 2 3 4 5; do (exit $i) & done
+wait
+echo all=$?
+
+trap 'echo usr1' USR1
+{ sleep 0.1; kill -USR1 $$; } &
+sleep 1 &
+wait $!
+echo interrupted=$?
+
+## STDOUT:
+wait-n=3
+p1=0
+all=0
+usr1
+interrupted=138
+## END
+## N-I dash/mksh/zsh stdout-json: ""
+
+#### wait with shopt -s event_wait isn't interrupted by a CHLD trap
+case $SH in (dash|mksh|zsh) exit ;; esac
+case $SH in (*osh) shopt -s event_wait ;; esac
+
+trap 'echo chld' CHLD
+sleep 0.1 &
+wait
+echo wait=$?
+
+## STDOUT:
+chld
+wait=0
+## END
+## N-I dash/mksh/zsh stdout-json: ""
+
+#### wait with shopt -s event_wait is interrupted by a signal that comes with CHLD
+case $SH in (dash|mksh|zsh) exit ;; esac
+case $SH in (*osh) shopt -s event_wait ;; esac
+
+trap 'echo usr1' USR1
+trap ': chld' CHLD
+sleep 1 & pid=$!
+
+# While the shell is stopped, USR1 and CHLD are both pending.  They're
+# delivered together on CONT, with CHLD last.
+{ sleep 0.1; kill -STOP $$; kill -USR1 $$; kill -CHLD $$; kill -CONT $$; } &
+wait $pid
+echo wait=$?
+
+## STDOUT:
+usr1
+wait=138
+## END
+## N-I dash/mksh/zsh stdout-json: ""
@@ -578,6 +578,19 @@ echo $?
 ## END
 ## N-I dash stdout-json: ""
 
+#### read -t times out
+case $SH in (dash|zsh|mksh) exit ;; esac
+
+sleep 1 | { read -t 0.1; echo status=$?; }
+
+echo hi | { read -t 1; echo status=$? reply=$REPLY; }
+
+## STDOUT:
+status=142
+status=0 reply=hi
+## END
+## N-I dash/zsh/mksh stdout-json: ""
+
 #### read -t -0.5 is invalid
 # bash appears to just take the absolute value?
 
@@ -470,4 +470,69 @@ done
 2 a
 ## END
 
- 
+#### break and continue in && and || chains
+for i in 1 2 3 4; do
+  test $i = 2 && continue
+  test $i = 4 || echo i=$i
+  test $i = 3 && break && echo no
+  echo bottom
+done
+echo done
+## STDOUT:
+i=1
+bottom
+i=3
+done
+## END
+
+#### return from nested loops in a function
+f() {
+  for i in 1 2 3; do
+    while true; do
+      if test $i = 2; then
+        return 42
+      fi
+      echo i=$i
+      break
+    done
+  done
+  echo no
+}
+f
+echo status=$?
+## STDOUT:
+i=1
+status=42
+## END
+
+#### for loop over a brace range
+for i in {08..12..2}; do echo -n "$i "; done; echo
+for i in {3..1}; do echo -n "$i "; done; echo
+for c in {a..g..3}; do echo -n "$c "; done; echo
+for i in {5..5}; do echo -n "$i "; done; echo
+## STDOUT:
+08 10 12 
+3 2 1 
+a d g 
+5 
+## END
+
+#### for loop over "$@" isn't affected by shift and set --
+set -- a b c
+for x in "$@"; do
+  shift
+  echo "$x $#"
+done
+set -- a b c
+for x; do
+  set -- z
+  echo "$x $@"
+done
+## STDOUT:
+a 2
+b 1
+c 0
+a z
+b z
+c z
+## END
@@ -195,3 +195,25 @@ ls /dev/null | eval 'cat | cat' | wc -l
 ## STDOUT:
 1
 ## END
+
+#### printf with large output gets SIGPIPE
+set -o pipefail
+a=( $(seq 20000) )
+printf '%s\n' "${a[@]}" | head -1
+echo ${PIPESTATUS[@]}
+## STDOUT:
+1
+141 0
+## END
+## BUG bash STDOUT:
+1
+1 0
+## END
+## N-I dash/zsh status: 2
+## N-I dash/zsh stdout-json: ""
+
+#### echo $BASHPID in a pipeline runs in a child
+echo $BASHPID | { read pid; test "$pid" != "$$" && echo child; }
+## STDOUT:
+child
+## END
@@ -92,3 +92,34 @@ $SH --login -c 'exit 0'
 ## OK dash status: 2
 ## OK mksh status: 1
 
+
+#### --tool syntax-tree shows token values, but not for operators
+$SH --tool syntax-tree --ast-format text -c \
+  'echo hi; case x in (y) echo ${z:-w} $((1+2)) ;; esac' |
+  awk '/ id: / { id = $2 } / tval: / { print id, $2 }'
+## STDOUT:
+Id.Lit_Chars echo
+Id.Lit_Chars echo
+Id.Lit_Chars hi
+Id.Op_Semi _
+Id.KW_Case case
+Id.Lit_Chars x
+Id.KW_In in
+Id.Op_LParen _
+Id.Lit_Chars y
+Id.Right_CasePat _
+Id.Lit_Chars echo
+Id.Lit_Chars echo
+Id.Left_DollarBrace '${'
+Id.VSub_Name z
+Id.VTest_ColonHyphen _
+Id.Lit_Chars w
+Id.Right_DollarBrace '}'
+Id.Left_DollarDParen '$(('
+Id.Lit_Digits 1
+Id.Lit_Digits 2
+Id.Right_DollarDParen _
+Id.Op_DSemi _
+Id.KW_Esac esac
+## END
+## N-I bash/dash/mksh/zsh stdout-json: ""
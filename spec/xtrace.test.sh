@@ -342,3 +342,89 @@ ok
 [last=0] false
 [last=1] echo ok
 ## END
+
+#### OILS_PROFILE attributes commands to lines and procs
+case $SH in bash|dash|mksh|zsh) exit ;; esac
+
+cat >prof.sh <<'EOF'
+f() {
+  true
+  true
+}
+g() {
+  f
+  /bin/true
+}
+g
+g
+x=$(echo hi)
+EOF
+OILS_PROFILE=prof.txt $SH prof.sh
+
+# count, forks, execs, cmd_sub_bytes, and where.  Times vary.
+awk 'NF == 7 && $7 != "?" && $1 ~ /^[0-9]+$/ { print $3, $4, $5, $6, $7 }' \
+  prof.txt | sort -k 5
+echo ---
+# Collapsed stacks, without times
+awk '$1 !~ /;\?$/ { print $1 }' prof.txt.folded | sort
+## STDOUT:
+4 0 0 0 f
+8 2 2 0 g
+11 3 2 3 main
+1 0 0 0 prof.sh:10
+1 1 0 3 prof.sh:11
+2 0 0 0 prof.sh:2
+2 0 0 0 prof.sh:3
+2 0 0 0 prof.sh:6
+2 2 2 0 prof.sh:7
+1 0 0 0 prof.sh:9
+---
+main;g;f;prof.sh:2
+main;g;f;prof.sh:3
+main;g;f;prof.sh:6
+main;g;prof.sh:10
+main;g;prof.sh:6
+main;g;prof.sh:7
+main;g;prof.sh:9
+main;prof.sh:10
+main;prof.sh:11
+main;prof.sh:9
+## END
+## N-I bash/dash/mksh/zsh STDOUT:
+## END
+
+#### OILS_TRACE_DIR writes events for each process
+case $SH in bash|dash|mksh|zsh) exit ;; esac
+
+cat >trace.sh <<'EOF'
+f() {
+  /bin/true
+}
+f
+( exit 3 )
+x=$(echo hi)
+EOF
+rm -r -f trace
+mkdir trace
+OILS_TRACE_DIR=trace $SH trace.sh
+
+# PIDs and times vary, so show the events of each process
+for file in trace/*.jsonl; do
+  echo $(sed -n 's/.*"ev": "\([a-z_]*\)".*/\1/p' $file)
+done | sort
+echo ---
+grep -h -o '"why": .*\|"ev": "exec".*\|"ev": "exit".*' trace/*.jsonl | sort
+## STDOUT:
+start
+start cmd cmd_end
+start cmd push cmd fork wait cmd_end pop cmd_end fork wait fork wait exit
+start exec
+---
+"ev": "exec", "argv": ["/bin/true"]}
+"ev": "exit", "status": 0}
+"why": "command sub"}
+"why": "command", "argv": ["/bin/true"]}
+"why": "forkwait"}
+## END
+## N-I bash/dash/mksh/zsh STDOUT:
+## END
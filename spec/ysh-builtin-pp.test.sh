@@ -26,6 +26,15 @@ pp cell array
 array = (Cell exported:F readonly:F nameref:F val:(value.BashArray strs:[_ _ _ 42]))
 ## END
 
+#### pp cell on a sparse indexed array
+a=(x)
+a[1000]=y
+a[1002]=z
+pp cell a
+## STDOUT:
+a = (Cell exported:F readonly:F nameref:F val:(value.BashArray strs:[x _x999 y _ z]))
+## END
+
 
 #### pp proc
 shopt --set oil:upgrade
@@ -1,4 +1,4 @@
-# fork and forkwait
+# fork, forkwait, and par
 
 #### fork and forkwait usage  errors
 shopt --set oil:upgrade
@@ -83,3 +83,55 @@ hi
 status=42
 ok
 ## END
+
+#### par runs a command on each item
+shopt --set ysh:upgrade
+
+proc show(x) {
+  echo "item $x"
+}
+
+par -j 2 -k show a b c
+echo status=$?
+## STDOUT:
+item a
+item b
+item c
+status=0
+## END
+
+#### par fails fast, or keeps going
+shopt --unset errexit
+
+f() {
+  echo $1
+  return $1
+}
+
+par -j 1 f 0 3 0
+echo status=$?
+
+par -j 1 --keep-going -k f 0 4 0
+echo status=$?
+## STDOUT:
+0
+3
+status=3
+0
+4
+0
+status=4
+## END
+
+#### par usage errors
+shopt --unset errexit
+
+par
+echo status=$?
+
+par -j 0 echo a
+echo status=$?
+## STDOUT:
+status=2
+status=2
+## END
@@ -111,6 +111,14 @@ json write (dict(foo))
 }
 ## END
 
+#### type() of a sparse array is BashArray
+declare -a a=(x)
+a[1000]=y
+echo "$[type(a)]"
+## STDOUT:
+BashArray
+## END
+
 #### dict() does shallow copy
 var d = {'a': 1}
 var d2 = d
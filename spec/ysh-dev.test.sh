@@ -84,3 +84,24 @@ status=1
 ## END
 
 
+#### OILS_STARTUP_TRACE shows startup phases
+
+OILS_STARTUP_TRACE=1 $SH -c 'echo hi' 2>startup.txt
+echo status=$?
+
+# Every line is a phase, and the script runs after the last one
+grep -c '^\[startup\]' startup.txt
+grep -o 'us  [a-z_]*$' startup.txt | tail -n 1
+
+$SH -c 'echo hi' 2>startup.txt
+wc -c < startup.txt
+
+## STDOUT:
+hi
+status=0
+8
+us  ready
+hi
+0
+## END
+
@@ -136,6 +136,34 @@ proc t() { return (0) }
 ## STDOUT:
 ## END
 
+#### Typed return from inside loops and blocks
+func first(L) {
+  for x in (L) {
+    while (true) {
+      if (x > 1) {
+        return (x)
+      }
+      break
+    }
+  }
+  return (-1)
+}
+echo $[first([1, 5, 7])]
+echo $[first([0, 1])]
+
+func inBlock() {
+  cd / {
+    return ('block')
+  }
+  return ('after')
+}
+echo $[inBlock()]
+## STDOUT:
+5
+-1
+block
+## END
+
 #### Redefining functions is not allowed (with shopt -u redefine_proc_func)
 shopt -u redefine_proc_func
 func f() { return (0) }
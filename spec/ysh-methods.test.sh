@@ -118,3 +118,21 @@ write @x
 0
 ## END
 
+
+#### One call site with receivers of different types
+var objs = [{'k': 1}, 'kv', ['a'], {'x': 2, 'y': 3}]
+for o in (objs) {
+  try {
+    var n = len(o->keys())
+    echo "keys $n"
+  }
+  if (_status !== 0) {
+    echo "status $_status"
+  }
+}
+## STDOUT:
+keys 1
+status 3
+status 3
+keys 2
+## END
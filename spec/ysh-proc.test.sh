@@ -344,3 +344,38 @@ loop
 brace
 ## END
 
+
+#### Save and load a heap image with procs that have params
+
+cat >lib.ysh <<'EOF'
+shopt --set oil:upgrade
+proc p(x, y='y'; n=3) {
+  echo "$x $y $n"
+}
+var g = 42
+EOF
+$SH --save-image lib.img lib.ysh
+echo save=$?
+
+cat >main.ysh <<'EOF'
+shopt --set oil:upgrade
+p a
+p a b (4)
+echo g=$g
+EOF
+$SH --load-image lib.img main.ysh
+
+# The image isn't written when the program fails
+echo 'proc q(' > bad.ysh
+rm -f bad.img
+$SH --save-image bad.img bad.ysh 2>/dev/null || echo save=$?
+test -f bad.img || echo 'no bad.img'
+
+## STDOUT:
+save=0
+a y 3
+a b 4
+g=42
+save=2
+no bad.img
+## END
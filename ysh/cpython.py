@@ -153,6 +153,11 @@ def _ValueToPyObj(val):
             val = cast(value.BashArray, UP_val)
             return val.strs
 
+        elif case(value_e.SparseArray):
+            val = cast(value.SparseArray, UP_val)
+            # Index/value pairs, rather than a list with every hole
+            return dict(zip(val.indices, val.strs))
+
         elif case(value_e.List):
             val = cast(value.List, UP_val)
             return list(map(_ValueToPyObj, val.items))
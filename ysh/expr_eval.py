@@ -24,6 +24,7 @@ from _devbuild.gen.syntax_asdl import (
     y_lhs_e,
     y_lhs_t,
     Attribute,
+    ArgList,
     Subscript,
     class_literal_term,
     class_literal_term_e,
@@ -54,13 +55,16 @@ from core import error
 from core.error import e_die, e_die_status
 from core import state
 from core import ui
+from core import util
 from core import vm
 from frontend import consts
+from frontend import lexer
 from frontend import match
 from frontend import location
 from frontend import typed_args
 from osh import braces
 from osh import word_compile
+from mycpp import mylib
 from mycpp.mylib import log, NewDict, switch, tagswitch
 from ysh import func_proc
 from ysh import val_ops
@@ -156,6 +160,17 @@ def _ConvertForBinaryOp(left, right):
         return coerced_e.Neither, -1, -1, -1.0, -1.0
 
 
+class _MethodCacheEntry(object):
+    """The method that one obj->name call site found last time."""
+
+    def __init__(self, attr, ty, method):
+        # type: (Token, int, vm._Callable) -> None
+        self.attr = attr
+        self.ty = ty
+        self.method = method
+        self.lru_key = str(attr.span_id)  # so a hit doesn't allocate
+
+
 class ExprEvaluator(object):
     """Shared between arith and bool evaluators.
 
@@ -181,6 +196,10 @@ class ExprEvaluator(object):
         self.mem = mem
         self.mutable_opts = mutable_opts
         self.methods = methods
+        # Inline cache for obj->name, keyed by the span ID of the name token.
+        # It's bounded, since each eval or source adds new call sites.
+        self.method_cache = {}  # type: Dict[int, _MethodCacheEntry]
+        self.method_lru = util.LruIndex('method', 256)
         self.splitter = splitter
         self.errfmt = errfmt
 
@@ -268,7 +287,7 @@ class ExprEvaluator(object):
             if case(y_lhs_e.Var):
                 lhs = cast(y_lhs.Var, UP_lhs)
 
-                return location.LName(lhs.name.tval)
+                return location.LName(lexer.TokenVal(lhs.name))
 
             elif case(y_lhs_e.Subscript):
                 lhs = cast(Subscript, UP_lhs)
@@ -287,7 +306,7 @@ class ExprEvaluator(object):
                 # setvar mydict.key = 42
                 lval = self._EvalExpr(lhs.obj)
 
-                attr = value.Str(lhs.attr.tval)
+                attr = value.Str(lexer.TokenVal(lhs.attr))
                 return y_lvalue.Container(lval, attr)
 
             else:
@@ -338,7 +357,7 @@ class ExprEvaluator(object):
 
         # Remove underscores from 1_000_000.  The lexer is responsible for
         # validation.  TODO: Do this at PARSE TIME / COMPILE TIME.
-        c_under = node.c.tval.replace('_', '')
+        c_under = lexer.TokenVal(node.c).replace('_', '')
 
         id_ = node.c.id
         if id_ == Id.Expr_DecInt:
@@ -364,18 +383,19 @@ class ExprEvaluator(object):
         if id_ == Id.Expr_Name:
             # for {name: 'bob'}
             # Maybe also :Symbol?
-            return value.Str(node.c.tval)
+            return value.Str(lexer.TokenVal(node.c))
 
         # These calculations could also be done at COMPILE TIME
         if id_ == Id.Char_OneChar:
             # TODO: look up integer directly?
-            return value.Int(ord(consts.LookupCharC(node.c.tval[1])))
+            return value.Int(
+                ord(consts.LookupCharC(lexer.TokenVal(node.c)[1])))
         if id_ == Id.Char_UBraced:
-            s = node.c.tval[3:-1]  # \u{123}
+            s = lexer.TokenVal(node.c)[3:-1]  # \u{123}
             return value.Int(int(s, 16))
         if id_ == Id.Char_Pound:
             # TODO: accept UTF-8 code point instead of single byte
-            byte = node.c.tval[2]  # the a in #'a'
+            byte = lexer.TokenVal(node.c)[2]  # the a in #'a'
             return value.Int(ord(byte))  # It's an integer
 
         # NOTE: We could allow Ellipsis for a[:, ...] here, but we're not using it
@@ -738,9 +758,59 @@ class ExprEvaluator(object):
 
         return value.Bool(result)
 
+    def _LookupMethod(self, o, attr):
+        # type: (value_t, Token) -> vm._Callable
+        """Find the method for obj->name.
+
+        Each call site remembers the method it found for the last type of
+        object, so a loop doesn't look it up by name every time.
+        """
+        ty = o.tag()
+
+        entry = self.method_cache.get(attr.span_id)
+        if entry and entry.attr is attr and entry.ty == ty:
+            self.method_lru.Hit(entry.lru_key)
+            return entry.method
+        self.method_lru.Miss()
+
+        name = lexer.TokenVal(attr)
+        recv = self.methods.get(ty)
+        method = recv.get(name) if recv is not None else None
+        if not method:
+            raise error.TypeErrVerbose(
+                'Method %r does not exist on type %s' % (name, ui.ValType(o)),
+                attr)
+
+        if entry and entry.attr is attr:  # the type changed
+            entry.ty = ty
+            entry.method = method
+            self.method_lru.Hit(entry.lru_key)
+        else:
+            entry = _MethodCacheEntry(attr, ty, method)
+            self.method_cache[attr.span_id] = entry
+            evicted = self.method_lru.Add(entry.lru_key)
+            if evicted is not None:
+                mylib.dict_erase(self.method_cache, int(evicted))
+        return method
+
+    def _EvalMethodCall(self, node, args):
+        # type: (Attribute, ArgList) -> value_t
+        """obj->name(args) without allocating a value.BuiltinMethod."""
+        o = self._EvalExpr(node.obj)
+        f = self._LookupMethod(o, node.attr)
+
+        pos_args, named_args = func_proc._EvalArgList(self, args, me=o)
+        rd = typed_args.Reader(pos_args, named_args, args, is_bound=True)
+        return f.Call(rd)
+
     def _EvalFuncCall(self, node):
         # type: (expr.FuncCall) -> value_t
 
+        if node.func.tag() == expr_e.Attribute:
+            attr = cast(Attribute, node.func)
+            if attr.op.id == Id.Expr_RArrow:
+                return self._EvalMethodCall(attr, node.args)
+
         func = self._EvalExpr(node.func)
         UP_func = func
 
@@ -868,20 +938,11 @@ class ExprEvaluator(object):
 
         with switch(node.op.id) as case:
             if case(Id.Expr_RArrow):
-                name = node.attr.tval
-                ty = o.tag()
-
-                recv = self.methods.get(ty)
-                method = recv.get(name) if recv is not None else None
-                if not method:
-                    raise error.TypeErrVerbose(
-                        'Method %r does not exist on type %s' %
-                        (name, ui.ValType(o)), node.attr)
-
+                method = self._LookupMethod(o, node.attr)
                 return value.BuiltinMethod(o, method)
 
             elif case(Id.Expr_Dot):  # d.key is like d['key']
-                name = node.attr.tval
+                name = lexer.TokenVal(node.attr)
                 with tagswitch(o) as case2:
                     if case2(value_e.Dict):
                         o = cast(value.Dict, UP_o)
@@ -915,7 +976,8 @@ class ExprEvaluator(object):
 
             elif case(expr_e.Var):
                 node = cast(expr.Var, UP_node)
-                return self._LookupVar(node.name.tval, node.name)
+                return self._LookupVar(lexer.TokenVal(node.name),
+                                       node.name)
 
             elif case(expr_e.CommandSub):
                 node = cast(CommandSub, UP_node)
@@ -1211,7 +1273,7 @@ class ExprEvaluator(object):
                 node = cast(Token, UP_node)
 
                 id_ = node.id
-                tval = node.tval
+                tval = lexer.TokenVal(node)
 
                 if id_ == Id.Expr_Dot:
                     return re.Primitive(Id.Re_Dot)
@@ -10,6 +10,7 @@ from _devbuild.gen.types_asdl import lex_mode_e
 from core import ui
 from core.error import p_die
 from frontend import consts
+from frontend import lexer
 from frontend import reader
 from mycpp import mylib
 from mycpp.mylib import log, tagswitch
@@ -46,7 +47,7 @@ if mylib.PYTHON:
             #   rid of.
             if pnode.tok:
                 if isinstance(pnode.tok, Token):
-                    v = pnode.tok.tval
+                    v = lexer.TokenVal(pnode.tok)
                 else:
                     # e.g. CommandSub for x = $(echo hi)
                     v = repr(pnode.tok)
@@ -72,9 +73,9 @@ def _Classify(gr, tok, tea_keywords):
     # Special case for top-level Tea keywords like data/enum/class, etc.
     # TODO: Do this more elegantly at grammar build time.
     if tea_keywords and tok.id == Id.Expr_Name:
-        if tok.tval in gr.keywords:
+        if lexer.TokenVal(tok) in gr.keywords:
             #log('NEW %r', gr.keywords[tok.val])
-            return gr.keywords[tok.tval]
+            return gr.keywords[lexer.TokenVal(tok)]
 
     # This handles 'x'.
     if tok.id in gr.tokens:
@@ -356,11 +357,19 @@ class ExprParser(object):
 
 
 class ctx_PNodeAllocator(object):
+    """Parse an expression with the PNodeAllocator of the ParseContext.
+
+    The PNodes are only needed until they're transformed to an AST, so they
+    are freed on exit.  Expressions can nest, e.g. $(echo $[1 + 2]) inside an
+    expression, so we free back to a mark rather than clearing everything.
+    """
 
     def __init__(self, ep):
         # type: (ExprParser) -> None
         self.expr_parser = ep
-        self.expr_parser.pnode_alloc = PNodeAllocator()
+        self.pnode_alloc = ep.parse_ctx.pnode_alloc
+        self.mark = self.pnode_alloc.Mark()
+        self.expr_parser.pnode_alloc = self.pnode_alloc
 
     def __enter__(self):
         # type: () -> None
@@ -368,5 +377,5 @@ class ctx_PNodeAllocator(object):
 
     def __exit__(self, type, value, traceback):
         # type: (Any, Any, Any) -> None
-        self.expr_parser.pnode_alloc.Clear()
+        self.pnode_alloc.Reset(self.mark)
         self.expr_parser.pnode_alloc = None
@@ -108,6 +108,18 @@ EOF)
         node = self._ParseOsh('var x = $(var x = %(a b););')
         node = self._ParseOsh('var x = $(var x = %(a b));')
 
+    def testPNodesAreFreed(self):
+        alloc = self.parse_ctx.pnode_alloc
+        self.assertEqual(0, alloc.Mark())
+
+        # Nested expressions free back to their own mark
+        node = self._ParseOsh('var x = $(var y = [1, 2]; echo $[y[0] + 1]);')
+        self.assertEqual(0, alloc.Mark())
+
+        # Also on a parse error
+        self.assertRaises(error.Parse, self._ParseOsh, 'var x = [1, 2;')
+        self.assertEqual(0, alloc.Mark())
+
     def testOtherExpr(self):
         """Some examples copied from pgen2/pgen2-test.sh mode-test."""
 
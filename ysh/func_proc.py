@@ -575,11 +575,13 @@ def CallUserFunc(
 
         try:
             cmd_ev._Execute(func.parsed.body)
-
-            return value.Null  # implicit return
-        except vm.ValueControlFlow as e:
+        except vm.ValueControlFlow as e:  # e.g. through a block
             return e.value
         except vm.IntControlFlow as e:
             raise AssertionError('IntControlFlow in func')
 
-    raise AssertionError('unreachable')
+        val = cmd_ev.TakeRetval()
+        if val is not None:
+            return val
+
+    return value.Null  # implicit return
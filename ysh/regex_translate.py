@@ -18,6 +18,7 @@ from _devbuild.gen.runtime_asdl import value
 from _devbuild.gen.id_kind_asdl import Id
 
 from core.error import e_die
+from frontend import lexer
 from mycpp.mylib import log, tagswitch
 from osh import glob_  # for ExtendedRegexEscape
 
@@ -232,13 +233,13 @@ def _AsPosixEre(node, parts):
 
         if op_tag == re_repeat_e.Num:
             op = cast(re_repeat.Num, UP_op)
-            parts.append('{%s}' % op.times.tval)
+            parts.append('{%s}' % lexer.TokenVal(op.times))
             return
 
         if op_tag == re_repeat_e.Range:
             op = cast(re_repeat.Range, UP_op)
-            lower = op.lower.tval if op.lower else ''
-            upper = op.upper.tval if op.upper else ''
+            lower = lexer.TokenVal(op.lower) if op.lower else ''
+            upper = lexer.TokenVal(op.upper) if op.upper else ''
             parts.append('{%s,%s}' % (lower, upper))
             return
 
@@ -5,10 +5,11 @@ val_ops.py
 from __future__ import print_function
 
 from _devbuild.gen.runtime_asdl import value, value_e, value_t
-from _devbuild.gen.syntax_asdl import loc, loc_t, command_t
+from _devbuild.gen.syntax_asdl import loc, loc_t, command_t, word_part
 
 from core import error
 from mycpp.mylib import tagswitch
+from osh import braces
 from ysh import regex_translate
 
 from typing import TYPE_CHECKING, cast, Dict, List, Optional
@@ -157,6 +158,10 @@ def ToShellArray(val, blame_loc, prefix=''):
             val = cast(value.BashArray, UP_val)
             strs = val.strs
 
+        elif case2(value_e.SparseArray):
+            val = cast(value.SparseArray, UP_val)
+            strs = val.strs
+
         else:
             raise error.TypeErr(val, "%sexpected List" % prefix, blame_loc)
 
@@ -211,6 +216,47 @@ class ArrayIter(_ContainerIter):
         return value.Str(self.strs[self.i])
 
 
+class ArgvIter(_ContainerIter):
+    """ for x in "$@" { """
+
+    def __init__(self, argv, offset):
+        # type: (List[str], int) -> None
+        """
+        Args:
+          argv: not copied; 'shift' and 'set --' don't mutate it
+          offset: the number of args that were shifted off
+        """
+        _ContainerIter.__init__(self)
+        self.argv = argv
+        self.offset = offset
+        self.n = len(argv) - offset
+
+    def Done(self):
+        # type: () -> int
+        return self.i == self.n
+
+    def FirstValue(self):
+        # type: () -> value_t
+        return value.Str(self.argv[self.offset + self.i])
+
+
+class BraceRangeIter(_ContainerIter):
+    """ for x in {1..1000000} { """
+
+    def __init__(self, part):
+        # type: (word_part.BracedRange) -> None
+        _ContainerIter.__init__(self)
+        self.gen = braces.RangeGen(part)
+
+    def Done(self):
+        # type: () -> int
+        return self.i == self.gen.length
+
+    def FirstValue(self):
+        # type: () -> value_t
+        return value.Str(self.gen.Get(self.i))
+
+
 class RangeIterator(_ContainerIter):
     """ for x in (m:n) { """
 
@@ -296,6 +342,10 @@ def ToBool(val):
             val = cast(value.BashArray, UP_val)
             return len(val.strs) != 0
 
+        elif case(value_e.SparseArray):
+            val = cast(value.SparseArray, UP_val)
+            return len(val.strs) != 0
+
         elif case(value_e.BashAssoc):
             val = cast(value.BashAssoc, UP_val)
             return len(val.d) != 0
@@ -371,6 +421,19 @@ def ExactlyEqual(left, right):
 
             return True
 
+        elif case(value_e.SparseArray):
+            left = cast(value.SparseArray, UP_left)
+            right = cast(value.SparseArray, UP_right)
+            if len(left.strs) != len(right.strs):
+                return False
+
+            for i in xrange(0, len(left.strs)):
+                if (left.indices[i] != right.indices[i] or
+                        left.strs[i] != right.strs[i]):
+                    return False
+
+            return True
+
         elif case(value_e.List):
             left = cast(value.List, UP_left)
             right = cast(value.List, UP_right)
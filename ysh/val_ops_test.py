@@ -6,7 +6,10 @@ from __future__ import print_function
 
 import unittest
 
+from _devbuild.gen.id_kind_asdl import Id
 from _devbuild.gen.runtime_asdl import value
+from _devbuild.gen.syntax_asdl import word_part
+from frontend import lexer
 from ysh import val_ops  # module under test
 
 
@@ -39,6 +42,39 @@ class IteratorTest(unittest.TestCase):
 
         self.assert_(it.Done())
 
+    def testArgvIter(self):
+        argv = ['a', 'b', 'c']
+
+        it = val_ops.ArgvIter(argv, 1)
+        self.assertEqual('b', it.FirstValue().s)
+        self.assertEqual(0, it.Index())
+        it.Next()
+
+        self.assertEqual('c', it.FirstValue().s)
+        it.Next()
+
+        self.assert_(it.Done())
+
+    def testBraceRangeIter(self):
+        blame = lexer.DummyToken(Id.Lit_Chars, '')
+
+        def Strs(kind, start, end, step):
+            part = word_part.BracedRange(blame, kind, start, end, step)
+            it = val_ops.BraceRangeIter(part)
+            out = []
+            while not it.Done():
+                out.append(it.FirstValue().s)
+                it.Next()
+            return out
+
+        self.assertEqual(['1', '2', '3'], Strs(Id.Range_Int, '1', '3', 1))
+        self.assertEqual(['01', '04', '07', '10'],
+                         Strs(Id.Range_Int, '01', '10', 3))
+        self.assertEqual(['5', '3', '1'], Strs(Id.Range_Int, '5', '0', -2))
+        self.assertEqual(['7'], Strs(Id.Range_Int, '7', '7', 1))
+        self.assertEqual(['a', 'c', 'e'], Strs(Id.Range_Char, 'a', 'e', 2))
+        self.assertEqual(['z', 'y'], Strs(Id.Range_Char, 'z', 'y', -1))
+
 
 if __name__ == '__main__':
     unittest.main()